@@ -2,7 +2,7 @@
 
 import React, { useState, useEffect, useMemo } from 'react';
 import type { MergeTrip } from './SupplyChainDashboard';
-import { fetchEpcHistory, type EventHistory } from '@/services/historyService';
+import { fetchEpcHistory, historyLegId, type EventHistory } from '@/services/historyService';
 import { fetchComments, postComment, type EpcComment } from '@/services/commentService';
 import { useSetAtom } from 'jotai';
 import { selectTripAndFocusAtom } from '@/stores/mapDataAtoms';
@@ -53,7 +53,7 @@ const CloneHistoryTable: React.FC<{
             const isCloneTrip = Array.isArray(to.anomalyTypeList) && to.anomalyTypeList.includes('clone' as AnomalyType);
             if (isCloneTrip) {
                 trips.push({
-                    roadId: from.eventId * 10000 + to.eventId,
+                    roadId: historyLegId(from, to),
                     from: { scanLocation: from.scanLocation, eventTime: new Date(from.eventTime).getTime() / 1000, businessStep: from.businessStep, coord: [0, 0] },
                     to: { scanLocation: to.scanLocation, eventTime: new Date(to.eventTime).getTime() / 1000, businessStep: to.businessStep, coord: [0, 0] },
                     epcCode: from.epcCode,
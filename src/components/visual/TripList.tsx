@@ -6,7 +6,7 @@ import { pastelColorMap } from '../../types/anomalyUtils';
 type TripListProps = {
     trips: AnalyzedTrip[];
     onCaseClick: (trip: AnalyzedTrip) => void;
-    selectedObjectId: number | null;
+    selectedObjectId: AnalyzedTrip['roadId'] | null;
 };
 
 const formatUnixTime = (unixTimestamp: number | string | null | undefined): string => {
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from metrics import PipelineMetrics, peak_rss_mb
+
+# 데이터 생성 스크립트 벤치마크
+# =================================
+# create.py / generate_history.py 를 여러 크기로 고정 시드로 실행해 처리량(trips/s,
+# events/s), 최대 메모리(peak RSS), 단계별 시간(생성 / 정렬 / 직렬화)을 측정하고
+# 커밋 간 비교할 수 있도록 JSON 으로 저장합니다. 각 측정은 새 프로세스에서 실행되므로
+# peak RSS 가 앞선 측정의 영향을 받지 않습니다.
+
+DEFAULT_SIZES = "1e3,1e4,1e5"
+
+
+def _seconds(metrics, name):
+    """metrics 의 name 단계 순수 시간 (감싸지 않은 단계는 0)"""
+    stat = metrics.stages.get(name)
+    return stat["seconds"] if stat else 0.0
+
+
+def _items(metrics, name):
+    stat = metrics.stages.get(name)
+    return stat["items"] if stat else 0
+
+
+# 1. 단일 측정 (자식 프로세스에서 실행)
+# =================================
+
+def run_create(size, seed, backend, fmt, output_path, json_backend="auto"):
+    """트립 생성 -> 정렬 -> 직렬화 단계별 시간을 잽니다."""
+    from create import iter_anomaly_trips, trip_sort_key
+    from encoders import get_encoder
+    from streamio import external_sort, write_records
+
+    random.seed(seed)
+    metrics = PipelineMetrics("benchmark")
+    started = time.perf_counter()
+    if backend == "numpy":
+        from vector_backend import iter_vectorized_trips
+        # numpy 엔진은 이미 정렬된 순서로 생성하므로 정렬 단계가 없음
+        ordered = metrics.timed_iter("generate", iter_vectorized_trips(size, seed))
+    else:
+        generated = metrics.timed_iter("generate", iter_anomaly_trips(size))
+        ordered = metrics.timed_iter("sort", external_sort(generated, key=trip_sort_key))
+    encoder = get_encoder(json_backend)
+    with metrics.stage("serialize"):
+        trip_count = write_records(output_path, ordered, fmt=fmt, encoder=encoder)
+    total = time.perf_counter() - started
+
+    return {
+        "script": "create", "size": size, "backend": backend, "format": fmt, "jsonBackend": encoder.name,
+        "trips": trip_count,
+        "seconds": {
+            "generate": _seconds(metrics, "generate"),
+            "sort": _seconds(metrics, "sort"),
+            "serialize": _seconds(metrics, "serialize"),
+            "total": total,
+        },
+        "tripsPerSec": trip_count / total if total else None,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+
+def run_history(size, seed, backend, fmt, input_path, output_path, json_backend="auto"):
+    """트립 읽기 -> 이벤트 생성 -> 정렬 -> 직렬화 단계별 시간을 잽니다. backend 는 입력 트립을 만든 엔진입니다."""
+    from encoders import get_encoder
+    from generate_history import iter_history_events
+    from streamio import external_sort, iter_records, write_records
+
+    random.seed(seed)
+    metrics = PipelineMetrics("benchmark")
+    started = time.perf_counter()
+    trips = metrics.timed_iter("read", iter_records(input_path))
+    events = metrics.timed_iter("generate", iter_history_events(trips))
+    ordered = metrics.timed_iter("sort", external_sort(events, key=lambda x: x["eventTime"]))
+    encoder = get_encoder(json_backend)
+    with metrics.stage("serialize"):
+        event_count = write_records(output_path, ordered, fmt=fmt, encoder=encoder)
+    total = time.perf_counter() - started
+    trip_count = _items(metrics, "read")
+
+    return {
+        "script": "generate_history", "size": size, "backend": backend, "format": fmt,
+        "jsonBackend": encoder.name, "trips": trip_count, "events": event_count,
+        "seconds": {
+            "read": _seconds(metrics, "read"),
+            "generate": _seconds(metrics, "generate"),
+            "sort": _seconds(metrics, "sort"),
+            "serialize": _seconds(metrics, "serialize"),
+            "total": total,
+        },
+        "tripsPerSec": trip_count / total if total else None,
+        "eventsPerSec": event_count / total if total else None,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+
+def _in_fresh_process(func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+# 2. 결과 정리
+# =================================
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _change(new, old):
+    """변화율. 어느 한쪽을 측정하지 못했으면(None, 0) None"""
+    if not new or not old:
+        return None
+    return new / old - 1
+
+
+def _format_change(change):
+    return "n/a" if change is None else f"{change:+.1%}"
+
+
+def _format_mb(mb):
+    return "     n/a" if mb is None else f"{mb:8.1f}"
+
+
+def compare(results, baseline):
+    """같은 (스크립트, 크기, 백엔드, 형식, 인코더) 측정끼리 총 시간과 peak RSS 변화율을 계산합니다."""
+    def case_key(r):
+        return r["script"], r["size"], r.get("backend"), r["format"], r.get("jsonBackend")
+    previous = {case_key(r): r for r in baseline["results"]}
+    rows = []
+    for r in results:
+        old = previous.get(case_key(r))
+        if not old:
+            continue
+        rows.append({
+            "script": r["script"], "size": r["size"],
+            "totalChange": _change(r["seconds"]["total"], old["seconds"]["total"]),
+            "peakRssChange": _change(r["peakRssMb"], old["peakRssMb"]),
+        })
+    return rows
+
+
+def parse_sizes(text):
+    return [int(float(s)) for s in text.split(",") if s.strip()]
+
+
+# 3. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="데이터 생성 스크립트의 처리량과 메모리 사용량을 측정합니다.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="측정할 트립 수 목록 (예: 1e3,1e4,1e5,1e6,1e7)")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python", help="트립 생성 엔진")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="ndjson", help="출력 형식")
+    parser.add_argument("--json-backend", choices=["auto", "json", "orjson"], default="auto", help="JSON 인코더")
+    parser.add_argument("--skip-history", action="store_true", help="generate_history.py 측정 생략")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="결과 JSON 파일 이름")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    ext = ".ndjson" if args.format == "ndjson" else ".json"
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as work_dir:
+        for size in parse_sizes(args.sizes):
+            trips_path = os.path.join(work_dir, f"trips-{size}{ext}")
+            history_path = os.path.join(work_dir, f"history-{size}{ext}")
+
+            result = _in_fresh_process(run_create, size, args.seed, args.backend, args.format, trips_path,
+                                      args.json_backend)
+            results.append(result)
+            print(f"create           n={size:>10,}  {result['seconds']['total']:8.2f}s  "
+                  f"{result['tripsPerSec']:>12,.0f} trips/s  peak {_format_mb(result['peakRssMb'])} MB")
+
+            if not args.skip_history:
+                result = _in_fresh_process(run_history, size, args.seed, args.backend, args.format, trips_path,
+                                          history_path, args.json_backend)
+                results.append(result)
+                print(f"generate_history n={size:>10,}  {result['seconds']['total']:8.2f}s  "
+                      f"{result['eventsPerSec']:>12,.0f} events/s  peak {_format_mb(result['peakRssMb'])} MB")
+
+            for path in (trips_path, history_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "createdAt": datetime.now().isoformat(timespec="seconds"),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(results, json.load(f))
+        for row in report["comparison"]:
+            print(f"{row['script']:<16} n={row['size']:>10,}  total {_format_change(row['totalChange'])}  peak RSS {_format_change(row['peakRssChange'])}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 완료: 벤치마크 결과를 '{args.output}' 파일로 저장했습니다.")
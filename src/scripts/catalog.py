@@ -0,0 +1,207 @@
+import argparse
+import gc
+import json
+import os
+import pickle
+from array import array
+from functools import lru_cache
+
+from topology import build_topology_index
+
+# 공용 노드 카탈로그
+# =================================
+# create.py / generate_history.py 가 함께 쓰는 노드(공장, 창고, 물류센터, 도매상, 소매상)
+# 목록과 단계 순서, 공장-창고 매핑을 nodes.json 한 곳에서 읽고 검증합니다.
+# JSON 파싱과 검증은 카탈로그가 바뀌었을 때만 하고, 검증된 내용을 __pycache__ 아래
+# pickle 로 저장해 두었다가 다음 임포트부터는 그대로 불러옵니다.
+#
+# 다른 카탈로그를 쓰려면 환경 변수 NODE_CATALOG 에 파일 경로를 지정합니다.
+# (샤드 생성용 자식 프로세스에도 그대로 전달됨)
+
+CATALOG_VERSION = 1
+CACHE_VERSION = 1
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nodes.json")
+NODE_KEYS = ("hubType", "scanLocation", "businessStep", "coord")
+
+
+def catalog_path():
+    return os.environ.get("NODE_CATALOG") or DEFAULT_CATALOG_PATH
+
+
+def cache_path_for(path):
+    root, _ = os.path.splitext(os.path.basename(path))
+    return os.path.join(os.path.dirname(os.path.abspath(path)), "__pycache__", f"{root}.catalog.pickle")
+
+
+# 1. 검증
+# =================================
+
+def validate_catalog(data):
+    """카탈로그 JSON 을 검증합니다. 문제가 있으면 모든 오류를 모아 ValueError 를 발생시킵니다."""
+    errors = []
+    if data.get("version") != CATALOG_VERSION:
+        errors.append(f"지원하지 않는 카탈로그 버전입니다: {data.get('version')}")
+    step_order = data.get("stepOrder")
+    if not isinstance(step_order, list) or not step_order or len(set(step_order)) != len(step_order):
+        errors.append("stepOrder 는 중복 없는 단계 이름 목록이어야 합니다.")
+        step_order = []
+    nodes = data.get("nodes")
+    if not isinstance(nodes, list) or not nodes:
+        errors.append("nodes 는 비어 있지 않은 목록이어야 합니다.")
+        nodes = []
+
+    steps_by_location = {}
+    for i, node in enumerate(nodes):
+        where = f"nodes[{i}]"
+        if not isinstance(node, dict) or set(node) != set(NODE_KEYS):
+            errors.append(f"{where}: 키는 {', '.join(NODE_KEYS)} 이어야 합니다.")
+            continue
+        location = node["scanLocation"]
+        if not isinstance(location, str) or not location:
+            errors.append(f"{where}: scanLocation 이 비어 있습니다.")
+        elif location in steps_by_location:
+            errors.append(f"{where}: scanLocation '{location}' 이 중복되었습니다.")
+        if node["businessStep"] not in step_order:
+            errors.append(f"{where}: 알 수 없는 businessStep '{node['businessStep']}' 입니다.")
+        coord = node["coord"]
+        if (not isinstance(coord, list) or len(coord) != 2
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in coord)
+                or not (-180 <= coord[0] <= 180 and -90 <= coord[1] <= 90)):
+            errors.append(f"{where}: coord 는 [경도, 위도] 형식이어야 합니다: {coord}")
+        steps_by_location.setdefault(location, node["businessStep"])
+
+    factory_wms_map = data.get("factoryWmsMap")
+    if not isinstance(factory_wms_map, dict):
+        errors.append("factoryWmsMap 은 공장 -> 공장 창고 매핑이어야 합니다.")
+        factory_wms_map = {}
+    for factory, wms in factory_wms_map.items():
+        if steps_by_location.get(factory) != "Factory":
+            errors.append(f"factoryWmsMap: '{factory}' 은 Factory 노드가 아닙니다.")
+        if steps_by_location.get(wms) != "WMS":
+            errors.append(f"factoryWmsMap: '{wms}' 은 WMS 노드가 아닙니다.")
+
+    if errors:
+        raise ValueError("노드 카탈로그 오류:\n  " + "\n  ".join(errors))
+
+
+# 2. 불러오기 (pickle 캐시)
+# =================================
+# 캐시에는 검증을 통과한 카탈로그를 열(column) 단위로 저장합니다. 노드 수만큼의 작은
+# dict / list 를 통째로 pickle 하는 것보다 문자열 목록과 좌표 배열(array('d'))을 읽은 뒤
+# 노드 dict 를 다시 만드는 편이 훨씬 빠릅니다. 조회 구조는 불러온 뒤 바로 계산합니다.
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"cacheVersion": CACHE_VERSION, "path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def _read_catalog(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    validate_catalog(data)
+    # 캐시(array('d'))에서 불러온 좌표와 같도록 정수 좌표도 float 로 맞춤
+    for node in data["nodes"]:
+        node["coord"] = [float(v) for v in node["coord"]]
+    return data
+
+
+def _to_columns(data):
+    steps = data["stepOrder"]
+    step_index = {step: i for i, step in enumerate(steps)}
+    coords = array("d")
+    for node in data["nodes"]:
+        coords.extend(node["coord"])
+    return {
+        "stepOrder": steps,
+        "factoryWmsMap": data["factoryWmsMap"],
+        "hubType": [node["hubType"] for node in data["nodes"]],
+        "scanLocation": [node["scanLocation"] for node in data["nodes"]],
+        "businessStep": bytes(step_index[node["businessStep"]] for node in data["nodes"]),
+        "coord": coords,
+    }
+
+
+def _from_columns(columns):
+    steps = columns["stepOrder"]
+    coords = columns["coord"]
+    nodes = [
+        {"hubType": hub_type, "scanLocation": location, "businessStep": steps[step], "coord": [coords[2 * i], coords[2 * i + 1]]}
+        for i, (hub_type, location, step) in enumerate(zip(columns["hubType"], columns["scanLocation"], columns["businessStep"]))
+    ]
+    return {"version": CATALOG_VERSION, "stepOrder": steps, "factoryWmsMap": columns["factoryWmsMap"], "nodes": nodes}
+
+
+def _load_cache(path, stamp):
+    try:
+        with open(cache_path_for(path), "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("stamp") != stamp or "columns" not in cached:
+        return None
+    return _from_columns(cached["columns"])
+
+
+def _save_cache(path, stamp, data):
+    cache_path = cache_path_for(path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"stamp": stamp, "columns": _to_columns(data)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass   # 캐시를 쓸 수 없는 위치(읽기 전용 등)면 매번 카탈로그를 직접 읽음
+
+
+def build_topology(path):
+    """카탈로그 파일을 읽고 검증해 TopologyIndex 를 만듭니다. (캐시 사용 안 함)"""
+    data = _read_catalog(path)
+    return build_topology_index(data["nodes"], data["factoryWmsMap"], data["stepOrder"])
+
+
+def load_topology(path=None, use_cache=True):
+    """카탈로그의 TopologyIndex 를 돌려줍니다. 캐시가 최신이면 검증 없이 pickle 에서 불러옵니다."""
+    path = path or catalog_path()
+    if not use_cache:
+        return build_topology(path)
+    stamp = _source_stamp(path)
+    # 작은 객체를 한꺼번에 많이 만들므로, 그동안은 순환 GC 를 멈춤
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        data = _load_cache(path, stamp)
+        if data is None:
+            data = _read_catalog(path)
+            _save_cache(path, stamp, data)
+        return build_topology_index(data["nodes"], data["factoryWmsMap"], data["stepOrder"])
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+@lru_cache(maxsize=None)
+def get_topology(path=None):
+    """프로세스 안에서 카탈로그를 한 번만 불러와 공유합니다."""
+    return load_topology(path)
+
+
+# 3. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="노드 카탈로그를 검증하고 캐시를 다시 만듭니다.")
+    parser.add_argument("-i", "--input", help="카탈로그 파일 (기본값: NODE_CATALOG 환경 변수 또는 nodes.json)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    path = args.input or catalog_path()
+    try:
+        data = _read_catalog(path)
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
+    _save_cache(path, _source_stamp(path), data)
+    topology = build_topology_index(data["nodes"], data["factoryWmsMap"], data["stepOrder"])
+    counts = ", ".join(f"{step} {len(topology.nodes_by_step[step])}" for step in topology.step_order)
+    print(f"✅ 완료: '{path}' 의 노드 {len(topology.nodes)}개를 검증했습니다. ({counts})")
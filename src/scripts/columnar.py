@@ -0,0 +1,297 @@
+import os
+import shutil
+from itertools import chain, islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # pyarrow 는 선택 의존성 (--format parquet/arrow 사용 시에만 필요)
+    pa = None
+    pc = None
+    ds = None
+
+from catalog import get_topology
+from records import ANOMALY_DESCRIPTIONS, PRODUCTS, describe_anomaly, outbound_event_type
+
+# 트립 / 이벤트 이력의 컬럼형(Parquet, Arrow IPC) 출력
+# =================================
+# 위치, 허브 유형, 단계, 이벤트 유형, 상품명, description 처럼 카탈로그 / 고정 목록으로 값이
+# 정해지는 문자열은 사전(dictionary) 인코딩합니다. 이벤트 날짜(eventMonth=YYYY-MM 또는
+# eventDate=YYYY-MM-DD) 기준 hive 파티션 디렉터리로 기록합니다.
+# 파일은 zstd 로 압축합니다.
+# Arrow IPC 파일은 pyarrow.dataset / pyarrow.memory_map 으로 그대로 메모리 매핑해 읽을 수 있습니다.
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+BATCH_ROWS = 64_000
+MAX_PARTITIONS = 100_000   # 하루 하나씩이므로 수백 년치 날짜까지 허용
+PARTITION_KEYS = ("eventDate", "eventMonth")
+# eventDate 파티션은 한국 시간(KST) 기준 날짜로 계산
+EVENT_DATE_UTC_OFFSET = 9 * 3600
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow 가 설치되어 있지 않습니다. 'pip install pyarrow' 후 다시 실행해주세요.")
+
+
+class _Vocabulary:
+    """사전 인코딩용 문자열 -> 인덱스 표
+
+    Arrow IPC 파일은 필드당 하나의 사전만 허용하므로(배치 사이에 사전을 바꾸거나 늘릴 수
+    없음), 카탈로그로 정해지는 값으로 사전을 미리 만들고 모든 배치가 같은 사전 배열을
+    공유합니다. 사전에 없는 값은 카탈로그와 맞지 않는 데이터이므로 ValueError 를 발생시킵니다.
+    """
+
+    def __init__(self, column, values):
+        self.column = column
+        self.index = {}
+        for value in values:
+            self.index.setdefault(value, len(self.index))
+        self.dictionary = pa.array(list(self.index), pa.string())
+
+    def encode(self, values):
+        index = self.index
+        try:
+            codes = [None if value is None else index[value] for value in values]
+        except KeyError as e:
+            raise ValueError(f"{self.column} 컬럼에 카탈로그에 없는 값이 있습니다: {e.args[0]!r}") from None
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), self.dictionary)
+
+
+def _catalog_values():
+    """사전 인코딩하는 컬럼별로 카탈로그에서 나올 수 있는 값 목록"""
+    topology = get_topology()
+    return {
+        "location": [node["scanLocation"] for node in topology.nodes],
+        "hubType": [node["hubType"] for node in topology.nodes],
+        "businessStep": list(topology.step_order),
+        "eventType": ["출고", "Aggregation"] + [outbound_event_type(step) for step in topology.step_order],
+        # "N/A", "이상 감지됨." 은 값이 빠진 트립에 records 가 채우는 기본값
+        "productName": PRODUCTS + ["N/A"],
+        "description": [describe_anomaly(anomaly_type, percent)
+                        for anomaly_type in [None, *ANOMALY_DESCRIPTIONS["type_anomaly"]]
+                        for percent in (0, 100)] + ["N/A", "이상 감지됨."],
+    }
+
+
+def _event_date(event_times):
+    return pa.array([(t + EVENT_DATE_UTC_OFFSET) // 86400 for t in event_times], pa.int32()).cast(pa.date32())
+
+
+# 1. 스키마와 행 -> 배치 변환
+# =================================
+
+def _dict_type():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def trip_schema():
+    return pa.schema([
+        ("roadId", pa.int64()),
+        ("epcCode", pa.string()),
+        ("productName", _dict_type()),
+        ("epcLot", pa.string()),
+        ("eventType", _dict_type()),
+        ("fromScanLocation", _dict_type()),
+        ("fromBusinessStep", _dict_type()),
+        ("fromLon", pa.float64()),
+        ("fromLat", pa.float64()),
+        ("fromEventTime", pa.int64()),
+        ("toScanLocation", _dict_type()),
+        ("toBusinessStep", _dict_type()),
+        ("toLon", pa.float64()),
+        ("toLat", pa.float64()),
+        ("toEventTime", pa.int64()),
+        ("anomaly", pa.int16()),
+        ("anomalyTypeList", pa.list_(pa.string())),
+        ("description", _dict_type()),
+        ("eventDate", pa.date32()),
+    ])
+
+
+def event_schema():
+    return pa.schema([
+        ("eventId", pa.int64()),
+        ("epcCode", pa.string()),
+        ("productName", _dict_type()),
+        ("epcLot", pa.string()),
+        ("locationId", pa.int32()),
+        ("scanLocation", _dict_type()),
+        ("hubType", _dict_type()),
+        ("businessStep", _dict_type()),
+        ("eventType", _dict_type()),
+        ("eventTime", pa.int64()),
+        ("anomaly", pa.int16()),
+        ("anomalyTypeList", pa.list_(pa.string())),
+        ("description", _dict_type()),
+        ("eventDate", pa.date32()),
+    ])
+
+
+class _BatchEncoder:
+    """dict 행 묶음을 RecordBatch 로 변환합니다. 모든 배치가 같은 사전을 씁니다."""
+
+    def __init__(self, kind, with_month=False):
+        self.kind = kind
+        self.with_month = with_month
+        self.schema = trip_schema() if kind == "trips" else event_schema()
+        if with_month:
+            self.schema = self.schema.append(pa.field("eventMonth", pa.string()))
+        self.vocab = {column: _Vocabulary(column, values) for column, values in _catalog_values().items()}
+
+    def encode(self, rows):
+        if self.kind == "trips":
+            columns = self._trip_columns(rows)
+        else:
+            columns = self._event_columns(rows)
+        if self.with_month:
+            # eventDate(마지막 컬럼)로부터 'YYYY-MM' 파티션 값 계산
+            days = pc.cast(columns[-1], pa.timestamp("s"))
+            columns.append(pc.strftime(days, format="%Y-%m"))
+        return pa.record_batch(columns, schema=self.schema)
+
+    def _trip_columns(self, rows):
+        v = self.vocab
+        src = [row["from"] for row in rows]
+        dst = [row["to"] for row in rows]
+        return [
+            pa.array([row["roadId"] for row in rows], pa.int64()),
+            pa.array([row["epcCode"] for row in rows], pa.string()),
+            v["productName"].encode(row.get("productName") for row in rows),
+            pa.array([row.get("epcLot") for row in rows], pa.string()),
+            v["eventType"].encode(row.get("eventType") for row in rows),
+            v["location"].encode(p["scanLocation"] for p in src),
+            v["businessStep"].encode(p["businessStep"] for p in src),
+            pa.array([p["coord"][0] for p in src], pa.float64()),
+            pa.array([p["coord"][1] for p in src], pa.float64()),
+            pa.array([p["eventTime"] for p in src], pa.int64()),
+            v["location"].encode(p["scanLocation"] for p in dst),
+            v["businessStep"].encode(p["businessStep"] for p in dst),
+            pa.array([p["coord"][0] for p in dst], pa.float64()),
+            pa.array([p["coord"][1] for p in dst], pa.float64()),
+            pa.array([p["eventTime"] for p in dst], pa.int64()),
+            pa.array([row.get("anomaly", 0) for row in rows], pa.int16()),
+            pa.array([row.get("anomalyTypeList", []) for row in rows], pa.list_(pa.string())),
+            v["description"].encode(row.get("description") for row in rows),
+            _event_date(p["eventTime"] for p in src),
+        ]
+
+    def _event_columns(self, rows):
+        v = self.vocab
+        return [
+            pa.array([row["eventId"] for row in rows], pa.int64()),
+            pa.array([row["epcCode"] for row in rows], pa.string()),
+            v["productName"].encode(row.get("productName") for row in rows),
+            pa.array([row.get("epcLot") for row in rows], pa.string()),
+            pa.array([row.get("locationId") for row in rows], pa.int32()),
+            v["location"].encode(row["scanLocation"] for row in rows),
+            v["hubType"].encode(row.get("hubType") for row in rows),
+            v["businessStep"].encode(row["businessStep"] for row in rows),
+            v["eventType"].encode(row.get("eventType") for row in rows),
+            pa.array([row["eventTime"] for row in rows], pa.int64()),
+            pa.array([row.get("anomaly", 0) for row in rows], pa.int16()),
+            pa.array([row.get("anomalyTypeList", []) for row in rows], pa.list_(pa.string())),
+            v["description"].encode(row.get("description") for row in rows),
+            _event_date(row["eventTime"] for row in rows),
+        ]
+
+
+# 2. 기록 / 읽기
+# =================================
+
+def _dataset_format(fmt):
+    return "parquet" if fmt == "parquet" else "ipc"
+
+
+def _partitioning(partition):
+    """파티션 단위: 'date' (eventDate=YYYY-MM-DD), 'month' (eventMonth=YYYY-MM), 'none'"""
+    if partition == "date":
+        return ds.partitioning(pa.schema([("eventDate", pa.date32())]), flavor="hive")
+    if partition == "month":
+        return ds.partitioning(pa.schema([("eventMonth", pa.string())]), flavor="hive")
+    return None
+
+
+def _file_options(fmt):
+    if fmt == "parquet":
+        return ds.ParquetFileFormat().make_write_options(compression="zstd")
+    return ds.IpcFileFormat().make_write_options(compression="zstd")
+
+
+def _is_dataset_entry(path, name):
+    """write_columnar 가 만드는 항목(파티션 디렉터리, part-*.parquet / part-*.arrow 파일)인지 확인"""
+    full_path = os.path.join(path, name)
+    if os.path.isdir(full_path):
+        return name.partition("=")[0] in PARTITION_KEYS
+    return name.startswith("part-") and name.endswith((".parquet", ".arrow"))
+
+
+def _clear_output_dir(path):
+    """이전 실행의 데이터셋을 지웁니다.
+
+    write_dataset 의 delete_matching 은 이번 실행이 쓰는 파티션만 지우므로, 그대로 두면
+    이전 실행에만 있던 파티션이 남아 새 데이터셋에 섞여 읽힙니다. 데이터셋이 아닌 파일이
+    있는 디렉터리에는 기록하지 않습니다.
+    """
+    if not os.path.exists(path):
+        return
+    if not os.path.isdir(path):
+        raise ValueError(f"컬럼형 출력 경로가 디렉터리가 아닙니다: {path}")
+    entries = os.listdir(path)
+    foreign = sorted(name for name in entries if not _is_dataset_entry(path, name))
+    if foreign:
+        raise ValueError(f"'{path}' 에 컬럼형 데이터셋이 아닌 파일이 있어 기록하지 않습니다: {', '.join(foreign[:5])}")
+    for name in entries:
+        full_path = os.path.join(path, name)
+        if os.path.isdir(full_path):
+            shutil.rmtree(full_path)
+        else:
+            os.remove(full_path)
+
+
+def write_columnar(path, records, fmt="parquet", partition="month", batch_rows=BATCH_ROWS):
+    """트립 또는 이벤트 레코드를 이벤트 날짜로 파티션된 컬럼형 데이터셋 디렉터리로 기록합니다.
+
+    레코드 종류(트립/이벤트)는 첫 레코드의 형태로 판별하며, 기록한 레코드 수를 반환합니다.
+    기본값은 월 단위 파티션입니다. 하루 트립 수가 적은 현재 생성기 데이터를 일 단위로
+    나누면 파일마다 사전/메타데이터가 반복되어 오히려 커지기 때문입니다.
+    출력 디렉터리에 있던 이전 데이터셋은 지우고 새로 기록합니다.
+    """
+    _require_pyarrow()
+    _clear_output_dir(path)
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        os.makedirs(path, exist_ok=True)
+        return 0
+    encoder = _BatchEncoder("trips" if "from" in first else "events", with_month=partition == "month")
+    records = chain([first], records)
+
+    count = 0
+    def batches():
+        nonlocal count
+        while True:
+            rows = list(islice(records, batch_rows))
+            if not rows:
+                return
+            count += len(rows)
+            yield encoder.encode(rows)
+
+    ds.write_dataset(
+        batches(), path, schema=encoder.schema, format=_dataset_format(fmt),
+        file_options=_file_options(fmt),
+        partitioning=_partitioning(partition), max_partitions=MAX_PARTITIONS,
+        existing_data_behavior="error",
+    )
+    # 다시 읽은 행 수가 기록한 행 수와 같은지 확인 (메타데이터만 읽음)
+    read_back = open_columnar(path, fmt, partition).count_rows()
+    if read_back != count:
+        raise RuntimeError(f"'{path}' 에 {count}개를 기록했지만 다시 읽은 행은 {read_back}개입니다.")
+    return count
+
+
+def open_columnar(path, fmt="parquet", partition="month"):
+    """write_columnar 로 기록한 디렉터리를 pyarrow Dataset 으로 엽니다. (Arrow IPC 는 메모리 매핑)"""
+    _require_pyarrow()
+    return ds.dataset(path, format=_dataset_format(fmt), partitioning=_partitioning(partition))
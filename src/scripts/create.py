@@ -1,163 +1,133 @@
-import json
+import argparse
+import heapq
+import os
 import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from catalog import get_topology
+from encoders import get_encoder, with_compression_extension
+from ids import IdAllocator, IdLedger
+from metrics import add_metrics_arguments, metrics_from_args
+from profiles import load_profile
+from records import PRODUCTS, Trip, describe_anomaly
+from streamio import DEFAULT_RUN_SIZE, external_sort, iter_ndjson, write_ndjson, write_records
 
 # 1. 입력 데이터 및 설정 (이전과 동일)
 # =================================
 
-NODES_INFO = [
-    { "hubType": "ICN_Factory", "scanLocation": "인천공장", "businessStep": "Factory", "coord": [126.65, 37.45] },
-    { "hubType": "HWS_Factory", "scanLocation": "화성공장", "businessStep": "Factory", "coord": [126.83, 37.20] },
-    { "hubType": "YGS_Factory", "scanLocation": "양산공장", "businessStep": "Factory", "coord": [129.04, 35.33] },
-    { "hubType": "KUM_Factory", "scanLocation": "구미공장", "businessStep": "Factory", "coord": [128.40, 36.13] },
-    { "hubType": "ICN_WMS", "scanLocation": "인천공장창고", "businessStep": "WMS", "coord": [126.66, 37.46] },
-    { "hubType": "HWS_WMS", "scanLocation": "화성공장창고", "businessStep": "WMS", "coord": [126.84, 37.21] },
-    { "hubType": "YGS_WMS", "scanLocation": "양산공장창고", "businessStep": "WMS", "coord": [129.05, 35.34] },
-    { "hubType": "KUM_WMS", "scanLocation": "구미공장창고", "businessStep": "WMS", "coord": [128.41, 36.14] },
-    { "hubType": "SEL_Logi_HUB", "scanLocation": "수도권물류센터", "businessStep": "LogiHub", "coord": [127.20, 37.35] },
-    { "hubType": "JB_Logi_HUB", "scanLocation": "전북물류센터", "businessStep": "LogiHub", "coord": [127.15, 35.82] },
-    { "hubType": "JN_Logi_HUB", "scanLocation": "전남물류센터", "businessStep": "LogiHub", "coord": [126.90, 35.15] },
-    { "hubType": "KB_Logi_HUB", "scanLocation": "경북물류센터", "businessStep": "LogiHub", "coord": [128.52, 35.87] },
-    { "hubType": "SEL_WS1", "scanLocation": "수도권_도매상1", "businessStep": "Wholesaler", "coord": [127.05, 37.55] },
-    { "hubType": "SEL_WS2", "scanLocation": "수도권_도매상2", "businessStep": "Wholesaler", "coord": [126.95, 37.60] },
-    { "hubType": "SEL_WS3", "scanLocation": "수도권_도매상3", "businessStep": "Wholesaler", "coord": [127.15, 37.50] },
-    { "hubType": "JB_WS1", "scanLocation": "전북_도매상1", "businessStep": "Wholesaler", "coord": [127.10, 35.90] },
-    { "hubType": "JB_WS2", "scanLocation": "전북_도매상2", "businessStep": "Wholesaler", "coord": [126.98, 35.80] },
-    { "hubType": "JB_WS3", "scanLocation": "전북_도매상3", "businessStep": "Wholesaler", "coord": [127.25, 35.75] },
-    { "hubType": "JN_WS1", "scanLocation": "전남_도매상1", "businessStep": "Wholesaler", "coord": [126.85, 35.25] },
-    { "hubType": "JN_WS3", "scanLocation": "전남_도매상3", "businessStep": "Wholesaler", "coord": [127.05, 35.10] },
-    { "hubType": "KB_WS1", "scanLocation": "경북_도매상1", "businessStep": "Wholesaler", "coord": [128.60, 35.95] },
-    { "hubType": "KB_WS2", "scanLocation": "경북_도매상2", "businessStep": "Wholesaler", "coord": [128.45, 36.00] },
-    { "hubType": "SEL_WS1_R1", "scanLocation": "수도권_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [127.055, 37.555] },
-    { "hubType": "SEL_WS1_R2", "scanLocation": "수도권_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [127.045, 37.555] },
-    { "hubType": "SEL_WS1_R3", "scanLocation": "수도권_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [127.050, 37.560] },
-    { "hubType": "SEL_WS2_R1", "scanLocation": "수도권_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.955, 37.605] },
-    { "hubType": "SEL_WS2_R2", "scanLocation": "수도권_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.945, 37.605] },
-    { "hubType": "SEL_WS2_R3", "scanLocation": "수도권_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.950, 37.610] },
-    { "hubType": "SEL_WS3_R1", "scanLocation": "수도권_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.155, 37.505] },
-    { "hubType": "SEL_WS3_R2", "scanLocation": "수도권_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.145, 37.505] },
-    { "hubType": "SEL_WS3_R3", "scanLocation": "수도권_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.150, 37.510] },
-    { "hubType": "JB_WS1_R1", "scanLocation": "전북_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [127.105, 35.905] },
-    { "hubType": "JB_WS1_R2", "scanLocation": "전북_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [127.095, 35.905] },
-    { "hubType": "JB_WS1_R3", "scanLocation": "전북_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [127.100, 35.910] },
-    { "hubType": "JB_WS2_R1", "scanLocation": "전북_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.985, 35.805] },
-    { "hubType": "JB_WS2_R2", "scanLocation": "전북_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.975, 35.805] },
-    { "hubType": "JB_WS2_R3", "scanLocation": "전북_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.980, 35.810] },
-    { "hubType": "JB_WS3_R1", "scanLocation": "전북_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.255, 35.755] },
-    { "hubType": "JB_WS3_R2", "scanLocation": "전북_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.245, 35.755] },
-    { "hubType": "JB_WS3_R3", "scanLocation": "전북_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.250, 35.760] },
-    { "hubType": "JN_WS1_R1", "scanLocation": "전남_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [126.855, 35.255] },
-    { "hubType": "JN_WS1_R2", "scanLocation": "전남_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [126.845, 35.255] },
-    { "hubType": "JN_WS1_R3", "scanLocation": "전남_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [126.850, 35.260] },
-    { "hubType": "JN_WS2_R1", "scanLocation": "전남_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.755, 35.055] },
-    { "hubType": "JN_WS2_R2", "scanLocation": "전남_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.745, 35.055] },
-    { "hubType": "JN_WS2_R3", "scanLocation": "전남_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.750, 35.060] },
-    { "hubType": "JN_WS3_R1", "scanLocation": "전남_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.055, 35.105] },
-    { "hubType": "JN_WS3_R2", "scanLocation": "전남_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.045, 35.105] },
-    { "hubType": "JN_WS3_R3", "scanLocation": "전남_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.050, 35.110] },
-    { "hubType": "KB_WS1_R1", "scanLocation": "경북_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [128.605, 35.955] },
-    { "hubType": "KB_WS1_R2", "scanLocation": "경북_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [128.595, 35.955] },
-    { "hubType": "KB_WS1_R3", "scanLocation": "경북_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [128.600, 35.960] },
-    { "hubType": "KB_WS2_R1", "scanLocation": "경북_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [128.455, 36.005] },
-    { "hubType": "KB_WS2_R2", "scanLocation": "경북_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [128.445, 36.005] },
-    { "hubType": "KB_WS2_R3", "scanLocation": "경북_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [128.450, 36.010] },
-    { "hubType": "KB_WS3_R1", "scanLocation": "경북_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [128.705, 35.805] },
-    { "hubType": "KB_WS3_R2", "scanLocation": "경북_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [128.695, 35.805] },
-    { "hubType": "KB_WS3_R3", "scanLocation": "경북_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [128.700, 35.810] }
-]
-PRODUCTS = ["말보로 레드", "던힐 프로스트", "에쎄 체인지", "타이레놀 500mg", "아로나민 골드", "게보린"]
-ANOMALY_DESCRIPTIONS = {
-    "type_anomaly": {
-        "fake": "정식으로 등록되지 않은 새로운 EPC 코드가 감지되었습니다. 위조품일 가능성이 있습니다.",
-        "tamper": "기존 EPC 코드가 비정상적으로 변조된 것으로 의심됩니다.",
-        "clone": "하나의 EPC 코드가 동시간대에 여러 위치에서 동시에 감지되었습니다. 코드 복제를 통한 불법 유통일 수 있습니다.",
-    },
-    "percent_anomaly": "이 구간의 이동 패턴이 비정상적입니다. 시스템은 과거 데이터와 비교하여 높은 확률로 이상 이동으로 분류했습니다. (예: 경로 역행, 단계 건너뛰기, 비정상적 소요 시간 등)"
-}
+# 노드 목록은 공용 카탈로그(nodes.json, catalog.py)에서 읽음
+TOPOLOGY = get_topology()
+NODES_INFO = list(TOPOLOGY.nodes)
+EPC_START = 695
+START_TIME = datetime(2024, 1, 1, 9, 0, 0)
+MAX_CLONE_SETS = 4
+# 샤드별 시간 구간을 겹치지 않게 잡기 위한 시간 진행량의 상한
+MAX_TRIP_TIME_STEP = timedelta(hours=3)     # 단일 트립 사이의 최대 간격
+CLONE_SET_TIME_STEP = timedelta(days=1)     # 복제 세트 사이의 간격
+# --id-ledger 로 여러 번 실행할 때 다음 실행의 시작 시각은 원장의 "startTime"(epoch 초)에
+# 기록합니다. 이력의 앞뒤 경로(단계당 최대 8시간, 앞뒤로 최대 4단계)가 이전 실행의 이력과
+# 겹치지 않도록 마지막 도착 시각 뒤에 간격을 두므로, 증분 이력은 파일 끝에 덧붙이기만 합니다.
+LEDGER_START_TIME = "startTime"
+LEDGER_TIME_GAP = timedelta(days=3)
 
 # 2. 데이터 전처리 및 헬퍼 함수 (이전과 동일)
 # =================================
 
-nodes_by_step = {step: [] for step in ["Factory", "WMS", "LogiHub", "Wholesaler", "Reseller"]}
-for node in NODES_INFO:
-    if node["businessStep"] in nodes_by_step:
-        nodes_by_step[node["businessStep"]].append(node)
-node_map = {node["scanLocation"]: node for node in NODES_INFO}
+nodes_by_step = {step: list(TOPOLOGY.nodes_by_step[step]) for step in ["Factory", "WMS", "LogiHub", "Wholesaler", "Reseller"]}
+node_map = dict(TOPOLOGY.nodes_by_location)
 
 def create_trip(road_id, from_node, to_node, epc_info, time_info, anomaly_info):
-    """단일 트립 객체를 생성하는 헬퍼 함수"""
-    description_parts = []
-    if anomaly_info["type"]:
-        description_parts.append(ANOMALY_DESCRIPTIONS["type_anomaly"][anomaly_info["type"]])
-    if anomaly_info["percent"] >= 50:
-        description_parts.append(ANOMALY_DESCRIPTIONS["percent_anomaly"])
-    
-    return {
-        "roadId": road_id,
-        "from": {
-            "scanLocation": from_node["scanLocation"], "coord": from_node["coord"],
-            "eventTime": int(time_info["start"].timestamp()), "businessStep": from_node["businessStep"]
-        },
-        "to": {
-            "scanLocation": to_node["scanLocation"], "coord": to_node["coord"],
-            "eventTime": int(time_info["end"].timestamp()), "businessStep": to_node["businessStep"]
-        },
-        "epcCode": epc_info["code"], "productName": epc_info["product"], "epcLot": epc_info["lot"],
-        "eventType": "출고",
-        "anomaly": anomaly_info["percent"],
-        "anomalyTypeList": [anomaly_info["type"]] if anomaly_info["type"] else [],
-        "description": " ".join(description_parts)
-    }
+    """단일 트립 객체(records.Trip, dict 처럼 읽히고 직렬화 시 dict 로 변환)를 생성하는 헬퍼 함수"""
+    return Trip(
+        road_id, from_node, to_node,
+        int(time_info["start"].timestamp()), int(time_info["end"].timestamp()),
+        epc_info["code"], epc_info["product"], epc_info["lot"],
+        anomaly_info["percent"], anomaly_info["type"],
+        describe_anomaly(anomaly_info["type"], anomaly_info["percent"])
+    )
+
+def trip_sort_key(trip):
+    """최종 출력 정렬 기준 (from.eventTime)"""
+    if type(trip) is Trip:
+        return trip.from_time
+    return trip["from"]["eventTime"]
+
+def trip_end_time(trip):
+    """트립의 도착 시각 (to.eventTime, epoch 초)"""
+    if type(trip) is Trip:
+        return trip.to_time
+    return trip["to"]["eventTime"]
+
+def scenario_type(trip):
+    """트립의 시나리오 유형 (normal / clone / fake / tamper / rule_violation, 계측용)"""
+    if type(trip) is Trip:
+        anomaly_type, percent = trip.anomaly_type, trip.anomaly
+    else:
+        types = trip["anomalyTypeList"]
+        anomaly_type, percent = types[0] if types else None, trip["anomaly"]
+    if anomaly_type:
+        return anomaly_type
+    return "rule_violation" if percent else "normal"
 
 # 3. 이상 시나리오 생성 함수 (로직 대폭 수정)
 # =================================
 
-def generate_all_anomaly_trips(num_trips_target):
-    all_trips = []
-    road_id_counter = 1
-    epc_counter = 695
+def iter_anomaly_trips(num_trips_target, rng=random, road_id_start=1, epc_start=EPC_START,
+                       start_time=START_TIME, max_clone_sets=MAX_CLONE_SETS, make_trip=create_trip):
+    """이상 트립을 생성 순서대로 하나씩 돌려주는 제너레이터
+
+    rng 를 지정하지 않으면 전역 random 모듈을 사용합니다. 샤드별로 생성할 때는
+    샤드마다 별도의 random.Random 과 겹치지 않는 roadId/EPC/시간 시작값을 넘깁니다.
+    트립 레코드는 make_trip(create_trip 과 같은 인자, 계측 시에는 감싼 함수)으로 만듭니다.
+    """
+    trip_count = 0
+    road_id_counter = road_id_start
+    epc_counter = epc_start
     clone_set_count = 0
-    start_time = datetime(2024, 1, 1, 9, 0, 0)
     
-    while len(all_trips) < num_trips_target:
+    while trip_count < num_trips_target:
         # 시나리오 결정
-        if clone_set_count < 4 and random.random() < 0.1: # 약 10% 확률로 복제 시나리오 생성
+        if clone_set_count < max_clone_sets and rng.random() < 0.1: # 약 10% 확률로 복제 시나리오 생성
             scenario_type = 'clone'
             clone_set_count += 1
         else:
-            scenario_type = random.choice(['fake', 'tamper', 'rule_violation'])
+            scenario_type = rng.choice(['fake', 'tamper', 'rule_violation'])
         
         # --- 시나리오별 단일 또는 그룹 이상 트립 생성 ---
         
         if scenario_type == 'clone':
             epc_code = f"1.880.123.{epc_counter}"
-            product_name = random.choice(PRODUCTS)
-            epc_lot = f"LOT-C-{random.randint(1000, 9999)}"
+            product_name = rng.choice(PRODUCTS)
+            epc_lot = f"LOT-C-{rng.randint(1000, 9999)}"
             
             # 2~3개의 복제 트립 생성
-            num_clones = random.randint(2, 3)
+            num_clones = rng.randint(2, 3)
             # 서로 다른 출발지와 도착지 선택
-            node_pairs = random.sample(list(node_map.values()), k=num_clones * 2)
+            node_pairs = rng.sample(list(node_map.values()), k=num_clones * 2)
 
             for i in range(num_clones):
-                if len(all_trips) >= num_trips_target: break
+                if trip_count >= num_trips_target: break
                 
                 from_node = node_pairs[i*2]
                 to_node = node_pairs[i*2+1]
                 
                 # 시간은 거의 동시간대로 설정
-                current_time = start_time + timedelta(minutes=random.randint(0, 30))
-                duration = timedelta(hours=random.uniform(2, 5))
+                current_time = start_time + timedelta(minutes=rng.randint(0, 30))
+                duration = timedelta(hours=rng.uniform(2, 5))
                 
                 # 모든 복제 트립은 anomalyTypeList에 'clone'이 있고, anomaly 수치도 높음
-                anomaly_info = {"type": "clone", "percent": random.randint(70, 100)}
+                anomaly_info = {"type": "clone", "percent": rng.randint(70, 100)}
 
-                all_trips.append(create_trip(
+                yield make_trip(
                     road_id_counter, from_node, to_node,
                     {"code": epc_code, "product": product_name, "lot": epc_lot},
                     {"start": current_time, "end": current_time + duration},
                     anomaly_info
-                ))
+                )
+                trip_count += 1
                 road_id_counter += 1
             epc_counter += 1
             start_time += timedelta(days=1) # 다음 복제 세트는 다른 날짜에
@@ -168,66 +138,372 @@ def generate_all_anomaly_trips(num_trips_target):
         # 출발지/도착지 및 EPC 결정
         if scenario_type == 'rule_violation':
             # 물류 흐름 위반 경로 생성
-            violation = random.choice(['reverse', 'hop', 'forbidden'])
+            violation = rng.choice(['reverse', 'hop', 'forbidden'])
             if violation == 'reverse':
-                from_node = random.choice(nodes_by_step["Wholesaler"])
-                to_node = random.choice(nodes_by_step["LogiHub"])
+                from_node = rng.choice(nodes_by_step["Wholesaler"])
+                to_node = rng.choice(nodes_by_step["LogiHub"])
             elif violation == 'hop':
-                from_node = random.choice(nodes_by_step["LogiHub"])
-                to_node = random.choice(nodes_by_step["Reseller"])
+                from_node = rng.choice(nodes_by_step["LogiHub"])
+                to_node = rng.choice(nodes_by_step["Reseller"])
             else: # forbidden
-                from_node, to_node = random.sample(nodes_by_step["Reseller"], 2)
+                from_node, to_node = rng.sample(nodes_by_step["Reseller"], 2)
             epc_code = f"1.880.123.{epc_counter}"
         elif scenario_type == 'fake':
-            from_node, to_node = random.sample(list(node_map.values()), 2)
-            epc_code = f"1.880.123.{random.randint(10000, 99999)}"
+            from_node, to_node = rng.sample(list(node_map.values()), 2)
+            epc_code = f"1.880.123.{rng.randint(10000, 99999)}"
         else: # tamper
-            from_node, to_node = random.sample(list(node_map.values()), 2)
-            epc_code = f"2.{random.randint(100, 999)}.{random.randint(100, 999)}.{random.randint(1000, 9999)}"
+            from_node, to_node = rng.sample(list(node_map.values()), 2)
+            epc_code = f"2.{rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(1000, 9999)}"
 
-        product_name = random.choice(PRODUCTS)
-        epc_lot = f"LOT-A-{random.randint(1000, 9999)}"
+        product_name = rng.choice(PRODUCTS)
+        epc_lot = f"LOT-A-{rng.randint(1000, 9999)}"
 
         # **핵심 로직**: 모든 트립이 이상 조건을 만족하도록 보장
         anomaly_info = {}
         if scenario_type == 'rule_violation':
             # 규칙 위반은 타입 없이 높은 anomaly 수치만 가짐
             anomaly_info["type"] = None
-            anomaly_info["percent"] = random.randint(50, 100)
+            anomaly_info["percent"] = rng.randint(50, 100)
         else: # fake, tamper
             # 타입은 항상 존재
             anomaly_info["type"] = scenario_type
             # 70% 확률로 높은 anomaly 수치도 함께 가짐
-            if random.random() < 0.7:
-                anomaly_info["percent"] = random.randint(50, 100)
+            if rng.random() < 0.7:
+                anomaly_info["percent"] = rng.randint(50, 100)
             else:
-                anomaly_info["percent"] = random.randint(10, 49)
+                anomaly_info["percent"] = rng.randint(10, 49)
 
-        duration = timedelta(hours=random.uniform(5, 10))
-        all_trips.append(create_trip(
+        duration = timedelta(hours=rng.uniform(5, 10))
+        yield make_trip(
             road_id_counter, from_node, to_node,
             {"code": epc_code, "product": product_name, "lot": epc_lot},
             {"start": start_time, "end": start_time + duration},
             anomaly_info
-        ))
+        )
 
+        trip_count += 1
         road_id_counter += 1
         epc_counter += 1
-        start_time += timedelta(hours=random.randint(1, 3))
+        start_time += timedelta(hours=rng.randint(1, 3))
     
-    return all_trips
 
-# 4. 메인 실행
+def iter_profile_trips(profile, num_trips_target, rng=random, road_id_start=1, epc_start=EPC_START,
+                       start_time=START_TIME, rate_scale=1.0, max_clone_sets=None, make_trip=create_trip):
+    """부하 프로필(profiles.LoadProfile)에 따라 정상 / 이상 트립을 시작 시각 순으로 돌려주는 제너레이터
+
+    트립 시작 시각은 프로필의 시간대 / 요일 곡선과 버스트를 따르는 도착 과정에서 받고,
+    anomalyRate 확률로 이상 시나리오(scenarioWeights)를, 나머지는 정상 물류 흐름 트립을
+    만듭니다. 시나리오, 거점, 상품은 모두 별칭 표에서 O(1) 에 뽑습니다.
+    max_clone_sets 를 지정하지 않으면 프로필의 maxCloneSets(null 이면 무제한)를 따릅니다.
+    트립 레코드는 iter_anomaly_trips 와 같이 make_trip 으로 만듭니다.
+    """
+    if max_clone_sets is None:
+        max_clone_sets = profile.max_clone_sets
+    products = profile.product_table(PRODUCTS)
+    anomaly_rate = profile.anomaly_rate
+    next_step = TOPOLOGY.next_step
+    factory_to_wms = TOPOLOGY.factory_to_wms
+    normal_hours = profile.duration_hours["normal"]
+    anomaly_hours = profile.duration_hours["anomaly"]
+    clone_hours = profile.duration_hours["clone"]
+    clone_min, clone_max = profile.clones_per_set
+    trip_count = 0
+    road_id_counter = road_id_start
+    epc_counter = epc_start
+    clone_set_count = 0
+
+    for arrival, hubs in profile.iter_arrivals(start_time, rng, rate_scale):
+        if trip_count >= num_trips_target:
+            break
+        scenario_type = profile.scenarios.sample(rng) if rng.random() < anomaly_rate else "normal"
+        if scenario_type == "clone" and max_clone_sets is not None and clone_set_count >= max_clone_sets:
+            # 복제 세트 한도에 도달하면 나머지 이상 시나리오 중에서 다시 뽑음
+            scenario_type = profile.single_scenarios.sample(rng) if profile.single_scenarios else "normal"
+
+        if scenario_type == "normal":
+            # 정상 흐름: 다음 단계의 노드로 이동 (공장은 매핑된 공장 창고로)
+            from_node = hubs.sources.sample(rng)
+            to_node = factory_to_wms.get(from_node["scanLocation"]) if from_node["businessStep"] == "Factory" else None
+            if to_node is None:
+                to_node = hubs.step(next_step[from_node["businessStep"]]).sample(rng)
+            duration = timedelta(hours=rng.uniform(*normal_hours))
+            yield make_trip(
+                road_id_counter, from_node, to_node,
+                {"code": f"1.880.123.{epc_counter}", "product": products.sample(rng),
+                 "lot": f"LOT-N-{rng.randint(1000, 9999)}"},
+                {"start": arrival, "end": arrival + duration},
+                {"type": None, "percent": 0}
+            )
+            trip_count += 1
+            road_id_counter += 1
+            epc_counter += 1
+            continue
+
+        if scenario_type == "clone":
+            clone_set_count += 1
+            epc_code = f"1.880.123.{epc_counter}"
+            product_name = products.sample(rng)
+            epc_lot = f"LOT-C-{rng.randint(1000, 9999)}"
+            num_clones = rng.randint(clone_min, clone_max)
+            node_pairs = hubs.nodes.sample_distinct(rng, num_clones * 2)
+            for i in range(num_clones):
+                if trip_count >= num_trips_target:
+                    break
+                current_time = arrival + timedelta(minutes=rng.randint(0, 30))
+                duration = timedelta(hours=rng.uniform(*clone_hours))
+                yield make_trip(
+                    road_id_counter, node_pairs[i*2], node_pairs[i*2+1],
+                    {"code": epc_code, "product": product_name, "lot": epc_lot},
+                    {"start": current_time, "end": current_time + duration},
+                    {"type": "clone", "percent": rng.randint(70, 100)}
+                )
+                trip_count += 1
+                road_id_counter += 1
+            epc_counter += 1
+            continue
+
+        # fake, tamper, rule_violation: iter_anomaly_trips 와 같은 규칙, 거점만 가중치로 추출
+        if scenario_type == "rule_violation":
+            violation = profile.violations.sample(rng)
+            if violation == "reverse":
+                from_node = hubs.step("Wholesaler").sample(rng)
+                to_node = hubs.step("LogiHub").sample(rng)
+            elif violation == "hop":
+                from_node = hubs.step("LogiHub").sample(rng)
+                to_node = hubs.step("Reseller").sample(rng)
+            else: # forbidden
+                from_node, to_node = hubs.step("Reseller").sample_distinct(rng, 2)
+            epc_code = f"1.880.123.{epc_counter}"
+            anomaly_info = {"type": None, "percent": rng.randint(50, 100)}
+        else:
+            from_node, to_node = hubs.nodes.sample_distinct(rng, 2)
+            if scenario_type == "fake":
+                epc_code = f"1.880.123.{rng.randint(10000, 99999)}"
+            else: # tamper
+                epc_code = f"2.{rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(1000, 9999)}"
+            percent = rng.randint(50, 100) if rng.random() < 0.7 else rng.randint(10, 49)
+            anomaly_info = {"type": scenario_type, "percent": percent}
+
+        duration = timedelta(hours=rng.uniform(*anomaly_hours))
+        yield make_trip(
+            road_id_counter, from_node, to_node,
+            {"code": epc_code, "product": products.sample(rng), "lot": f"LOT-A-{rng.randint(1000, 9999)}"},
+            {"start": arrival, "end": arrival + duration},
+            anomaly_info
+        )
+        trip_count += 1
+        road_id_counter += 1
+        epc_counter += 1
+
+
+def generate_all_anomaly_trips(num_trips_target, profile=None):
+    """트립 전체를 리스트로 생성합니다. (소량 데이터용, profile 이 있으면 부하 프로필을 따름)"""
+    if profile is not None:
+        return list(iter_profile_trips(profile, num_trips_target))
+    return list(iter_anomaly_trips(num_trips_target))
+
+# 4. 샤드 단위 병렬 생성
 # =================================
+
+class ShardSpec(NamedTuple):
+    """샤드 하나가 생성할 트립 범위"""
+    index: int
+    count: int
+    seed: str
+    road_id_start: int
+    epc_start: int
+    start_time: datetime
+    max_clone_sets: Optional[int]   # None 이면 제한 없음 (부하 프로필의 maxCloneSets: null)
+    rate_scale: float = 1.0     # 부하 프로필 사용 시 도착 과정의 발생률 배수
+
+
+def plan_shards(num_trips_target, shard_count, seed, road_id_start=1, epc_start=EPC_START, profile=None,
+                start_time=START_TIME):
+    """전체 목표 개수를 샤드로 나누고, 샤드마다 겹치지 않는 roadId/EPC/시간 구간을 배정합니다.
+
+    부하 프로필이 있으면 모든 샤드가 같은 달력 구간을 트립 수에 비례한 발생률로 생성합니다.
+    (포아송 과정을 합치면 다시 포아송 과정이므로, 합친 결과는 프로필의 곡선을 그대로 따름)
+    """
+    shard_count = max(1, min(shard_count, num_trips_target))
+    base, extra = divmod(num_trips_target, shard_count)
+    max_clone_sets = MAX_CLONE_SETS if profile is None else profile.max_clone_sets
+    clone_base, clone_extra = divmod(max_clone_sets or 0, shard_count)
+
+    # 트립 하나당 roadId/EPC 는 최대 1씩 쓰므로, 샤드의 트립 수만큼 구간을 예약
+    road_ids = IdAllocator(road_id_start)
+    epc_serials = IdAllocator(epc_start)
+    specs = []
+    shard_start = start_time
+    for i in range(shard_count):
+        count = base + (1 if i < extra else 0)
+        clone_sets = clone_base + (1 if i < clone_extra else 0) if max_clone_sets is not None else None
+        specs.append(ShardSpec(
+            index=i, count=count, seed=f"{seed}:{i}",
+            road_id_start=road_ids.reserve(count).start, epc_start=epc_serials.reserve(count).start,
+            start_time=shard_start, max_clone_sets=clone_sets, rate_scale=count / num_trips_target,
+        ))
+        if profile is None:
+            # 시간은 트립 하나당 최대 MAX_TRIP_TIME_STEP 만큼 진행
+            shard_start += count * MAX_TRIP_TIME_STEP + clone_sets * CLONE_SET_TIME_STEP
+    return specs
+
+
+def generate_shard(spec, run_dir, run_size=DEFAULT_RUN_SIZE, backend="python", profile_path=None):
+    """샤드 하나를 생성해 from.eventTime 순으로 정렬된 NDJSON 런 파일로 기록합니다."""
+    shard_options = dict(
+        road_id_start=spec.road_id_start, epc_start=spec.epc_start,
+        start_time=spec.start_time, max_clone_sets=spec.max_clone_sets,
+    )
+    run_path = os.path.join(run_dir, f"shard-{spec.index:05d}.ndjson")
+    if backend == "numpy":
+        from vector_backend import iter_vectorized_trips
+        # numpy 엔진은 이미 from.eventTime 순으로 생성하므로 정렬이 필요 없음
+        write_ndjson(run_path, iter_vectorized_trips(spec.count, spec.seed, **shard_options))
+    elif profile_path is not None:
+        # 작업 프로세스마다 프로필과 별칭 표를 한 번만 만듦
+        trips = iter_profile_trips(load_profile(profile_path), spec.count, rng=random.Random(spec.seed),
+                                   rate_scale=spec.rate_scale, **shard_options)
+        write_ndjson(run_path, external_sort(trips, key=trip_sort_key, run_size=run_size, tmpdir=run_dir))
+    else:
+        trips = iter_anomaly_trips(spec.count, rng=random.Random(spec.seed), **shard_options)
+        write_ndjson(run_path, external_sort(trips, key=trip_sort_key, run_size=run_size, tmpdir=run_dir))
+    return run_path
+
+
+def iter_sharded_trips(num_trips_target, shard_count, seed, workers=None, run_size=DEFAULT_RUN_SIZE,
+                       tmpdir=None, backend="python", road_id_start=1, epc_start=EPC_START, profile_path=None,
+                       start_time=START_TIME):
+    """샤드들을 프로세스 풀에서 생성한 뒤 from.eventTime 순으로 병합해 돌려줍니다.
+
+    같은 seed 와 shard_count 이면 workers 수와 관계없이 항상 같은 결과를 냅니다.
+    profile_path 를 지정하면 부하 프로필로 생성합니다. (python 엔진만 지원)
+    """
+    if profile_path is not None and backend != "python":
+        raise ValueError("부하 프로필(--load-profile)은 python 엔진에서만 사용할 수 있습니다.")
+    profile = load_profile(profile_path) if profile_path is not None else None
+    specs = plan_shards(num_trips_target, shard_count, seed, road_id_start, epc_start, profile, start_time)
+    n = len(specs)
+    with tempfile.TemporaryDirectory(prefix="trip-shards-", dir=tmpdir) as run_dir:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            run_paths = list(pool.map(generate_shard, specs, [run_dir] * n, [run_size] * n, [backend] * n,
+                                      [profile_path] * n))
+        yield from heapq.merge(*(iter_ndjson(p) for p in run_paths), key=trip_sort_key)
+
+
+# 5. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="보장된 이상 트립 데이터를 생성합니다.")
+    parser.add_argument("-n", "--count", type=int, default=60, help="생성할 트립 수")
+    parser.add_argument("-o", "--output", default="guaranteed_anomaly_trips.json", help="출력 파일 이름")
+    parser.add_argument("--format", choices=["json", "ndjson", "parquet", "arrow"],
+                        help="출력 형식 (기본값: 확장자로 판별, parquet/arrow 는 날짜별 파티션 디렉터리로 기록)")
+    parser.add_argument("--partition", choices=["date", "month", "none"], default="month",
+                        help="parquet/arrow 출력의 파티션 단위")
+    parser.add_argument("--chunk-size", type=int, help="json 형식일 때 파일 하나에 담을 트립 수")
+    parser.add_argument("--json-style", choices=["pretty", "compact"], default="pretty",
+                        help="json 형식의 들여쓰기 (compact: 공백 없이 기록, ndjson 은 항상 compact)")
+    parser.add_argument("--json-backend", choices=["auto", "json", "orjson"], default="auto",
+                        help="JSON 인코더 (auto: orjson 이 설치되어 있으면 사용, 결과 바이트는 동일)")
+    parser.add_argument("--compress", choices=["none", "gzip", "zstd"],
+                        help="json/ndjson 출력 압축 (기본값: 확장자 .gz/.zst 로 판별, 확장자가 없으면 붙임)")
+    parser.add_argument("--workers", type=int, default=1, help="트립을 병렬로 생성할 프로세스 수")
+    parser.add_argument("--shards", type=int, help="나눌 샤드 수 (기본값: --workers 와 동일)")
+    parser.add_argument("--seed", help="샤드별 난수 시드의 기준값 (지정하면 결과가 항상 동일)")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="트립 생성 엔진 (numpy: 배치 단위 벡터 연산, numpy 설치 필요)")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE, help="외부 정렬 시 메모리에서 정렬할 트립 수")
+    parser.add_argument("--id-ledger",
+                        help="roadId / EPC 일련번호 구간을 예약할 원장 파일 (여러 번 실행해도 id 가 겹치지 않음, 증분 이력용)")
+    parser.add_argument("--start-time", type=datetime.fromisoformat,
+                        help="첫 트립의 시작 시각 (ISO 형식, 예: 2024-03-01T09:00:00, 기본값: --id-ledger 에 기록된 "
+                             "다음 시작 시각 또는 2024-01-01T09:00:00)")
+    parser.add_argument("--load-profile",
+                        help="부하 프로필 JSON (정상/이상 비율, 시간대/요일 곡선, 거점 가중치, 버스트, 예: load_profile.json, python 엔진만 지원)")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    generated_trips = generate_all_anomaly_trips(60)
-    
-    # from.eventTime 순으로 최종 정렬
-    sorted_trips = sorted(generated_trips, key=lambda x: x["from"]["eventTime"])
+    args = parse_args()
+    args.output = with_compression_extension(args.output, args.compress)
+    # roadId / EPC 일련번호: 원장이 있으면 이번 실행에 쓸 구간을 예약 (트립 하나당 최대 1씩 사용)
+    # 시작 시각: --start-time > 원장의 다음 시작 시각 > START_TIME
+    road_id_start, epc_start = 1, EPC_START
+    start_time = args.start_time or START_TIME
+    ledger = None
+    if args.id_ledger:
+        try:
+            ledger = IdLedger(args.id_ledger)
+            road_id_start = ledger.reserve("roadId", args.count).start
+            epc_start = ledger.reserve("epcSerial", args.count, start=EPC_START).start
+            if args.start_time is None:
+                start_time = datetime.fromtimestamp(ledger.get(LEDGER_START_TIME, int(START_TIME.timestamp())))
+        except ValueError as e:
+            print(f"오류: {e}")
+            exit()
+    profile = None
+    try:
+        if args.load_profile:
+            if args.backend != "python":
+                raise ValueError("부하 프로필(--load-profile)은 python 엔진에서만 사용할 수 있습니다.")
+            profile = load_profile(args.load_profile)
+        metrics = metrics_from_args("create", args)
+    except FileNotFoundError:
+        print(f"오류: '{args.load_profile}' 파일을 찾을 수 없습니다.")
+        exit()
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit()
+    # 계측 중에는 create_trip 호출도 단계로 잼 (샤드 생성은 자식 프로세스에서 하므로 제외)
+    timed_create_trip = metrics.wrap("create_trip", create_trip)
+    count_scenario = lambda trip: metrics.count("tripsByScenario", scenario_type(trip))
+    metrics.start()
+
+    # 생성 -> from.eventTime 순 외부 정렬 -> 파일 기록까지 스트리밍으로 처리
+    shard_count = args.shards or args.workers
+    if shard_count > 1 or args.seed is not None or args.backend == "numpy":
+        seed = args.seed if args.seed is not None else random.randrange(2**32)
+        # 샤드는 자식 프로세스에서 생성 / 정렬되므로, 병합된 결과를 받는 시간만 잼
+        sorted_trips = iter_sharded_trips(args.count, shard_count, seed, workers=args.workers,
+                                          run_size=args.run_size, backend=args.backend,
+                                          road_id_start=road_id_start, epc_start=epc_start,
+                                          profile_path=args.load_profile, start_time=start_time)
+        sorted_trips = metrics.timed_iter("shards", sorted_trips, each=count_scenario)
+    elif profile is not None:
+        generated_trips = iter_profile_trips(profile, args.count, road_id_start=road_id_start, epc_start=epc_start,
+                                             start_time=start_time, make_trip=timed_create_trip)
+        generated_trips = metrics.timed_iter("generate", generated_trips, each=count_scenario)
+        sorted_trips = metrics.timed_iter("sort", external_sort(generated_trips, key=trip_sort_key, run_size=args.run_size))
+    else:
+        generated_trips = iter_anomaly_trips(args.count, road_id_start=road_id_start, epc_start=epc_start,
+                                             start_time=start_time, make_trip=timed_create_trip)
+        generated_trips = metrics.timed_iter("generate", generated_trips, each=count_scenario)
+        sorted_trips = metrics.timed_iter("sort", external_sort(generated_trips, key=trip_sort_key, run_size=args.run_size))
+    # 원장이 있으면 이번 실행의 마지막 도착 시각을 기록해, 다음 실행은 그 뒤에서 시작
+    run_end = {"time": None}
+    def track_end_time(trips):
+        for trip in trips:
+            end = trip_end_time(trip)
+            if run_end["time"] is None or end > run_end["time"]:
+                run_end["time"] = end
+            yield trip
+    if ledger is not None:
+        sorted_trips = track_end_time(sorted_trips)
+    try:
+        with metrics.stage("write") as stage:
+            trip_count = write_records(args.output, sorted_trips, fmt=args.format,
+                                       chunk_size=args.chunk_size, style=args.json_style, partition=args.partition,
+                                       encoder=get_encoder(args.json_backend), compression=args.compress)
+            stage["items"] = trip_count
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
 
-    # JSON 파일로 저장
-    output_data = {"data": sorted_trips}
-    with open("guaranteed_anomaly_trips.json", "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    if ledger is not None and run_end["time"] is not None:
+        ledger.advance(LEDGER_START_TIME, run_end["time"] + int(LEDGER_TIME_GAP.total_seconds()))
 
-    print(f"✅ 완료: {len(sorted_trips)}개의 '보장된 이상 트립' 데이터가 'guaranteed_anomaly_trips.json' 파일로 저장되었습니다.")
\ No newline at end of file
+    label = "부하 프로필 트립" if profile is not None else "보장된 이상 트립"
+    print(f"✅ 완료: {trip_count}개의 '{label}' 데이터가 '{args.output}' 파일로 저장되었습니다.")
+    metrics.finish({"trips": trip_count, "output": args.output})
+    if args.metrics:
+        print(f"✅ 측정 결과를 '{args.metrics}' 파일로 저장했습니다.")
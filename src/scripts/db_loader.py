@@ -0,0 +1,423 @@
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import unquote, urlsplit
+
+try:
+    import pymysql
+except ImportError:  # pymysql 은 선택 의존성 (mysql:// 대상에 적재할 때만 필요)
+    pymysql = None
+
+from metrics import PipelineMetrics, add_metrics_arguments, metrics_from_args
+from streamio import iter_records
+
+# 생성 데이터의 데이터베이스 일괄 적재
+# =================================
+# create.py 의 트립과 generate_history.py 의 이벤트 이력 파일(json / ndjson, .gz / .zst)을
+# 스트리밍으로 읽어 데이터베이스의 Trip / EpcEvent 테이블에 큰 배치 단위로 넣습니다.
+# 테이블과 컬럼 이름은 Prisma 모델의 기본 매핑(모델 이름 = 테이블, 필드 이름 = 컬럼)을
+# 따르므로, 나중에 schema.prisma 에 같은 이름의 모델을 추가하면 그대로 읽을 수 있습니다.
+#
+#   - MySQL (schema.prisma 의 datasource, DATABASE_URL=mysql://...): pymysql 의 executemany 가
+#     배치를 여러 행짜리 INSERT 문으로 묶고, 연결 여러 개(--connections)가 배치를 나눠 넣습니다.
+#   - SQLite (sqlite:///경로 또는 .db / .sqlite 파일 경로): 로컬 확인용, 연결 하나
+#
+# MySQL 에서는 파일 읽기(JSON 디코딩)는 메인 스레드에서, INSERT 는 연결마다 하나씩인 작업
+# 스레드에서 실행되어 서로 겹칩니다. 보조 인덱스는 적재가 끝난 뒤에 만듭니다.
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_CONNECTIONS = 4
+SQLITE_CACHE_KIB = 262_144   # SQLite 페이지 캐시 (256MB)
+
+# 테이블 이름 -> 컬럼 (이름, SQLite 타입, MySQL 타입), 기본 키, 적재 후 만들 보조 인덱스
+TABLES = {
+    "Trip": {
+        "columns": [
+            ("roadId", "INTEGER", "BIGINT NOT NULL"),
+            ("epcCode", "TEXT", "VARCHAR(64) NOT NULL"),
+            ("productName", "TEXT", "VARCHAR(191)"),
+            ("epcLot", "TEXT", "VARCHAR(64)"),
+            ("eventType", "TEXT", "VARCHAR(64)"),
+            ("fromScanLocation", "TEXT", "VARCHAR(191) NOT NULL"),
+            ("fromBusinessStep", "TEXT", "VARCHAR(32) NOT NULL"),
+            ("fromLongitude", "REAL", "DOUBLE"),
+            ("fromLatitude", "REAL", "DOUBLE"),
+            ("fromEventTime", "INTEGER", "BIGINT NOT NULL"),
+            ("toScanLocation", "TEXT", "VARCHAR(191) NOT NULL"),
+            ("toBusinessStep", "TEXT", "VARCHAR(32) NOT NULL"),
+            ("toLongitude", "REAL", "DOUBLE"),
+            ("toLatitude", "REAL", "DOUBLE"),
+            ("toEventTime", "INTEGER", "BIGINT NOT NULL"),
+            ("anomaly", "INTEGER", "INT NOT NULL"),
+            ("anomalyTypeList", "TEXT", "JSON NOT NULL"),
+            ("description", "TEXT", "TEXT"),
+        ],
+        "primaryKey": "roadId",
+        "indexes": [("epcCode",), ("fromEventTime",)],
+    },
+    "EpcEvent": {
+        "columns": [
+            ("eventId", "INTEGER", "BIGINT NOT NULL"),
+            ("epcCode", "TEXT", "VARCHAR(64) NOT NULL"),
+            ("productName", "TEXT", "VARCHAR(191)"),
+            ("epcLot", "TEXT", "VARCHAR(64)"),
+            ("locationId", "INTEGER", "INT NOT NULL"),
+            ("scanLocation", "TEXT", "VARCHAR(191) NOT NULL"),
+            ("hubType", "TEXT", "VARCHAR(64)"),
+            ("businessStep", "TEXT", "VARCHAR(32) NOT NULL"),
+            ("eventType", "TEXT", "VARCHAR(64) NOT NULL"),
+            ("eventTime", "INTEGER", "BIGINT NOT NULL"),
+            ("anomaly", "INTEGER", "INT NOT NULL"),
+            ("anomalyTypeList", "TEXT", "JSON NOT NULL"),
+            ("description", "TEXT", "TEXT"),
+        ],
+        "primaryKey": "eventId",
+        "indexes": [("epcCode", "eventTime"), ("eventTime",), ("scanLocation", "eventTime")],
+    },
+}
+TABLE_ALIASES = {"trips": "Trip", "events": "EpcEvent"}
+
+
+# 적재 중 데이터베이스가 보고하는 오류 (기본 키 중복, 연결 실패 등)
+DATABASE_ERRORS = (sqlite3.Error,) + ((pymysql.MySQLError,) if pymysql is not None else ())
+
+
+def _require_pymysql():
+    if pymysql is None:
+        raise RuntimeError("pymysql 이 설치되어 있지 않습니다. 'pip install pymysql' 후 다시 실행해주세요.")
+
+
+# 1. 레코드 -> 행 변환
+# =================================
+
+def _type_list(types):
+    return json.dumps(types, ensure_ascii=False, separators=(",", ":")) if types else "[]"
+
+
+def trip_row(trip):
+    source, target = trip["from"], trip["to"]
+    return (
+        trip["roadId"], trip["epcCode"], trip.get("productName"), trip.get("epcLot"), trip.get("eventType"),
+        source["scanLocation"], source["businessStep"], source["coord"][0], source["coord"][1], source["eventTime"],
+        target["scanLocation"], target["businessStep"], target["coord"][0], target["coord"][1], target["eventTime"],
+        trip["anomaly"], _type_list(trip["anomalyTypeList"]), trip.get("description"),
+    )
+
+
+def event_row(event):
+    return (
+        event["eventId"], event["epcCode"], event.get("productName"), event.get("epcLot"), event["locationId"],
+        event["scanLocation"], event.get("hubType"), event["businessStep"], event["eventType"], event["eventTime"],
+        event["anomaly"], _type_list(event["anomalyTypeList"]), event.get("description"),
+    )
+
+
+ROW_BUILDERS = {"Trip": trip_row, "EpcEvent": event_row}
+
+
+def detect_table(record):
+    """첫 레코드의 필드로 대상 테이블을 정합니다."""
+    if "eventId" in record:
+        return "EpcEvent"
+    if "roadId" in record and "from" in record:
+        return "Trip"
+    raise ValueError("트립(roadId, from) 또는 이벤트(eventId) 레코드가 아닙니다. --table 로 지정해주세요.")
+
+
+# 2. 데이터베이스 대상
+# =================================
+
+class SqliteTarget:
+    """로컬 확인용 SQLite 파일 (쓰기는 한 번에 하나의 연결만 가능)"""
+    placeholder = "?"
+    max_connections = 1
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # 적재 중에는 fsync 를 생략 (중간에 실패하면 --mode replace 로 다시 적재)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+        return conn
+
+    def column_type(self, column):
+        return column[1]
+
+    def table_options(self):
+        return ""
+
+    def insert_verb(self, ignore_duplicates):
+        return "INSERT OR IGNORE" if ignore_duplicates else "INSERT"
+
+    def table_exists(self, conn, table):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+    def describe(self):
+        return f"sqlite:///{self.path}"
+
+
+class MysqlTarget:
+    """schema.prisma 의 datasource 와 같은 MySQL (DATABASE_URL)"""
+    placeholder = "%s"
+    max_connections = None
+
+    def __init__(self, host, port, user, password, database):
+        _require_pymysql()
+        self.options = dict(host=host, port=port, user=user, password=password, database=database,
+                            charset="utf8mb4", autocommit=False)
+
+    def connect(self):
+        conn = pymysql.connect(**self.options)
+        with conn.cursor() as cursor:
+            # 적재하는 세션에서만 고유 / 외래 키 검사를 미룸
+            cursor.execute("SET SESSION unique_checks = 0")
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+        return conn
+
+    def column_type(self, column):
+        return column[2]
+
+    def table_options(self):
+        return " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+
+    def insert_verb(self, ignore_duplicates):
+        return "INSERT IGNORE" if ignore_duplicates else "INSERT"
+
+    def table_exists(self, conn, table):
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE %s", (table,))
+            return cursor.fetchone() is not None
+
+    def describe(self):
+        return f"mysql://{self.options['host']}:{self.options['port']}/{self.options['database']}"
+
+
+def open_target(url):
+    """DATABASE_URL 형식의 주소(mysql://, sqlite:///) 또는 SQLite 파일 경로로 대상을 만듭니다."""
+    parts = urlsplit(url)
+    if parts.scheme in ("mysql", "mysql+pymysql"):
+        return MysqlTarget(parts.hostname or "localhost", parts.port or 3306, unquote(parts.username or ""),
+                           unquote(parts.password or ""), parts.path.lstrip("/"))
+    if parts.scheme == "sqlite":
+        return SqliteTarget(url[len("sqlite:///"):] if url.startswith("sqlite:///") else parts.path)
+    if not parts.scheme or parts.scheme == "file":
+        return SqliteTarget(parts.path if parts.scheme else url)
+    raise ValueError(f"지원하지 않는 데이터베이스 주소입니다: {parts.scheme}:// (mysql:// 또는 sqlite:/// 사용)")
+
+
+def _quote(name):
+    # 백틱은 MySQL 과 SQLite 모두에서 식별자 따옴표로 쓸 수 있음
+    return f"`{name}`"
+
+
+# 3. 적재
+# =================================
+
+class _WriterPool:
+    """작업 스레드마다 연결 하나를 열어 배치를 나눠 INSERT 하는 연결 풀
+
+    연결이 하나뿐이면(SQLite 등) 스레드를 거치지 않고 호출한 스레드에서 바로 INSERT 합니다.
+    (sqlite3 는 행을 바인딩하는 동안 GIL 을 잡고 있어, 스레드로 넘기면 오히려 느려짐)
+    """
+
+    def __init__(self, target, sql, connections):
+        self.target = target
+        self.sql = sql
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = None
+        if connections > 1:
+            self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="db-writer")
+        self._pending = set()
+        self._max_pending = connections * 2   # 읽기가 INSERT 보다 너무 앞서지 않도록
+        self.rows = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.target.connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _insert(self, rows):
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(self.sql, rows)
+            # 실제로 들어간 행 수 (중복을 건너뛰면 배치 크기보다 작음)
+            inserted = cursor.rowcount if cursor.rowcount >= 0 else len(rows)
+        finally:
+            cursor.close()
+        conn.commit()
+        return inserted
+
+    def _record(self, inserted):
+        self.rows += inserted
+
+    def submit(self, rows):
+        if self._executor is None:
+            self._record(self._insert(rows))
+            return
+        if len(self._pending) >= self._max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._record(future.result())   # INSERT 중 오류가 나면 여기서 다시 발생
+        self._pending.add(self._executor.submit(self._insert, rows))
+
+    def close(self):
+        try:
+            for future in self._pending:
+                self._record(future.result())
+        finally:
+            self._pending = set()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            for conn in self._connections:
+                conn.close()
+
+
+def _create_table(target, conn, table):
+    spec = TABLES[table]
+    columns = ", ".join(f"{_quote(column[0])} {target.column_type(column)}" for column in spec["columns"])
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE TABLE {_quote(table)} ({columns}, PRIMARY KEY ({_quote(spec['primaryKey'])})){target.table_options()}")
+    cursor.close()
+    conn.commit()
+
+
+def _create_indexes(target, conn, table):
+    cursor = conn.cursor()
+    for columns in TABLES[table]["indexes"]:
+        name = f"{table}_{'_'.join(columns)}_idx"
+        cursor.execute(f"CREATE INDEX {_quote(name)} ON {_quote(table)} ({', '.join(_quote(c) for c in columns)})")
+    cursor.close()
+    conn.commit()
+
+
+def load_records(records, target, table=None, batch_size=DEFAULT_BATCH_SIZE, connections=DEFAULT_CONNECTIONS,
+                 mode="create", ignore_duplicates=False, metrics=None):
+    """레코드 스트림을 target 의 테이블에 배치 단위로 적재하고, (테이블 이름, 행 수)를 돌려줍니다.
+
+    mode="create" 는 테이블을 보조 인덱스 없이 새로 만든 뒤, 적재가 끝나면 인덱스를 만듭니다.
+    테이블이 이미 있으면 지우지 않고 ValueError 를 발생시킵니다. mode="replace" 는 기존 테이블을
+    지우고 create 와 같이 다시 만들고, mode="append" 는 기존 테이블에 이어서 넣습니다.
+    (테이블이 없으면 create 와 같음)
+    레코드가 없으면 데이터베이스에 연결하지 않고 바로 돌려주며, table 을 지정하지 않았으면
+    판별할 레코드가 없으므로 ValueError 를 발생시킵니다.
+    """
+    metrics = metrics or PipelineMetrics("db_loader", enabled=False)
+    table = TABLE_ALIASES.get(table, table)
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        if table is None:
+            raise ValueError("적재할 레코드가 없어 대상 테이블을 판별할 수 없습니다.")
+        return table, 0
+    table = table or detect_table(first)
+    build_row = ROW_BUILDERS[table]
+
+    conn = target.connect()
+    try:
+        exists = target.table_exists(conn, table)
+        if exists and mode == "create":
+            raise ValueError(f"{table} 테이블이 이미 있습니다. 기존 테이블에 추가하려면 --mode append, "
+                             f"지우고 다시 적재하려면 --mode replace 를 지정해주세요.")
+        created = mode == "replace" or not exists
+        if created:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+            cursor.close()
+            _create_table(target, conn, table)
+
+        columns = TABLES[table]["columns"]
+        sql = (f"{target.insert_verb(ignore_duplicates)} INTO {_quote(table)} "
+               f"({', '.join(_quote(c[0]) for c in columns)}) VALUES ({', '.join([target.placeholder] * len(columns))})")
+        pool = _WriterPool(target, sql, min(connections, target.max_connections or connections))
+        # 행 변환과 INSERT (연결이 여럿이면 작업 스레드의 INSERT 를 기다린 시간) 를 한 단계로 잼
+        with metrics.stage("insert") as stage:
+            try:
+                rows = map(build_row, itertools.chain([first], records))
+                while True:
+                    batch = list(itertools.islice(rows, batch_size))
+                    if not batch:
+                        break
+                    pool.submit(batch)
+            finally:
+                pool.close()
+            stage["items"] = pool.rows
+
+        if created:
+            with metrics.stage("index"):
+                _create_indexes(target, conn, table)
+    finally:
+        conn.close()
+    return table, pool.rows
+
+
+# 4. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="생성한 트립 / 이벤트 이력 파일을 데이터베이스에 일괄 적재합니다.")
+    parser.add_argument("-i", "--input", default="full_epc_history.ndjson", help="입력 파일 이름 (json 또는 ndjson, .gz / .zst 가능)")
+    parser.add_argument("--input-format", choices=["json", "ndjson"], help="입력 형식 (기본값: 확장자로 판별)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="mysql://사용자:비밀번호@호스트:포트/DB 또는 sqlite:///파일.db (기본값: DATABASE_URL 환경 변수)")
+    parser.add_argument("--table", choices=["trips", "events"], help="대상 테이블 (기본값: 첫 레코드로 판별)")
+    parser.add_argument("--mode", choices=["create", "append", "replace"], default="create",
+                        help="create: 테이블을 새로 만들고 적재 후 인덱스 생성 (이미 있으면 오류), "
+                             "append: 기존 테이블에 추가, replace: 기존 테이블을 지우고 다시 만듦")
+    parser.add_argument("--ignore-duplicates", action="store_true", help="기본 키가 이미 있는 행은 건너뜀 (append 재실행용)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="INSERT 한 번에 넣을 행 수")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help="동시에 INSERT 할 연결 수 (SQLite 는 항상 1)")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.database_url:
+        print("오류: --database-url 또는 DATABASE_URL 환경 변수로 적재할 데이터베이스를 지정해주세요.")
+        exit()
+    try:
+        open(args.input, "rb").close()
+    except FileNotFoundError:
+        print(f"오류: '{args.input}' 파일을 찾을 수 없습니다. create.py / generate_history.py 로 먼저 생성해주세요.")
+        exit()
+    try:
+        target = open_target(args.database_url)
+        metrics = metrics_from_args("db_loader", args)
+    except (RuntimeError, ValueError) as e:
+        print(f"오류: {e}")
+        exit()
+
+    metrics.start()
+    started = time.perf_counter()
+    records = metrics.timed_iter("read", iter_records(args.input, args.input_format))
+    try:
+        table, row_count = load_records(records, target, table=args.table, batch_size=args.batch_size,
+                                        connections=args.connections, mode=args.mode,
+                                        ignore_duplicates=args.ignore_duplicates, metrics=metrics)
+    except DATABASE_ERRORS as e:
+        print(f"오류: 적재 중 데이터베이스 오류가 발생했습니다. ({type(e).__name__}: {e})")
+        exit(1)
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
+    seconds = time.perf_counter() - started
+
+    print(f"✅ 완료: '{args.input}' 의 {row_count}개 행을 {target.describe()} 의 {table} 테이블에 적재했습니다. "
+          f"({seconds:.1f}초, 초당 {row_count / seconds if seconds else 0:,.0f}행)")
+    metrics.finish({"table": table, "rows": row_count, "seconds": seconds, "target": target.describe()})
+    if args.metrics:
+        print(f"✅ 측정 결과를 '{args.metrics}' 파일로 저장했습니다.")
@@ -0,0 +1,226 @@
+import argparse
+import json
+
+try:
+    import numpy as np
+except ImportError:  # numpy 는 선택 의존성 (탐지기 실행 시에만 필요)
+    np = None
+
+from catalog import get_topology
+from streamio import iter_records, write_ndjson
+
+# 복제(clone) / 물리적으로 불가능한 이동 탐지기
+# =================================
+# EPC 별로 스캔을 시간순으로 정렬한 뒤, 연속한 두 스캔 사이의 거리(haversine)와
+# 시간 차이로 이동 속도를 계산해 불가능한 이동과 시간이 겹치는 스캔을 찾습니다.
+# 행 단위 파이썬 루프 없이 정렬된 배열 연산만 사용하고, 생성기가 붙인 'clone'
+# 라벨과 비교한 평가 결과도 함께 돌려줍니다.
+#
+# 평가는 트립 파일(create.py 출력, 기본 입력)로 합니다. 이벤트 이력은 generate_history.py 가
+# clone EPC 마다 트립 하나의 경로만 만들고 'clone' 라벨도 이상 지점 이벤트 하나에만 붙으므로,
+# 같은 EPC 가 동시에 여러 곳에 나타나지 않아 복제를 찾을 수 없습니다. 또 이력의 앞뒤 경로
+# 시각은 이상 구간을 기준으로 거꾸로 채워지므로, 정상 경로에도 허용 속도를 넘는 이동이
+# 생겨 탐지 결과가 모두 오탐이 됩니다.
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_MAX_SPEED_KMH = 120.0   # 이보다 빠른 이동은 물리적으로 불가능한 것으로 판단
+MIN_DISTANCE_KM = 1.0           # 같은 지점으로 보는 거리 (좌표 반올림 오차 허용)
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy 가 설치되어 있지 않습니다. 'pip install numpy' 후 다시 실행해주세요.")
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """두 좌표 배열 사이의 대원 거리(km)"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# 1. 레코드 -> 스캔 배열
+# =================================
+
+class ScanArrays:
+    """스캔 하나당 한 칸인 열 배열 묶음"""
+
+    def __init__(self, epc, time, lon, lat, interval_end, row, labels, row_count):
+        self.epc = epc                    # int64, EPC 코드 번호 (factorize)
+        self.time = time                  # int64, epoch 초
+        self.lon = lon                    # float64
+        self.lat = lat                    # float64
+        self.interval_end = interval_end  # int64, 스캔이 속한 구간(트립)의 종료 시각
+        self.row = row                    # int64, 원본 레코드 번호
+        self.labels = labels              # bool (row_count,), 생성기의 'clone' 라벨
+        self.row_count = row_count
+
+
+def load_event_scans(records):
+    """이벤트 이력 레코드를 스캔 배열로 변환합니다. 좌표는 노드 카탈로그에서 찾습니다."""
+    _require_numpy()
+    coords = {location: node["coord"] for location, node in get_topology().nodes_by_location.items()}
+    missing = (float("nan"), float("nan"))
+    epc_ids = {}
+    epc, time, lon, lat, labels = [], [], [], [], []
+    for record in records:
+        epc.append(epc_ids.setdefault(record["epcCode"], len(epc_ids)))
+        time.append(record["eventTime"])
+        x, y = coords.get(record["scanLocation"], missing)
+        lon.append(x)
+        lat.append(y)
+        labels.append("clone" in record.get("anomalyTypeList", ()))
+    n = len(time)
+    time = np.array(time, dtype=np.int64)
+    return ScanArrays(
+        epc=np.array(epc, dtype=np.int64), time=time,
+        lon=np.array(lon, dtype=np.float64), lat=np.array(lat, dtype=np.float64),
+        interval_end=time, row=np.arange(n, dtype=np.int64),
+        labels=np.array(labels, dtype=bool), row_count=n,
+    )
+
+
+def load_trip_scans(records):
+    """트립 레코드를 출발/도착 두 개의 스캔으로 펼쳐 스캔 배열로 변환합니다."""
+    _require_numpy()
+    epc_ids = {}
+    epc, from_time, to_time, coords, labels = [], [], [], [], []
+    for record in records:
+        epc.append(epc_ids.setdefault(record["epcCode"], len(epc_ids)))
+        from_time.append(record["from"]["eventTime"])
+        to_time.append(record["to"]["eventTime"])
+        coords.append(record["from"]["coord"] + record["to"]["coord"])
+        labels.append("clone" in record.get("anomalyTypeList", ()))
+    n = len(epc)
+    coords = np.array(coords, dtype=np.float64).reshape(n, 4)
+    to_time = np.array(to_time, dtype=np.int64)
+    return ScanArrays(
+        epc=np.repeat(np.array(epc, dtype=np.int64), 2),
+        time=np.column_stack((np.array(from_time, dtype=np.int64), to_time)).ravel(),
+        lon=coords[:, [0, 2]].ravel(), lat=coords[:, [1, 3]].ravel(),
+        interval_end=np.repeat(to_time, 2),
+        row=np.repeat(np.arange(n, dtype=np.int64), 2),
+        labels=np.array(labels, dtype=bool), row_count=n,
+    )
+
+
+# 2. 탐지
+# =================================
+
+def detect(scans, max_speed_kmh=DEFAULT_MAX_SPEED_KMH, min_distance_km=MIN_DISTANCE_KM):
+    """스캔 배열에서 불가능한 이동과 시간이 겹치는 스캔을 찾아 레코드별 플래그를 돌려줍니다.
+
+    반환값: {"impossible": bool[row_count], "overlap": bool[row_count]}
+    """
+    _require_numpy()
+    # EPC, 시간, 원본 순서 기준으로 정렬 (같은 EPC 의 스캔이 시간순으로 붙도록)
+    order = np.lexsort((scans.row, scans.time, scans.epc))
+    epc = scans.epc[order]
+    time = scans.time[order]
+    lon = scans.lon[order]
+    lat = scans.lat[order]
+    row = scans.row[order]
+    interval_end = scans.interval_end[order]
+
+    impossible = np.zeros(scans.row_count, dtype=bool)
+    overlap = np.zeros(scans.row_count, dtype=bool)
+    if len(order) < 2:
+        return {"impossible": impossible, "overlap": overlap}
+
+    same_epc = epc[1:] == epc[:-1]
+    distance = haversine_km(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    moved = same_epc & (distance >= min_distance_km)   # 좌표가 없는(NaN) 스캔은 False
+    hours = (time[1:] - time[:-1]) / 3600.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(hours > 0, distance / hours, np.inf)
+
+    # 불가능한 이동: 같은 EPC 가 허용 속도보다 빠르게(또는 동시에) 다른 지점에서 스캔됨
+    too_fast = moved & (speed > max_speed_kmh)
+    impossible[row[:-1][too_fast]] = True
+    impossible[row[1:][too_fast]] = True
+
+    # 시간이 겹치는 스캔: 다른 레코드(트립)의 구간이 끝나기 전에 다음 스캔이 시작됨.
+    # EPC 그룹마다 구간 종료 시각의 누적 최댓값을 그룹 오프셋으로 한 번에 계산
+    group_start = np.concatenate(([True], ~same_epc))
+    group_id = np.cumsum(group_start) - 1
+    span = int(interval_end.max() - interval_end.min()) + 1
+    shifted = interval_end - interval_end.min() + group_id * span
+    running_end = np.maximum.accumulate(shifted) - group_id * span + interval_end.min()
+    overlaps = same_epc & (row[1:] != row[:-1]) & (time[1:] <= running_end[:-1]) & moved
+    overlap[row[:-1][overlaps]] = True
+    overlap[row[1:][overlaps]] = True
+
+    return {"impossible": impossible, "overlap": overlap}
+
+
+def evaluate(flags, labels):
+    """탐지 결과를 생성기의 'clone' 라벨과 비교한 혼동 행렬과 정밀도/재현율"""
+    predicted = flags["impossible"] | flags["overlap"]
+    tp = int((predicted & labels).sum())
+    fp = int((predicted & ~labels).sum())
+    fn = int((~predicted & labels).sum())
+    tn = int((~predicted & ~labels).sum())
+    return {
+        "truePositive": tp, "falsePositive": fp, "falseNegative": fn, "trueNegative": tn,
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+    }
+
+
+def build_report(scans, flags):
+    return {
+        "records": scans.row_count,
+        "scans": int(len(scans.time)),
+        "epcCount": int(len(np.unique(scans.epc))),
+        "impossibleTravel": int(flags["impossible"].sum()),
+        "overlappingScans": int(flags["overlap"].sum()),
+        "labeledClone": int(scans.labels.sum()),
+        "evaluation": evaluate(flags, scans.labels),
+    }
+
+
+# 3. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="EPC 이력/트립에서 복제 및 불가능한 이동을 탐지합니다.")
+    parser.add_argument("-i", "--input", default="guaranteed_anomaly_trips.json",
+                        help="입력 파일 이름 (json 또는 ndjson, 기본값: create.py 의 트립 파일, 이벤트 이력은 평가에 맞지 않음)")
+    parser.add_argument("--input-format", choices=["json", "ndjson"], help="입력 형식 (기본값: 확장자로 판별)")
+    parser.add_argument("--kind", choices=["events", "trips"], help="입력 종류 (기본값: 첫 레코드로 판별)")
+    parser.add_argument("--max-speed", type=float, default=DEFAULT_MAX_SPEED_KMH, help="허용 최대 이동 속도 (km/h)")
+    parser.add_argument("-o", "--output", help="탐지 결과 리포트(JSON) 파일 이름 (기본값: 화면 출력)")
+    parser.add_argument("--flagged-output", help="탐지된 레코드를 NDJSON 으로 저장할 파일 이름")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    kind = args.kind
+    try:
+        if kind is None:
+            first = next(iter_records(args.input, args.input_format), None)
+            kind = "trips" if first is not None and "from" in first else "events"
+        load = load_trip_scans if kind == "trips" else load_event_scans
+        scans = load(iter_records(args.input, args.input_format))
+    except FileNotFoundError:
+        print(f"오류: '{args.input}' 파일을 찾을 수 없습니다. create.py 로 트립 파일을 먼저 생성해주세요.")
+        exit()
+    flags = detect(scans, max_speed_kmh=args.max_speed)
+    report = build_report(scans, flags)
+
+    if args.flagged_output:
+        flagged = flags["impossible"] | flags["overlap"]
+        def flagged_records():
+            for i, record in enumerate(iter_records(args.input, args.input_format)):
+                if flagged[i]:
+                    record["detected"] = [
+                        name for name in ("impossible", "overlap") if flags[name][i]
+                    ]
+                    yield record
+        write_ndjson(args.flagged_output, flagged_records())
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,157 @@
+import gzip
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 은 선택 의존성 (설치되어 있으면 더 빠른 인코더로 사용)
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard 는 선택 의존성 (.zst 압축 시에만 필요)
+    zstandard = None
+
+# JSON 인코더와 압축 스트림
+# =================================
+# 레코드 하나를 UTF-8 바이트로 직렬화하는 인코더를 백엔드(stdlib json / orjson)와
+# 관계없이 같은 바이트가 나오도록 맞춰 두고, 출력 파일은 확장자나 옵션에 따라
+# gzip / zstd 로 바로 압축합니다.
+#
+# dict 가 아닌 레코드(records.py 의 압축 레코드 등)는 to_dict() 로 바꿔서 직렬화합니다.
+# 두 백엔드의 출력은 문자열, 정수, 리스트, dict 와 일반적인 범위의 실수
+# (생성기가 만드는 좌표 등)에 대해 동일합니다. NaN/Infinity 나 지수 표기가 필요한
+# 아주 크거나 작은 실수는 두 라이브러리의 표기가 다르므로 사용하지 않습니다.
+
+ENCODER_BACKENDS = ("auto", "json", "orjson")
+COMPRESSIONS = ("gzip", "zstd")
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+WRITE_BUFFER_SIZE = 1 << 20
+READ_BUFFER_SIZE = 1 << 16
+
+
+def _default(obj):
+    """json 이 모르는 객체를 직렬화 가능한 값으로 바꿉니다. (to_dict() 가 있는 레코드)"""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+class StdlibEncoder:
+    """표준 라이브러리 json 인코더"""
+    name = "json"
+
+    def __init__(self):
+        self._compact = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+        self._pretty = json.JSONEncoder(ensure_ascii=False, indent=2, default=_default)
+
+    def compact(self, record):
+        return self._compact.encode(record).encode("utf-8")
+
+    def pretty(self, record):
+        return self._pretty.encode(record).encode("utf-8")
+
+
+class OrjsonEncoder:
+    """orjson 인코더 (StdlibEncoder 와 같은 바이트를 출력)"""
+    name = "orjson"
+
+    def compact(self, record):
+        return orjson.dumps(record, default=_default)
+
+    def pretty(self, record):
+        return orjson.dumps(record, default=_default, option=orjson.OPT_INDENT_2)
+
+
+def get_encoder(backend="auto"):
+    """이름으로 인코더를 고릅니다. 'auto' 는 orjson 이 설치되어 있으면 orjson 을 사용합니다."""
+    if backend == "auto":
+        backend = "orjson" if orjson is not None else "json"
+    if backend == "orjson":
+        if orjson is None:
+            raise RuntimeError("orjson 이 설치되어 있지 않습니다. 'pip install orjson' 후 다시 실행해주세요.")
+        return OrjsonEncoder()
+    if backend == "json":
+        return StdlibEncoder()
+    raise ValueError(f"알 수 없는 인코더입니다: {backend}")
+
+
+def decode(data):
+    """JSON 바이트/문자열 하나를 디코딩합니다."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 압축 스트림
+# =================================
+
+def detect_compression(path, compression=None):
+    """명시된 압축 방식이 없으면 파일 확장자(.gz / .zst)로 판별합니다. 압축하지 않으면 None"""
+    if compression:
+        return None if compression == "none" else compression
+    for ext, name in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(ext):
+            return name
+    return None
+
+
+def split_compression_extension(path):
+    """'a.ndjson.gz' -> ('a.ndjson', '.gz')"""
+    for ext in COMPRESSION_EXTENSIONS:
+        if path.endswith(ext):
+            return path[:-len(ext)], ext
+    return path, ""
+
+
+def with_compression_extension(path, compression):
+    """압축 방식에 맞는 확장자가 없으면 붙입니다."""
+    if compression in (None, "none"):
+        return path
+    ext = next(ext for ext, name in COMPRESSION_EXTENSIONS.items() if name == compression)
+    return path if path.endswith(ext) else path + ext
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("zstandard 가 설치되어 있지 않습니다. 'pip install zstandard' 후 다시 실행해주세요.")
+
+
+class _GzipWriter(gzip.GzipFile):
+    """헤더에 파일 이름과 수정 시각을 기록하지 않는 gzip 스트림 (같은 입력 -> 같은 바이트)"""
+
+    def __init__(self, raw):
+        super().__init__(filename="", mode="wb", fileobj=raw, mtime=0)
+        self._raw = raw
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+
+def open_write(path, compression=None):
+    """출력용 바이너리 스트림을 엽니다. 압축 방식이 없으면 확장자로 판별합니다."""
+    compression = detect_compression(path, compression)
+    if compression == "zstd":
+        _require_zstandard()
+    raw = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+    if compression == "gzip":
+        return _GzipWriter(raw)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    return raw
+
+
+def open_read(path, compression=None):
+    """입력용 바이너리 스트림을 엽니다. (압축 파일은 풀면서 읽음)"""
+    compression = detect_compression(path, compression)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.BufferedReader(reader, buffer_size=READ_BUFFER_SIZE)
+    return open(path, "rb")
@@ -1,123 +1,107 @@
-import json
+import argparse
+import os
 import random
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+from catalog import get_topology
+from encoders import detect_compression, get_encoder, with_compression_extension
+from history_index import HistoryIndex, index_path_for
+from manifest import HistoryManifest
+from metrics import add_metrics_arguments, metrics_from_args
+from records import EventPath
+from streamio import DEFAULT_RUN_SIZE, detect_format, external_sort, iter_records, merge_into_sorted_ndjson, write_records
 
 # 1. 노드 정보 및 기본 데이터 정의 (이전과 동일)
-nodes_info = [
-    { "hubType": "ICN_Factory", "scanLocation": "인천공장", "businessStep": "Factory", "coord": [126.65, 37.45] },
-    { "hubType": "HWS_Factory", "scanLocation": "화성공장", "businessStep": "Factory", "coord": [126.83, 37.20] },
-    { "hubType": "YGS_Factory", "scanLocation": "양산공장", "businessStep": "Factory", "coord": [129.04, 35.33] },
-    { "hubType": "KUM_Factory", "scanLocation": "구미공장", "businessStep": "Factory", "coord": [128.40, 36.13] },
-    { "hubType": "ICN_WMS", "scanLocation": "인천공장창고", "businessStep": "WMS", "coord": [126.66, 37.46] },
-    { "hubType": "HWS_WMS", "scanLocation": "화성공장창고", "businessStep": "WMS", "coord": [126.84, 37.21] },
-    { "hubType": "YGS_WMS", "scanLocation": "양산공장창고", "businessStep": "WMS", "coord": [129.05, 35.34] },
-    { "hubType": "KUM_WMS", "scanLocation": "구미공장창고", "businessStep": "WMS", "coord": [128.41, 36.14] },
-    { "hubType": "SEL_Logi_HUB", "scanLocation": "수도권물류센터", "businessStep": "LogiHub", "coord": [127.20, 37.35] },
-    { "hubType": "JB_Logi_HUB", "scanLocation": "전북물류센터", "businessStep": "LogiHub", "coord": [127.15, 35.82] },
-    { "hubType": "JN_Logi_HUB", "scanLocation": "전남물류센터", "businessStep": "LogiHub", "coord": [126.90, 35.15] },
-    { "hubType": "KB_Logi_HUB", "scanLocation": "경북물류센터", "businessStep": "LogiHub", "coord": [128.52, 35.87] },
-    { "hubType": "SEL_WS1", "scanLocation": "수도권_도매상1", "businessStep": "Wholesaler", "coord": [127.05, 37.55] },
-    { "hubType": "SEL_WS2", "scanLocation": "수도권_도매상2", "businessStep": "Wholesaler", "coord": [126.95, 37.60] },
-    { "hubType": "SEL_WS3", "scanLocation": "수도권_도매상3", "businessStep": "Wholesaler", "coord": [127.15, 37.50] },
-    { "hubType": "JB_WS1", "scanLocation": "전북_도매상1", "businessStep": "Wholesaler", "coord": [127.10, 35.90] },
-    { "hubType": "JB_WS2", "scanLocation": "전북_도매상2", "businessStep": "Wholesaler", "coord": [126.98, 35.80] },
-    { "hubType": "JB_WS3", "scanLocation": "전북_도매상3", "businessStep": "Wholesaler", "coord": [127.25, 35.75] },
-    { "hubType": "JN_WS1", "scanLocation": "전남_도매상1", "businessStep": "Wholesaler", "coord": [126.85, 35.25] },
-    { "hubType": "JN_WS3", "scanLocation": "전남_도매상3", "businessStep": "Wholesaler", "coord": [127.05, 35.10] },
-    { "hubType": "KB_WS1", "scanLocation": "경북_도매상1", "businessStep": "Wholesaler", "coord": [128.60, 35.95] },
-    { "hubType": "KB_WS2", "scanLocation": "경북_도매상2", "businessStep": "Wholesaler", "coord": [128.45, 36.00] },
-    { "hubType": "SEL_WS1_R1", "scanLocation": "수도권_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [127.055, 37.555] },
-    { "hubType": "SEL_WS1_R2", "scanLocation": "수도권_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [127.045, 37.555] },
-    { "hubType": "SEL_WS1_R3", "scanLocation": "수도권_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [127.050, 37.560] },
-    { "hubType": "SEL_WS2_R1", "scanLocation": "수도권_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.955, 37.605] },
-    { "hubType": "SEL_WS2_R2", "scanLocation": "수도권_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.945, 37.605] },
-    { "hubType": "SEL_WS2_R3", "scanLocation": "수도권_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.950, 37.610] },
-    { "hubType": "SEL_WS3_R1", "scanLocation": "수도권_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.155, 37.505] },
-    { "hubType": "SEL_WS3_R2", "scanLocation": "수도권_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.145, 37.505] },
-    { "hubType": "SEL_WS3_R3", "scanLocation": "수도권_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.150, 37.510] },
-    { "hubType": "JB_WS1_R1", "scanLocation": "전북_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [127.105, 35.905] },
-    { "hubType": "JB_WS1_R2", "scanLocation": "전북_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [127.095, 35.905] },
-    { "hubType": "JB_WS1_R3", "scanLocation": "전북_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [127.100, 35.910] },
-    { "hubType": "JB_WS2_R1", "scanLocation": "전북_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.985, 35.805] },
-    { "hubType": "JB_WS2_R2", "scanLocation": "전북_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.975, 35.805] },
-    { "hubType": "JB_WS2_R3", "scanLocation": "전북_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.980, 35.810] },
-    { "hubType": "JB_WS3_R1", "scanLocation": "전북_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.255, 35.755] },
-    { "hubType": "JB_WS3_R2", "scanLocation": "전북_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.245, 35.755] },
-    { "hubType": "JB_WS3_R3", "scanLocation": "전북_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.250, 35.760] },
-    { "hubType": "JN_WS1_R1", "scanLocation": "전남_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [126.855, 35.255] },
-    { "hubType": "JN_WS1_R2", "scanLocation": "전남_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [126.845, 35.255] },
-    { "hubType": "JN_WS1_R3", "scanLocation": "전남_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [126.850, 35.260] },
-    { "hubType": "JN_WS2_R1", "scanLocation": "전남_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [126.755, 35.055] },
-    { "hubType": "JN_WS2_R2", "scanLocation": "전남_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [126.745, 35.055] },
-    { "hubType": "JN_WS2_R3", "scanLocation": "전남_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [126.750, 35.060] },
-    { "hubType": "JN_WS3_R1", "scanLocation": "전남_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [127.055, 35.105] },
-    { "hubType": "JN_WS3_R2", "scanLocation": "전남_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [127.045, 35.105] },
-    { "hubType": "JN_WS3_R3", "scanLocation": "전남_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [127.050, 35.110] },
-    { "hubType": "KB_WS1_R1", "scanLocation": "경북_도매상1_권역_소매상1", "businessStep": "Reseller", "coord": [128.605, 35.955] },
-    { "hubType": "KB_WS1_R2", "scanLocation": "경북_도매상1_권역_소매상2", "businessStep": "Reseller", "coord": [128.595, 35.955] },
-    { "hubType": "KB_WS1_R3", "scanLocation": "경북_도매상1_권역_소매상3", "businessStep": "Reseller", "coord": [128.600, 35.960] },
-    { "hubType": "KB_WS2_R1", "scanLocation": "경북_도매상2_권역_소매상1", "businessStep": "Reseller", "coord": [128.455, 36.005] },
-    { "hubType": "KB_WS2_R2", "scanLocation": "경북_도매상2_권역_소매상2", "businessStep": "Reseller", "coord": [128.445, 36.005] },
-    { "hubType": "KB_WS2_R3", "scanLocation": "경북_도매상2_권역_소매상3", "businessStep": "Reseller", "coord": [128.450, 36.010] },
-    { "hubType": "KB_WS3_R1", "scanLocation": "경북_도매상3_권역_소매상1", "businessStep": "Reseller", "coord": [128.705, 35.805] },
-    { "hubType": "KB_WS3_R2", "scanLocation": "경북_도매상3_권역_소매상2", "businessStep": "Reseller", "coord": [128.695, 35.805] },
-    { "hubType": "KB_WS3_R3", "scanLocation": "경북_도매상3_권역_소매상3", "businessStep": "Reseller", "coord": [128.700, 35.810] }
-]
-
-# 노드 정보를 쉽게 찾을 수 있도록 딕셔너리로 변환
-nodes_by_location = {node["scanLocation"]: node for node in nodes_info}
-nodes_by_step = {step: [] for step in ["Factory", "WMS", "LogiHub", "Wholesaler", "Reseller"]}
-for node in nodes_info:
-    if node["businessStep"] in nodes_by_step:
-        nodes_by_step[node["businessStep"]].append(node)
-factory_wms_map = {
-    "인천공장": "인천공장창고", "화성공장": "화성공장창고",
-    "양산공장": "양산공장창고", "구미공장": "구미공장창고"
-}
-step_order = ["Factory", "WMS", "LogiHub", "Wholesaler", "Reseller", "POS"]
+# 노드 id, 단계 순서, 창고->공장 역매핑 등은 공용 카탈로그(nodes.json)에서 한 번만 읽고 계산
+TOPOLOGY = get_topology()
+
+# 이전 코드와의 호환을 위한 이름들
+nodes_info = list(TOPOLOGY.nodes)
+nodes_by_location = dict(TOPOLOGY.nodes_by_location)
+nodes_by_step = {step: list(TOPOLOGY.nodes_by_step[step]) for step in ["Factory", "WMS", "LogiHub", "Wholesaler", "Reseller"]}
+factory_wms_map = {factory: wms["scanLocation"] for factory, wms in TOPOLOGY.factory_to_wms.items()}
+step_order = list(TOPOLOGY.step_order)
+
+# 경로 템플릿 캐시 크기 (출발지, 도착지) 쌍 기준
+ROUTE_CACHE_SIZE = 4096
+# 프롤로그 슬롯 표시: 바로 앞 슬롯에서 뽑은 창고(WMS)의 매핑 공장
+FACTORY_OF_PREVIOUS = "factory-of-previous"
+
+class RouteTemplate(NamedTuple):
+    """(출발지, 도착지) 쌍에 대한 앞/뒤 정상 경로의 단계별 후보
+
+    각 슬롯은 후보 노드 튜플(rng.choice 대상), 창고->공장 매핑으로 정해진 노드(dict), 또는
+    앞 슬롯에서 뽑은 창고의 공장을 뜻하는 FACTORY_OF_PREVIOUS 입니다.
+    prologue 는 출발지에서 공장 쪽으로 거슬러 올라가는 순서입니다.
+    """
+    prologue: tuple
+    epilogue: tuple
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def route_template(from_location, to_location):
+    """출발/도착 위치에 대한 RouteTemplate 을 만듭니다. (LRU 캐시)"""
+    prologue = []
+    current = TOPOLOGY.nodes_by_location[from_location]   # 결정된 노드, 무작위 슬롯 다음이면 None
+    step = current["businessStep"]
+    while step != "Factory":
+        prev_step_name = TOPOLOGY.prev_step[step]
+        if prev_step_name is None: break
+        if prev_step_name == "Factory":
+            # 공장은 바로 뒤 창고(WMS)의 매핑 공장 (매핑이 없는 창고면 무작위)
+            if current is None:
+                prologue.append(FACTORY_OF_PREVIOUS)
+                break
+            fixed = TOPOLOGY.wms_to_factory.get(current["scanLocation"])
+            if fixed:
+                prologue.append(fixed)
+                break
+        prologue.append(TOPOLOGY.nodes_by_step.get(prev_step_name, ()))
+        current, step = None, prev_step_name
+
+    epilogue = []
+    step = TOPOLOGY.nodes_by_location[to_location]["businessStep"]
+    while step not in ["POS", "Reseller"]:
+        next_step_name = TOPOLOGY.next_step[step]
+        if next_step_name is None: break
+        epilogue.append(TOPOLOGY.nodes_by_step.get(next_step_name, ()))
+        step = next_step_name
+
+    return RouteTemplate(tuple(prologue), tuple(epilogue))
+
+def _draw_prologue(slots, rng):
+    """프롤로그 슬롯마다 노드를 정해 공장부터의 순서로 돌려줍니다."""
+    path = []
+    for slot in slots:
+        if slot is FACTORY_OF_PREVIOUS:
+            node = TOPOLOGY.wms_to_factory.get(path[-1]["scanLocation"]) or rng.choice(TOPOLOGY.nodes_by_step["Factory"])
+        elif isinstance(slot, dict):
+            node = slot
+        else:
+            node = rng.choice(slot)
+        path.append(node)
+    path.reverse()
+    return path
 
 # 2. EPC 이력 생성 함수 (로직 수정)
-def generate_epc_history(anomalous_trip):
-    """주어진 이상 트립을 포함하는 전체 EPC 이력을 생성합니다."""
+def generate_epc_history(anomalous_trip, rng=random):
+    """주어진 이상 트립을 포함하는 전체 EPC 이력을 생성합니다.
+
+    rng 를 지정하지 않으면 전역 random 모듈을 사용합니다.
+    """
     
-    from_node = nodes_by_location.get(anomalous_trip["from"]["scanLocation"])
-    to_node = nodes_by_location.get(anomalous_trip["to"]["scanLocation"])
+    from_node = TOPOLOGY.nodes_by_location.get(anomalous_trip["from"]["scanLocation"])
+    to_node = TOPOLOGY.nodes_by_location.get(anomalous_trip["to"]["scanLocation"])
 
     if not from_node or not to_node:
         print(f"Warning: Skipping trip with invalid scanLocation. From: {anomalous_trip['from']['scanLocation']}, To: {anomalous_trip['to']['scanLocation']}")
         return []
 
     # --- 이상 트립 앞/뒤의 정상 경로 생성 (Prologue / Epilogue) ---
-    prologue_path = []
-    current_step = from_node
-    while current_step["businessStep"] != "Factory":
-        prev_step_index = step_order.index(current_step["businessStep"]) - 1
-        if prev_step_index < 0: break
-        prev_step_name = step_order[prev_step_index]
-        prev_node = None
-        if prev_step_name == "WMS":
-            for f, w in factory_wms_map.items():
-                if w == current_step["scanLocation"]:
-                    prev_node = nodes_by_location.get(f)
-                    break
-        if not prev_node:
-            prev_node = random.choice(nodes_by_step.get(prev_step_name, []))
-        if prev_node:
-            prologue_path.insert(0, prev_node)
-            current_step = prev_node
-        else: break
-
-    epilogue_path = []
-    current_step = to_node
-    while current_step["businessStep"] not in ["POS", "Reseller"]:
-        next_step_index = step_order.index(current_step["businessStep"]) + 1
-        if next_step_index >= len(step_order): break
-        next_step_name = step_order[next_step_index]
-        next_node = random.choice(nodes_by_step.get(next_step_name, []))
-        if next_node:
-            epilogue_path.append(next_node)
-            current_step = next_node
-        else: break
+    template = route_template(from_node["scanLocation"], to_node["scanLocation"])
+    prologue_path = _draw_prologue(template.prologue, rng)
+    epilogue_path = [rng.choice(slot) for slot in template.epilogue]
 
     full_path_nodes = prologue_path + [from_node, to_node] + epilogue_path
     unique_path_nodes = []
@@ -128,7 +112,9 @@ def generate_epc_history(anomalous_trip):
             last_node_location = node["scanLocation"]
 
     # --- 경로 노드를 기반으로 이벤트 리스트 생성 ---
-    history = []
+    # 이벤트는 records.Event (dict 처럼 읽히고 직렬화 시 dict 로 변환) 로 만들고,
+    # 노드 / 시각 / EPC / 제품 / 이상 정보는 트립마다 하나의 EventPath 에 모아 공유
+    event_times = []
     anomaly_from_time = datetime.fromtimestamp(anomalous_trip["from"]["eventTime"])
     anomaly_to_time = datetime.fromtimestamp(anomalous_trip["to"]["eventTime"])
     
@@ -140,80 +126,163 @@ def generate_epc_history(anomalous_trip):
             
     if from_index == -1: return []
 
-    for i, node in enumerate(unique_path_nodes):
+    for i in range(len(unique_path_nodes)):
         event_time_dt = None
         if i == from_index:
             event_time_dt = anomaly_from_time
         elif i == from_index + 1:
             event_time_dt = anomaly_to_time
         elif i < from_index:
-            time_diff_hours = (from_index - i) * random.uniform(4, 8)
+            time_diff_hours = (from_index - i) * rng.uniform(4, 8)
             event_time_dt = anomaly_from_time - timedelta(hours=time_diff_hours)
         elif i > from_index + 1:
-            time_diff_hours = (i - (from_index + 1)) * random.uniform(4, 8)
+            time_diff_hours = (i - (from_index + 1)) * rng.uniform(4, 8)
             event_time_dt = anomaly_to_time + timedelta(hours=time_diff_hours)
+        event_times.append(int(event_time_dt.timestamp())) # [형식 변경]
+
+    # 이상 트립의 도착 지점(from_index + 1) 이벤트에만 이상 정보와 description 이 들어감
+    # (부하 프로필의 정상 트립은 이상 정보가 없으므로 어느 이벤트에도 넣지 않음)
+    is_anomalous = anomalous_trip.get("anomaly", 0) or anomalous_trip.get("anomalyTypeList")
+    path = EventPath(anomalous_trip, unique_path_nodes, event_times,
+                     anomaly_seq=from_index + 2 if is_anomalous else 0, node_ids=TOPOLOGY.node_ids)
+    return path.events()
+
+def iter_history_events(anomalous_trips, processed_epcs=None, rng=random, generate=generate_epc_history):
+    """이상 트립 스트림을 받아 EPC 이벤트를 하나씩 돌려주는 제너레이터
+
+    processed_epcs 를 넘기면 이전 실행에서 이미 이력을 만든 clone EPC 를 건너뛰고,
+    이번에 처리한 clone EPC 도 그 집합에 추가합니다. 트립마다 generate(trip, rng)
+    (기본값: generate_epc_history, 계측 시에는 감싼 함수)로 이벤트를 만듭니다.
+    """
+    if processed_epcs is None:
+        processed_epcs = set() # Clone 처리를 위한 중복 EPC 추적
+
+    for trip in anomalous_trips:
+        epc = trip["epcCode"]
+        # Clone 타입의 경우, 동일 EPC에 대해 한 번만 이력을 생성
+        if trip.get("anomalyTypeList") == ["clone"]:
+            if epc in processed_epcs:
+                continue # 이미 이력이 생성된 clone EPC는 건너뜀
+            processed_epcs.add(epc)
 
-        # 이 이벤트가 이상 트립의 도착 지점인지 확인
-        is_anomaly_event = (i == from_index + 1)
-        
-        # [수정] 이벤트 객체 생성 로직 변경
-        event_data = {
-            "eventId": int(f"{anomalous_trip['roadId']}{i+1}"),
-            "epcCode": anomalous_trip["epcCode"],
-            "productName": anomalous_trip.get("productName", "N/A"), # [추가]
-            "epcLot": anomalous_trip.get("epcLot", "N/A"),           # [추가]
-            "locationId": list(nodes_by_location.keys()).index(node["scanLocation"]) + 1,
-            "scanLocation": node["scanLocation"],
-            "hubType": node["hubType"],
-            "businessStep": node["businessStep"],
-            "eventType": "Aggregation" if i == 0 else f'{unique_path_nodes[i-1]["businessStep"]}_Outbound',
-            "eventTime": int(event_time_dt.timestamp()), # [형식 변경]
-            "anomaly": anomalous_trip.get("anomaly", 0) if is_anomaly_event else 0,
-            "anomalyTypeList": anomalous_trip.get("anomalyTypeList", []) if is_anomaly_event else []
-        }
-        
-        # 이상 이벤트인 경우에만 description 필드 추가
-        if is_anomaly_event:
-            event_data["description"] = anomalous_trip.get("description", "이상 감지됨.") # [추가]
-
-        history.append(event_data)
-        
-    return history
+        yield from generate(trip, rng)
 
 # 3. 메인 실행 부분
+def parse_args():
+    parser = argparse.ArgumentParser(description="이상 트립으로부터 전체 EPC 이벤트 이력을 생성합니다.")
+    parser.add_argument("-i", "--input", default="guaranteed_anomaly_trips.json", help="입력 파일 이름 (json 또는 ndjson)")
+    parser.add_argument("-o", "--output", default="full_epc_history.json", help="출력 파일 이름")
+    parser.add_argument("--input-format", choices=["json", "ndjson"], help="입력 형식 (기본값: 확장자로 판별)")
+    parser.add_argument("--format", choices=["json", "ndjson", "parquet", "arrow"],
+                        help="출력 형식 (기본값: 확장자로 판별, parquet/arrow 는 날짜별 파티션 디렉터리로 기록)")
+    parser.add_argument("--partition", choices=["date", "month", "none"], default="month",
+                        help="parquet/arrow 출력의 파티션 단위")
+    parser.add_argument("--chunk-size", type=int, help="json 형식일 때 파일 하나에 담을 이벤트 수")
+    parser.add_argument("--json-style", choices=["pretty", "compact"], default="pretty",
+                        help="json 형식의 들여쓰기 (compact: 공백 없이 기록, ndjson 은 항상 compact)")
+    parser.add_argument("--json-backend", choices=["auto", "json", "orjson"], default="auto",
+                        help="JSON 인코더 (auto: orjson 이 설치되어 있으면 사용, 결과 바이트는 동일)")
+    parser.add_argument("--compress", choices=["none", "gzip", "zstd"],
+                        help="json/ndjson 출력 압축 (기본값: 확장자 .gz/.zst 로 판별, 확장자가 없으면 붙임)")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE, help="외부 정렬 시 메모리에서 정렬할 이벤트 수")
+    parser.add_argument("--seed", help="난수 시드 (지정하면 같은 입력에 대해 결과가 항상 동일)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="이미 처리한 트립은 건너뛰고 새 이벤트만 기존 ndjson 출력에 병합 (매니페스트 사용)")
+    parser.add_argument("--index", action="store_true",
+                        help="ndjson 출력 옆에 시간/EPC/위치 사이드카 인덱스('<출력>.index')를 함께 기록")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    
-    input_filename = "guaranteed_anomaly_trips.json" # 입력 파일 이름
-    output_filename = "full_epc_history.json" # 출력 파일 이름
+    args = parse_args()
+    input_filename = args.input # 입력 파일 이름
+    output_filename = with_compression_extension(args.output, args.compress) # 출력 파일 이름
 
     try:
-        with open(input_filename, "r", encoding="utf-8") as f:
-            anomalous_trips_data = json.load(f)
-            anomalous_trips_list = anomalous_trips_data.get("data", [])
+        # 입력은 스트리밍으로 읽으므로, 파일 존재 여부만 먼저 확인
+        open(input_filename, "r", encoding="utf-8").close()
     except FileNotFoundError:
         print(f"오류: '{input_filename}' 파일을 찾을 수 없습니다. 이전 스크립트를 실행하여 파일을 먼저 생성해주세요.")
         exit()
+    try:
+        metrics = metrics_from_args("generate_history", args)
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit()
 
-    all_events = []
-    processed_epcs = set() # Clone 처리를 위한 중복 EPC 추적
+    def observe_history(events):
+        # 빈 이력은 잘못된 scanLocation 등으로 건너뛴 트립
+        metrics.observe("eventsPerTrip", len(events))
+        if not events:
+            metrics.count("skippedTrips")
+    # 계측 중에는 generate_epc_history 호출도 단계로 잼
+    timed_generate_epc_history = metrics.wrap("generate_epc_history", generate_epc_history, each=observe_history)
+    metrics.count("skippedTrips", n=0)
 
-    for trip in anomalous_trips_list:
-        epc = trip["epcCode"]
-        # Clone 타입의 경우, 동일 EPC에 대해 한 번만 이력을 생성
-        if trip.get("anomalyTypeList") == ["clone"]:
-            if epc in processed_epcs:
-                continue # 이미 이력이 생성된 clone EPC는 건너뜀
-            processed_epcs.add(epc)
+    stats = {"trips": 0, "new_trips": 0}
+    def count_trips(trips, name="trips"):
+        for trip in trips:
+            stats[name] += 1
+            yield trip
+
+    # 이벤트 생성 -> 'eventTime' 기준 외부 정렬 -> 파일 기록까지 스트리밍으로 처리
+    anomalous_trips = count_trips(metrics.timed_iter("read", iter_records(input_filename, args.input_format)))
+    output_format = detect_format(output_filename, args.format)
+    plain_ndjson = output_format == "ndjson" and not detect_compression(output_filename, args.compress)
+    if (args.incremental or args.index) and not plain_ndjson:
+        print("오류: --incremental / --index 는 압축하지 않은 ndjson 출력에서만 사용할 수 있습니다.")
+        exit()
 
-        epc_full_history = generate_epc_history(trip)
-        all_events.extend(epc_full_history)
+    # 사이드카 인덱스: 증분 모드에서는 이미 인덱스가 있으면 --index 없이도 함께 갱신
+    indexer = None
+    if args.index or (args.incremental and os.path.exists(index_path_for(output_filename))):
+        indexer = HistoryIndex(output_filename)
+        if args.incremental and os.path.exists(output_filename):
+            indexer = HistoryIndex.load_for(output_filename) or HistoryIndex.build(output_filename)
 
-    # 모든 이벤트를 'eventTime' 기준으로 최종 정렬
-    sorted_events = sorted(all_events, key=lambda x: x["eventTime"])
+    manifest = None
+    processed_epcs = None
+    if output_format == "ndjson":
+        # ndjson 출력은 항상 매니페스트를 남겨 다음 실행에서 --incremental 을 쓸 수 있게 함
+        try:
+            manifest = HistoryManifest.load_for(output_filename) if args.incremental else HistoryManifest(output_filename)
+        except ValueError as e:
+            print(f"오류: {e}")
+            exit()
+        anomalous_trips = count_trips(metrics.timed_iter("manifest", manifest.iter_new_trips(anomalous_trips)), "new_trips")
+        processed_epcs = manifest.clone_epcs
 
-    # JSON 파일로 저장
-    output_data = {"data": sorted_events}
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    metrics.start()
+    rng = random.Random(args.seed) if args.seed is not None else random
+    all_events = iter_history_events(anomalous_trips, processed_epcs=processed_epcs, rng=rng,
+                                     generate=timed_generate_epc_history)
+    all_events = metrics.timed_iter("events", all_events)
+    sorted_events = metrics.timed_iter("sort", external_sort(all_events, key=lambda x: x["eventTime"], run_size=args.run_size))
+    try:
+        with metrics.stage("write") as stage:
+            if args.incremental:
+                event_count = merge_into_sorted_ndjson(output_filename, sorted_events, key=lambda x: x["eventTime"],
+                                                       indexer=indexer)
+            else:
+                event_count = write_records(output_filename, sorted_events, fmt=output_format,
+                                            chunk_size=args.chunk_size, style=args.json_style, partition=args.partition,
+                                            encoder=get_encoder(args.json_backend), compression=args.compress,
+                                            indexer=indexer)
+            stage["items"] = event_count
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
+    with metrics.stage("save"):
+        if indexer is not None:
+            indexer.save()
+        if manifest is not None:
+            manifest.event_count += event_count
+            manifest.save()
 
-    print(f"✅ 완료: {len(anomalous_trips_list)}개의 이상 트립으로부터 총 {len(sorted_events)}개의 이벤트 이력을 생성하여 '{output_filename}' 파일로 저장했습니다.")
\ No newline at end of file
+    if args.incremental:
+        print(f"✅ 완료: {stats['trips']}개의 트립 중 새 트립 {stats['new_trips']}개로부터 {event_count}개의 이벤트를 '{output_filename}' 파일에 병합했습니다. (전체 {manifest.event_count}개)")
+    else:
+        print(f"✅ 완료: {stats['trips']}개의 이상 트립으로부터 총 {event_count}개의 이벤트 이력을 생성하여 '{output_filename}' 파일로 저장했습니다.")
+    metrics.finish({"trips": stats["trips"], "newTrips": stats["new_trips"], "events": event_count, "output": output_filename})
+    if args.metrics:
+        print(f"✅ 측정 결과를 '{args.metrics}' 파일로 저장했습니다.")
@@ -0,0 +1,384 @@
+import argparse
+import bisect
+import heapq
+import os
+import pickle
+from array import array
+
+from encoders import decode, get_encoder
+
+# 시간순 NDJSON 파일의 바이트 오프셋 인덱스
+# =================================
+# eventTime 순으로 정렬된 이력(또는 from.eventTime 순 트립) NDJSON 파일에서 block_size
+# 줄마다 첫 레코드의 시각과 바이트 오프셋을 기록해 둡니다. 특정 시각이나 커서 위치에서
+# 읽기를 시작할 때 파일 전체를 다시 읽지 않고 해당 블록으로 바로 이동할 수 있습니다.
+#
+# HistoryIndex 는 여기에 epcCode / scanLocation / businessStep 값별 레코드 오프셋 목록
+# (posting list)을 더해 출력 파일 옆의 사이드카 파일로 저장하고, 필터 + 커서 페이지
+# 조회(query)를 해당 레코드만 읽어서 처리합니다.
+
+DEFAULT_BLOCK_SIZE = 1024   # 시간 인덱스 항목 하나가 가리키는 줄 수
+INDEX_VERSION = 1
+INDEXED_FIELDS = ("epcCode", "scanLocation", "businessStep")
+DEFAULT_QUERY_LIMIT = 50
+
+
+def event_time_key(record):
+    return record["eventTime"]
+
+
+def trip_time_key(record):
+    return record["from"]["eventTime"]
+
+
+TIME_KEYS = {"event": event_time_key, "trip": trip_time_key}
+
+
+def time_key_for(record):
+    """레코드 모양(트립 / 이벤트)에 맞는 시각 key 함수를 돌려줍니다."""
+    return trip_time_key if "from" in record else event_time_key
+
+
+def index_path_for(path):
+    return path + ".index"
+
+
+class TimeOffsetIndex:
+    """block_size 줄마다 (첫 레코드 시각, 바이트 오프셋) 을 담은 희소 인덱스"""
+
+    def __init__(self, path, time_key=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.path = path
+        self.time_key = time_key
+        self.block_size = block_size
+        self.times = array("q")
+        self.offsets = array("q")
+        self.ordinals = array("q")   # 블록 첫 레코드의 순번
+        self.count = 0       # 전체 레코드 수
+        self.size = 0        # 인덱스가 다루는 파일 크기 (= 다음 레코드의 오프셋)
+        self.last_time = None
+        self._block_fill = 0  # 마지막 블록에 들어간 레코드 수
+
+    @classmethod
+    def build(cls, path, time_key=None, block_size=DEFAULT_BLOCK_SIZE):
+        """파일을 한 번 순차로 읽어 인덱스를 만듭니다. 블록의 첫 줄만 디코딩합니다."""
+        index = cls(path, time_key, block_size)
+        offset = 0
+        last_line = None
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    if index.count % block_size == 0:
+                        record = decode(line)
+                        if index.time_key is None:
+                            index.time_key = time_key_for(record)
+                        index.times.append(index.time_key(record))
+                        index.offsets.append(offset)
+                        index.ordinals.append(index.count)
+                    index.count += 1
+                    last_line = line
+                offset += len(line)
+        index.size = offset
+        index._block_fill = (index.count - 1) % block_size + 1 if index.count else 0
+        if last_line is not None:
+            index.last_time = index.time_key(decode(last_line))
+        return index
+
+    def _add_time(self, value):
+        """파일 끝(self.size)에 기록된 레코드 하나의 시각을 반영합니다."""
+        if not self.offsets or self._block_fill >= self.block_size:
+            self.times.append(value)
+            self.offsets.append(self.size)
+            self.ordinals.append(self.count)
+            self._block_fill = 0
+        self._block_fill += 1
+        self.count += 1
+        self.last_time = value
+
+    def is_stale(self):
+        """인덱스를 만든 뒤 파일이 바뀌었는지 (크기로) 확인합니다."""
+        return not os.path.exists(self.path) or os.path.getsize(self.path) != self.size
+
+    @property
+    def first_time(self):
+        return self.times[0] if self.times else None
+
+    def block_offset(self, value):
+        """시각이 value 이상인 첫 레코드가 들어 있을 수 있는 가장 늦은 블록의 오프셋"""
+        i = bisect.bisect_left(self.times, value) - 1
+        return self.offsets[max(i, 0)] if self.offsets else 0
+
+    def offset_for_time(self, value):
+        """시각이 value 이상인 첫 레코드의 바이트 오프셋 (없으면 파일 크기)"""
+        with open(self.path, "rb") as f:
+            f.seek(self.block_offset(value))
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line:
+                    return pos
+                if line.strip() and self.time_key(decode(line)) >= value:
+                    return pos
+
+    def is_line_start(self, offset):
+        """offset 이 파일 안의 줄 시작 위치인지 확인합니다. (외부에서 받은 커서 검증용)"""
+        if offset == 0:
+            return True
+        if not 0 < offset <= self.size:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+
+
+# 1. 사이드카 인덱스 (시간 + 필드별 posting list)
+# =================================
+
+class HistoryIndex(TimeOffsetIndex):
+    """시간 인덱스와 필드 값별 레코드 오프셋 목록을 함께 담은 사이드카 인덱스
+
+    streamio.write_ndjson(..., indexer=index) 로 파일을 쓰면서 add() 로 채우거나,
+    build() 로 기존 파일을 읽어 만든 뒤 save() 로 '<파일>.index' 에 저장합니다.
+    """
+
+    def __init__(self, path, time_key=event_time_key, block_size=DEFAULT_BLOCK_SIZE, fields=INDEXED_FIELDS):
+        super().__init__(path, time_key, block_size)
+        self.fields = tuple(fields)
+        self.postings = {field: {} for field in self.fields}
+
+    @classmethod
+    def build(cls, path, time_key=None, block_size=DEFAULT_BLOCK_SIZE, fields=INDEXED_FIELDS):
+        """기존 NDJSON 파일을 처음부터 읽어 인덱스를 만듭니다."""
+        index = None
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    record = decode(line)
+                    if index is None:
+                        index = cls(path, time_key or time_key_for(record), block_size, fields)
+                    index.size = offset
+                    index.add(record, len(line))
+                offset += len(line)
+        index = index or cls(path, time_key or event_time_key, block_size, fields)
+        index.size = offset
+        return index
+
+    def add(self, record, nbytes):
+        """파일 끝에 nbytes 바이트로 기록된 레코드 하나를 인덱스에 추가합니다."""
+        self._add_time(self.time_key(record))
+        offset = self.size
+        for field in self.fields:
+            value = record.get(field)
+            if value is not None:
+                postings = self.postings[field]
+                offsets = postings.get(value)
+                if offsets is None:
+                    offsets = postings[value] = array("q")
+                offsets.append(offset)
+        self.size += nbytes
+
+    def truncate(self, offset):
+        """offset 이후의 레코드를 인덱스에서 지웁니다. (정렬된 파일의 꼬리를 다시 쓰기 전에 호출)
+
+        다음에 add() 하는 레코드는 offset 위치에 기록된 것으로 봅니다.
+        """
+        block = bisect.bisect_left(self.offsets, offset)
+        del self.times[block:]
+        del self.offsets[block:]
+        del self.ordinals[block:]
+        for postings in self.postings.values():
+            for value in list(postings):
+                offsets = postings[value]
+                del offsets[bisect.bisect_left(offsets, offset):]
+                if not offsets:
+                    del postings[value]
+
+        # 남은 마지막 블록에서 offset 앞까지만 읽어 레코드 수와 마지막 시각을 다시 구함
+        self.count = 0
+        self.last_time = None
+        if self.offsets:
+            last_line = None
+            with open(self.path, "rb") as f:
+                pos = f.seek(self.offsets[-1])
+                lines = 0
+                while pos < offset:
+                    line = f.readline()
+                    if not line:
+                        break
+                    pos += len(line)
+                    if line.strip():
+                        lines += 1
+                        last_line = line
+            self.count = self.ordinals[-1] + lines
+            self.last_time = self.time_key(decode(last_line))
+        self.size = offset
+        self._block_fill = self.block_size   # 잘린 블록은 닫고, 다음 레코드부터 새 블록
+
+    # 저장 / 불러오기
+    # =================================
+
+    def save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "timeKey": next(name for name, key in TIME_KEYS.items() if key is self.time_key),
+            "blockSize": self.block_size,
+            "fields": self.fields,
+            "times": self.times,
+            "offsets": self.offsets,
+            "ordinals": self.ordinals,
+            "count": self.count,
+            "size": self.size,
+            "lastTime": self.last_time,
+            "postings": self.postings,
+        }
+        tmp_path = index_path_for(self.path) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path_for(self.path))
+
+    @classmethod
+    def load_for(cls, path):
+        """파일의 사이드카 인덱스를 읽습니다. 없거나 파일이 그 뒤로 바뀌었으면 None 을 돌려줍니다."""
+        sidecar = index_path_for(path)
+        if not os.path.exists(sidecar) or not os.path.exists(path):
+            return None
+        with open(sidecar, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != INDEX_VERSION or data["size"] != os.path.getsize(path):
+            return None
+        index = cls(path, TIME_KEYS[data["timeKey"]], data["blockSize"], data["fields"])
+        index.times = data["times"]
+        index.offsets = data["offsets"]
+        index.ordinals = data["ordinals"]
+        index.count = data["count"]
+        index.size = data["size"]
+        index.last_time = data["lastTime"]
+        index.postings = data["postings"]
+        index._block_fill = index.block_size   # 이어서 추가하면 새 블록에서 시작
+        return index
+
+    @classmethod
+    def load_or_build(cls, path, block_size=DEFAULT_BLOCK_SIZE):
+        """사이드카 인덱스를 읽고, 없거나 오래되었으면 다시 만들어 저장합니다."""
+        index = cls.load_for(path)
+        if index is None:
+            index = cls.build(path, block_size=block_size)
+            index.save()
+        return index
+
+    # 2. 조회
+    # =================================
+
+    def values(self, field):
+        """필드에 나타난 값 목록 (FilterOptions 용)"""
+        return sorted(self.postings[field])
+
+    def _candidate_offsets(self, filters):
+        """필드 필터마다 오프셋 목록을 구합니다. 값이 여러 개면 합집합 (정렬 유지)"""
+        lists = []
+        for field, values in filters.items():
+            if field not in self.postings:
+                raise ValueError(f"인덱스에 없는 필드입니다: {field}")
+            if isinstance(values, str):
+                values = [values]
+            found = [self.postings[field][v] for v in dict.fromkeys(values) if v in self.postings[field]]
+            if not found:
+                return None
+            lists.append(found[0] if len(found) == 1 else array("q", heapq.merge(*found)))
+        return lists
+
+    def iter_matching_offsets(self, filters=None, time_range=None, cursor=0):
+        """조건에 맞는 레코드의 오프셋을 파일 순서(= 시간순)로 돌려줍니다.
+
+        filters: {필드: 값 또는 값 목록}, time_range: (시작, 끝) eventTime (끝 포함)
+        """
+        lo, hi = cursor, self.size
+        if time_range is not None:
+            start, end = time_range
+            if start is not None:
+                lo = max(lo, self.offset_for_time(start))
+            if end is not None:
+                hi = self.offset_for_time(end + 1)
+        lists = self._candidate_offsets(filters or {})
+        if lists is None:
+            return
+        if not lists:
+            yield from self._iter_line_offsets(lo, hi)
+            return
+
+        # 가장 짧은 목록을 기준으로 나머지 목록에 있는지 이분 탐색
+        lists.sort(key=len)
+        base, others = lists[0], lists[1:]
+        for i in range(bisect.bisect_left(base, lo), bisect.bisect_left(base, hi)):
+            offset = base[i]
+            if all(_contains(other, offset) for other in others):
+                yield offset
+
+    def _iter_line_offsets(self, lo, hi):
+        with open(self.path, "rb") as f:
+            f.seek(lo)
+            pos = lo
+            while pos < hi:
+                line = f.readline()
+                if not line:
+                    return
+                if line.strip():
+                    yield pos
+                pos += len(line)
+
+    def query(self, filters=None, time_range=None, cursor=None, limit=DEFAULT_QUERY_LIMIT):
+        """필터에 맞는 레코드를 최대 limit 개 읽어 PaginatedResponse 형식으로 돌려줍니다.
+
+        cursor 는 이전 응답의 nextCursor (다음 레코드의 바이트 오프셋 문자열) 입니다.
+        """
+        start = int(cursor) if cursor and str(cursor).isdigit() else 0
+        if cursor and (not str(cursor).isdigit() or not self.is_line_start(start)):
+            raise ValueError(f"잘못된 커서입니다: {cursor}")
+        data = []
+        next_cursor = None
+        with open(self.path, "rb") as f:
+            for offset in self.iter_matching_offsets(filters, time_range, start):
+                if len(data) == limit:
+                    next_cursor = str(offset)
+                    break
+                f.seek(offset)
+                data.append(decode(f.readline()))
+        return {"data": data, "nextCursor": next_cursor}
+
+
+def _contains(offsets, value):
+    i = bisect.bisect_left(offsets, value)
+    return i < len(offsets) and offsets[i] == value
+
+
+# 3. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="이력 NDJSON 파일의 사이드카 인덱스를 만들고, 필터 조건으로 조회합니다.")
+    parser.add_argument("-i", "--input", default="full_epc_history.ndjson", help="입력 파일 이름 (압축하지 않은 ndjson)")
+    parser.add_argument("--rebuild", action="store_true", help="사이드카 인덱스를 무조건 다시 생성")
+    parser.add_argument("--epc", action="append", help="epcCode 필터 (여러 번 지정 가능)")
+    parser.add_argument("--location", action="append", help="scanLocation 필터 (여러 번 지정 가능)")
+    parser.add_argument("--step", action="append", help="businessStep 필터 (여러 번 지정 가능)")
+    parser.add_argument("--since", type=int, help="eventTime 시작 (epoch 초, 포함)")
+    parser.add_argument("--until", type=int, help="eventTime 끝 (epoch 초, 포함)")
+    parser.add_argument("--cursor", help="이전 조회 결과의 nextCursor")
+    parser.add_argument("--limit", type=int, default=DEFAULT_QUERY_LIMIT, help="한 페이지의 최대 레코드 수")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.rebuild:
+        index = HistoryIndex.build(args.input)
+        index.save()
+    else:
+        index = HistoryIndex.load_or_build(args.input)
+
+    filters = {
+        field: values
+        for field, values in (("epcCode", args.epc), ("scanLocation", args.location), ("businessStep", args.step))
+        if values
+    }
+    time_range = (args.since, args.until) if args.since is not None or args.until is not None else None
+    page = index.query(filters, time_range, args.cursor, args.limit)
+    print(get_encoder().pretty(page).decode("utf-8"))
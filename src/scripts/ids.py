@@ -0,0 +1,225 @@
+import argparse
+import itertools
+import json
+import os
+from array import array
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from streamio import iter_records
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+# roadId / eventId / EPC 일련번호 할당
+# =================================
+# - roadId, EPC 일련번호: 샤드(워커)마다 IdAllocator 에서 겹치지 않는 연속 구간(IdBlock)을
+#   미리 예약하고, 샤드 안에서는 그 구간 안의 번호만 사용합니다. 여러 번의 create.py
+#   실행에 걸쳐 번호가 겹치지 않아야 하면(증분 이력 등) IdLedger 파일에서 구간을 예약합니다.
+# - eventId: (roadId, 트립 이력 안의 순번)을 64비트 정수 하나로 묶습니다.
+#       eventId = roadId << 16 | seq   (seq: 1 ~ 65535)
+#   예전 방식(문자열 이어 붙이기)은 roadId 1 의 11번째 이벤트와 roadId 11 의 1번째
+#   이벤트가 같은 id(111)가 되었습니다. 프론트엔드는 이력의 연속한 두 이벤트를
+#   "<eventId>-<eventId>" 문자열(historyLegId)로 묶으므로 두 id 를 숫자로 합치지 않습니다.
+# - verify_unique_ids: 출력 파일의 id 중복을 한 번 훑어서(O(n)) 찾습니다.
+
+EVENT_SEQ_BITS = 16
+MAX_EVENT_SEQ = (1 << EVENT_SEQ_BITS) - 1
+# eventId 가 JavaScript Number 의 안전 정수 범위(2^53 - 1) 안에 있도록 제한
+# (프론트엔드가 JSON 의 eventId 를 Number 로 읽으므로, 넘으면 조용히 다른 값이 됨)
+MAX_ROAD_ID = (1 << (53 - EVENT_SEQ_BITS)) - 1
+LEDGER_VERSION = 1
+
+
+def pack_event_id(road_id, seq):
+    """(roadId, 순번) -> eventId"""
+    if not 0 <= road_id <= MAX_ROAD_ID:
+        raise ValueError(f"roadId 가 범위를 벗어났습니다: {road_id} (최대 {MAX_ROAD_ID})")
+    if not 1 <= seq <= MAX_EVENT_SEQ:
+        raise ValueError(f"이벤트 순번이 범위를 벗어났습니다: {seq} (1 ~ {MAX_EVENT_SEQ})")
+    return road_id << EVENT_SEQ_BITS | seq
+
+
+def unpack_event_id(event_id):
+    """eventId -> (roadId, 순번)"""
+    return event_id >> EVENT_SEQ_BITS, event_id & MAX_EVENT_SEQ
+
+
+# 1. 구간 예약
+# =================================
+
+class IdBlock(NamedTuple):
+    """예약된 연속 id 구간 [start, start + count)"""
+    start: int
+    count: int
+
+    @property
+    def stop(self):
+        return self.start + self.count
+
+
+class IdAllocator:
+    """한 프로세스 안에서 겹치지 않는 연속 구간을 차례로 예약합니다."""
+
+    def __init__(self, start=1):
+        self.next = start
+
+    def reserve(self, count):
+        if count < 0:
+            raise ValueError(f"예약할 개수는 0 이상이어야 합니다: {count}")
+        block = IdBlock(self.next, count)
+        self.next = block.stop
+        return block
+
+
+@contextmanager
+def _locked(path):
+    """원장 파일 옆의 잠금 파일로 다른 프로세스의 동시 예약을 막습니다. (fcntl 이 없으면 잠그지 않음)"""
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class IdLedger:
+    """여러 번의 실행에 걸쳐 id 구간을 예약하는 원장 (이름 -> 다음에 쓸 id 또는 시각, JSON 파일)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != LEDGER_VERSION:
+            raise ValueError(f"지원하지 않는 id 원장 버전입니다: {data.get('version')}")
+        return data["next"]
+
+    def _save(self, next_ids):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": LEDGER_VERSION, "next": next_ids}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reserve(self, name, count, start=1):
+        """name 의 다음 구간 count 개를 예약합니다. 원장에 name 이 없으면 start 부터 시작합니다."""
+        if count < 0:
+            raise ValueError(f"예약할 개수는 0 이상이어야 합니다: {count}")
+        with _locked(self.path):
+            next_ids = self._load()
+            block = IdBlock(max(next_ids.get(name, start), start), count)
+            next_ids[name] = block.stop
+            self._save(next_ids)
+        return block
+
+    def get(self, name, default=None):
+        """name 의 다음 값 (원장에 없으면 default)"""
+        with _locked(self.path):
+            return self._load().get(name, default)
+
+    def advance(self, name, value):
+        """name 의 다음 값을 value 로 올립니다. 이미 value 이상이면 그대로 둡니다."""
+        with _locked(self.path):
+            next_ids = self._load()
+            next_ids[name] = max(next_ids.get(name, value), value)
+            self._save(next_ids)
+
+
+# 2. 중복 검사
+# =================================
+
+class PackedIdSet:
+    """(roadId, 순번) 집합. roadId 마다 64비트 마스크 하나로 순번 0~63 을 기록합니다.
+
+    roadId 는 구간 단위로 연속 할당되므로, 4096개씩 묶은 array('Q') 청크에 저장하면
+    id 하나당 파이썬 int 를 set 에 넣는 것보다 훨씬 적은 메모리로 O(1) 에 확인합니다.
+    순번이 64 이상인 드문 경우만 별도 set 에 저장합니다.
+    """
+    CHUNK_BITS = 12
+
+    def __init__(self):
+        self.chunks = {}
+        self.overflow = set()
+        self.count = 0
+
+    def add(self, road_id, seq=0):
+        """새 값이면 추가하고 True, 이미 있으면 False 를 돌려줍니다."""
+        if seq >= 64:
+            if (road_id, seq) in self.overflow:
+                return False
+            self.overflow.add((road_id, seq))
+        else:
+            chunk = self.chunks.get(road_id >> self.CHUNK_BITS)
+            if chunk is None:
+                chunk = self.chunks[road_id >> self.CHUNK_BITS] = array("Q", bytes(8 << self.CHUNK_BITS))
+            i = road_id & ((1 << self.CHUNK_BITS) - 1)
+            bit = 1 << seq
+            if chunk[i] & bit:
+                return False
+            chunk[i] |= bit
+        self.count += 1
+        return True
+
+
+def verify_unique_ids(records, field, max_duplicates=20):
+    """records 의 field(eventId 또는 roadId) 값이 모두 다른지 확인합니다.
+
+    {"field", "count", "duplicateCount", "duplicates"(앞의 최대 max_duplicates 개)} 를 돌려줍니다.
+    eventId 는 (roadId, 순번)으로 풀어서, roadId 는 순번 0 으로 PackedIdSet 에 기록합니다.
+    """
+    seen = PackedIdSet()
+    count = 0
+    duplicates = []
+    duplicate_count = 0
+    for record in records:
+        value = record.get(field)
+        if type(value) is not int or value < 0:
+            raise ValueError(f"{count + 1}번째 레코드의 {field} 가 0 이상의 정수가 아닙니다: {value!r}")
+        count += 1
+        road_id, seq = unpack_event_id(value) if field == "eventId" else (value, 0)
+        if not seen.add(road_id, seq):
+            duplicate_count += 1
+            if len(duplicates) < max_duplicates:
+                duplicates.append(value)
+    return {"field": field, "count": count, "duplicateCount": duplicate_count, "duplicates": duplicates}
+
+
+# 3. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="트립(roadId) / 이벤트(eventId) 파일의 id 중복을 검사합니다.")
+    parser.add_argument("-i", "--input", default="full_epc_history.ndjson", help="입력 파일 이름 (json 또는 ndjson)")
+    parser.add_argument("--input-format", choices=["json", "ndjson"], help="입력 형식 (기본값: 확장자로 판별)")
+    parser.add_argument("--field", choices=["eventId", "roadId"],
+                        help="검사할 id 필드 (기본값: 첫 레코드에 eventId 가 있으면 eventId, 없으면 roadId)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        records = iter_records(args.input, args.input_format)
+        first = next(records, None)
+    except FileNotFoundError:
+        print(f"오류: '{args.input}' 파일을 찾을 수 없습니다.")
+        exit()
+    if first is None:
+        print(f"오류: '{args.input}' 에 레코드가 없습니다.")
+        exit()
+    field = args.field or ("eventId" if "eventId" in first else "roadId")
+    try:
+        report = verify_unique_ids(itertools.chain([first], records), field)
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
+    if report["duplicateCount"]:
+        shown = ", ".join(str(v) for v in report["duplicates"])
+        print(f"오류: {report['count']}개 중 {report['duplicateCount']}개의 {field} 가 중복되었습니다. (예: {shown})")
+        exit(1)
+    print(f"✅ 완료: '{args.input}' 의 {field} {report['count']}개가 모두 고유합니다.")
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+from array import array
+
+# 증분(append) 모드용 처리 이력 매니페스트
+# =================================
+# generate_history.py --incremental 이 이미 이력으로 펼친 트립과 clone EPC 를 출력 파일
+# 옆의 작은 JSON 파일에 기록해 두고, 다음 실행에서는 새 트립만 처리합니다.
+# 트립마다 roadId 와 함께 (epcCode, from.eventTime) 지문을 '<출력>.manifest.keys' 에
+# 저장합니다. --id-ledger 없이 만든 두 배치는 roadId 가 같은 1 부터 시작하므로, roadId 만
+# 보면 새 배치의 트립이 모두 이미 처리한 것으로 보여 조용히 버려집니다. 같은 roadId 에
+# 다른 지문이 오면 오류를 냅니다.
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path_for(output_path):
+    return output_path + ".manifest.json"
+
+
+def keys_path_for(output_path):
+    return output_path + ".manifest.keys"
+
+
+def trip_fingerprint(trip):
+    """트립 내용의 64비트 지문 (0 은 '없음' 표시로 쓰므로 항상 0 이 아닌 값)"""
+    text = f"{trip['epcCode']}\x1f{trip['from']['eventTime']}"
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little") | 1
+
+
+class TripFingerprints:
+    """roadId -> 지문. ids.PackedIdSet 처럼 4096개씩 묶은 array('Q') 청크에 저장합니다."""
+    CHUNK_BITS = 12
+
+    def __init__(self):
+        self.chunks = {}
+        self.count = 0
+
+    def get(self, road_id):
+        """road_id 의 지문 (없으면 0)"""
+        chunk = self.chunks.get(road_id >> self.CHUNK_BITS)
+        return chunk[road_id & ((1 << self.CHUNK_BITS) - 1)] if chunk is not None else 0
+
+    def set(self, road_id, fingerprint):
+        chunk = self.chunks.get(road_id >> self.CHUNK_BITS)
+        if chunk is None:
+            chunk = self.chunks[road_id >> self.CHUNK_BITS] = array("Q", bytes(8 << self.CHUNK_BITS))
+        i = road_id & ((1 << self.CHUNK_BITS) - 1)
+        if not chunk[i]:
+            self.count += 1
+        chunk[i] = fingerprint
+
+    def save(self, path):
+        """청크마다 [청크 번호, 지문 4096개] 를 이어 쓴 바이너리 파일로 저장합니다."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for key in sorted(self.chunks):
+                array("Q", [key]).tofile(f)
+                self.chunks[key].tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        fingerprints = cls()
+        values = array("Q")
+        with open(path, "rb") as f:
+            values.frombytes(f.read())
+        stride = 1 + (1 << cls.CHUNK_BITS)
+        if len(values) % stride:
+            raise ValueError(f"'{path}' 가 손상되었습니다. --incremental 없이 전체를 다시 생성해주세요.")
+        for offset in range(0, len(values), stride):
+            chunk = values[offset + 1:offset + stride]
+            fingerprints.chunks[values[offset]] = chunk
+            fingerprints.count += len(chunk) - chunk.count(0)
+        return fingerprints
+
+
+class HistoryManifest:
+    """이력 출력 파일 하나에 대한 처리 이력"""
+
+    def __init__(self, output_path, trips=None, clone_epcs=None, event_count=0, size=0):
+        self.output_path = output_path
+        self.trips = trips if trips is not None else TripFingerprints()
+        self.clone_epcs = clone_epcs if clone_epcs is not None else set()
+        self.event_count = event_count
+        self.size = size
+
+    @classmethod
+    def load_for(cls, output_path):
+        """출력 파일의 매니페스트를 읽습니다. 출력 파일이 없으면 빈 매니페스트를 돌려줍니다.
+
+        매니페스트에 기록된 크기와 실제 출력 파일 크기가 다르면 ValueError 를 발생시킵니다.
+        """
+        path = manifest_path_for(output_path)
+        if not os.path.exists(output_path):
+            return cls(output_path)
+        if not os.path.exists(path):
+            raise ValueError(f"'{output_path}' 에 대한 매니페스트가 없습니다. --incremental 없이 전체를 다시 생성해주세요.")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"지원하지 않는 매니페스트 버전입니다: {data.get('version')}. "
+                             f"--incremental 없이 전체를 다시 생성해주세요.")
+        if data["size"] != os.path.getsize(output_path):
+            raise ValueError(f"'{output_path}' 가 매니페스트 기록 이후 변경되었습니다. --incremental 없이 전체를 다시 생성해주세요.")
+        try:
+            trips = TripFingerprints.load(keys_path_for(output_path))
+        except FileNotFoundError:
+            raise ValueError(f"'{keys_path_for(output_path)}' 가 없습니다. --incremental 없이 전체를 다시 생성해주세요.") from None
+        if trips.count != data["tripCount"]:
+            raise ValueError(f"'{keys_path_for(output_path)}' 가 매니페스트와 맞지 않습니다. --incremental 없이 전체를 다시 생성해주세요.")
+        return cls(
+            output_path,
+            trips=trips,
+            clone_epcs=set(data["cloneEpcs"]),
+            event_count=data["eventCount"],
+            size=data["size"],
+        )
+
+    def save(self):
+        self.size = os.path.getsize(self.output_path)
+        self.trips.save(keys_path_for(self.output_path))
+        data = {
+            "version": MANIFEST_VERSION,
+            "tripCount": self.trips.count,
+            "cloneEpcs": sorted(self.clone_epcs),
+            "eventCount": self.event_count,
+            "size": self.size,
+        }
+        tmp_path = manifest_path_for(self.output_path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path_for(self.output_path))
+
+    def iter_new_trips(self, trips):
+        """이미 처리한 트립은 건너뛰고, 새 트립은 처리한 것으로 기록하며 돌려줍니다.
+
+        이미 처리한 roadId 에 내용(지문)이 다른 트립이 오면 ValueError 를 발생시킵니다.
+        """
+        for trip in trips:
+            road_id = trip["roadId"]
+            fingerprint = trip_fingerprint(trip)
+            known = self.trips.get(road_id)
+            if known == fingerprint:
+                continue
+            if known:
+                raise ValueError(f"roadId {road_id} 는 이미 처리한 다른 트립의 id 입니다. 여러 번 생성한 트립 배치를 "
+                                 f"이어 붙이려면 create.py 를 같은 --id-ledger 로 실행해 id 가 겹치지 않게 해주세요.")
+            self.trips.set(road_id, fingerprint)
+            yield trip
@@ -0,0 +1,287 @@
+import cProfile
+import functools
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# 생성 파이프라인 계측
+# =================================
+# create.py / generate_history.py 의 단계(생성, create_trip, generate_epc_history, 정렬,
+# 기록 등)별 시간과 처리 개수, 카운터(시나리오 유형별 트립 수, 건너뛴 트립 수 등),
+# 분포(트립당 이벤트 수)를 모아 JSON 메트릭 파일로 남깁니다. --progress 를 주면 일정
+# 간격으로 현재 단계와 단계별 처리량을 stderr 에 출력하므로, 큰 작업이 멈춘 것처럼
+# 보일 때 어느 단계에 있는지 바로 알 수 있습니다.
+#
+# 단계 시간은 "순수 시간"입니다. 단계 안에서 다른 단계(앞 단계의 next(), 감싼 함수 등)를
+# 부르면 그 시간은 안쪽 단계에만 더해지므로, 모든 단계의 시간을 더하면 전체 시간이 됩니다.
+# 계측을 켜지 않으면 timed_iter / wrap 은 원래 이터레이터와 함수를 그대로 돌려주므로
+# 파이프라인에 추가 비용이 없습니다.
+
+DEFAULT_TOP_ENTRIES = 20   # 프로파일 / 메모리 할당 상위 항목 수
+
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 메모리(peak RSS, MB). 측정할 수 없으면 None"""
+    if resource is None:
+        return None
+    # 리눅스의 ru_maxrss 는 KB, macOS 는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+class PipelineMetrics:
+    """파이프라인 한 번 실행의 단계 시간 / 카운터 / 분포 / 프로파일을 모읍니다."""
+
+    def __init__(self, script, enabled=True, path=None, progress_interval=None, profile_path=None,
+                 trace_memory=False):
+        self.script = script
+        self.enabled = enabled
+        self.path = path
+        self.progress_interval = progress_interval
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.stages = {}          # 이름 -> {"seconds", "inclusiveSeconds", "calls", "items"}
+        self.counters = {}        # 이름 -> 정수 또는 {키: 정수}
+        self.distributions = {}   # 이름 -> {"count", "sum", "min", "max", "histogram"}
+        self._stack = []          # 실행 중인 단계: [이름, 시작 시각, 안쪽 단계 시간]
+        self._profiler = None
+        self._progress_thread = None
+        self._stop = threading.Event()
+        self.started = None
+        self.started_at = None
+
+    # 1. 단계 시간
+    # =================================
+
+    def _stage(self, name):
+        stat = self.stages.get(name)
+        if stat is None:
+            stat = self.stages[name] = {"seconds": 0.0, "inclusiveSeconds": 0.0, "calls": 0, "items": 0}
+        return stat
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self):
+        name, start, child_seconds = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        stat = self._stage(name)
+        stat["seconds"] += elapsed - child_seconds
+        stat["inclusiveSeconds"] += elapsed
+        stat["calls"] += 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def stage(self, name):
+        """with 블록 하나를 단계로 잽니다. 처리 개수는 돌려받은 dict 의 "items" 에 기록합니다."""
+        if not self.enabled:
+            yield {}
+            return
+        stat = self._stage(name)
+        self._enter(name)
+        try:
+            yield stat
+        finally:
+            self._exit()
+
+    def timed_iter(self, name, iterable, each=None):
+        """이터레이터의 next() 안에서 보낸 시간을 name 단계로 잽니다. each 는 항목마다 호출됩니다."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable, each, self._stage(name))
+
+    def _timed_iter(self, name, iterable, each, stat):
+        it = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            stat["items"] += 1
+            if each is not None:
+                each(item)
+            yield item
+
+    def wrap(self, name, func, each=None):
+        """함수 호출 시간을 name 단계로 잽니다. each 는 호출 결과마다 호출됩니다."""
+        if not self.enabled:
+            return func
+        self._stage(name)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            self._enter(name)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                self._exit()
+            if each is not None:
+                each(result)
+            return result
+        return timed
+
+    # 2. 카운터 / 분포
+    # =================================
+
+    def count(self, name, key=None, n=1):
+        if key is None:
+            self.counters[name] = self.counters.get(name, 0) + n
+        else:
+            counts = self.counters.setdefault(name, {})
+            counts[key] = counts.get(key, 0) + n
+
+    def observe(self, name, value):
+        dist = self.distributions.get(name)
+        if dist is None:
+            dist = self.distributions[name] = {"count": 0, "sum": 0, "min": value, "max": value, "histogram": {}}
+        dist["count"] += 1
+        dist["sum"] += value
+        dist["min"] = min(dist["min"], value)
+        dist["max"] = max(dist["max"], value)
+        dist["histogram"][value] = dist["histogram"].get(value, 0) + 1
+
+    # 3. 시작 / 진행 상황 / 종료
+    # =================================
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.progress_interval:
+            self._progress_thread = threading.Thread(target=self._report_progress, daemon=True)
+            self._progress_thread.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def progress_line(self, last_items=None, interval=None):
+        """현재 단계와 단계별 처리 개수(및 직전 출력 이후의 처리 속도)를 한 줄로 만듭니다."""
+        elapsed = time.perf_counter() - self.started
+        try:
+            current = self._stack[-1][0]
+        except IndexError:
+            current = "-"
+        parts = [f"[진행 {elapsed:,.0f}s] 단계: {current}"]
+        for name, stat in list(self.stages.items()):
+            if not stat["items"]:
+                continue
+            part = f"{name} {stat['items']:,}"
+            if last_items is not None and interval:
+                part += f" ({(stat['items'] - last_items.get(name, 0)) / interval:,.0f}/s)"
+            parts.append(part)
+        peak = peak_rss_mb()
+        if peak is not None:
+            parts.append(f"peak RSS {peak:,.0f}MB")
+        return " | ".join(parts)
+
+    def _report_progress(self):
+        last_items = {}
+        while not self._stop.wait(self.progress_interval):
+            print(self.progress_line(last_items, self.progress_interval), file=sys.stderr, flush=True)
+            last_items = {name: stat["items"] for name, stat in list(self.stages.items())}
+
+    def finish(self, result=None):
+        """계측을 멈추고, 메트릭 파일 경로가 있으면 기록합니다. 기록한 dict 를 돌려줍니다."""
+        if not self.enabled:
+            return None
+        self._stop.set()
+        if self._progress_thread is not None:
+            self._progress_thread.join()
+        profile = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            profile = {"path": self.profile_path, "top": _top_functions(self._profiler)}
+        memory = None
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:DEFAULT_TOP_ENTRIES]
+            tracemalloc.stop()
+            memory = {
+                "currentMb": current / (1024 * 1024), "peakMb": peak / (1024 * 1024),
+                "top": [{"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                         "sizeMb": stat.size / (1024 * 1024), "count": stat.count} for stat in top],
+            }
+
+        report = self.to_dict(time.perf_counter() - self.started, result)
+        report["profile"] = profile
+        report["tracemalloc"] = memory
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def to_dict(self, seconds, result=None):
+        stages = {}
+        for name, stat in self.stages.items():
+            stages[name] = dict(stat, itemsPerSec=stat["items"] / stat["seconds"] if stat["items"] and stat["seconds"] else None)
+        distributions = {}
+        for name, dist in self.distributions.items():
+            distributions[name] = dict(dist, mean=dist["sum"] / dist["count"],
+                                       histogram={str(k): v for k, v in sorted(dist["histogram"].items())})
+        return {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "startedAt": self.started_at,
+            "seconds": seconds,
+            "peakRssMb": peak_rss_mb(),
+            "stages": stages,
+            "counters": self.counters,
+            "distributions": distributions,
+            "result": result,
+        }
+
+
+def _top_functions(profiler, limit=DEFAULT_TOP_ENTRIES):
+    """자체 시간(tottime) 기준 상위 함수 목록"""
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {"function": f"{os.path.basename(filename)}:{lineno}({name})", "calls": nc, "tottime": tt, "cumtime": ct}
+        for (filename, lineno, name), (cc, nc, tt, ct, callers) in top
+    ]
+
+
+# 4. 명령행 옵션
+# =================================
+
+def add_metrics_arguments(parser):
+    group = parser.add_argument_group("계측", "단계별 시간 / 카운터 / 프로파일 (지정하지 않으면 계측하지 않음)")
+    group.add_argument("--metrics", help="단계별 시간, 카운터, 분포를 기록할 JSON 메트릭 파일 경로")
+    group.add_argument("--progress", type=float, metavar="SECONDS",
+                       help="지정한 초마다 현재 단계와 처리량을 stderr 에 출력")
+    group.add_argument("--profile", metavar="PATH",
+                       help="cProfile 결과(.prof)를 기록할 경로 (상위 함수는 메트릭 파일에도 기록, --workers 사용 시 부모 프로세스만)")
+    group.add_argument("--trace-memory", action="store_true",
+                       help="tracemalloc 으로 메모리 할당 상위 위치를 메트릭 파일에 기록 (--metrics 필요, 매우 느려짐)")
+
+
+def metrics_from_args(script, args):
+    """명령행 옵션으로 PipelineMetrics 를 만듭니다. 계측 옵션이 없으면 아무것도 하지 않는 객체입니다."""
+    if args.trace_memory and not args.metrics:
+        raise ValueError("--trace-memory 는 --metrics 와 함께 사용해야 합니다.")
+    if args.progress is not None and args.progress <= 0:
+        raise ValueError("--progress 는 0보다 커야 합니다.")
+    enabled = bool(args.metrics or args.progress or args.profile)
+    return PipelineMetrics(script, enabled=enabled, path=args.metrics, progress_interval=args.progress,
+                           profile_path=args.profile, trace_memory=args.trace_memory)
@@ -0,0 +1,414 @@
+import argparse
+import heapq
+import json
+import math
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from catalog import get_topology
+
+# 트립 생성 부하 프로필
+# =================================
+# create.py --load-profile 에 넘기는 JSON 설정으로, 정상 / 이상 트립의 비율과 이상 시나리오
+# 구성, 시간대별(하루 24시간) / 요일별 교통량 곡선, 거점(노드)별 물동량 가중치, 특정
+# 시간대에 물동량이 몰리는 버스트 구간을 정합니다. (예시: load_profile.json)
+# anomalyRate 는 도착 하나가 이상 시나리오가 될 확률이므로, 복제 시나리오(트립 2~3개)가
+# 있으면 이상 트립의 비율은 그보다 조금 높습니다.
+#
+# 트립 시작 시각은 시간당 평균 tripsPerHour 건인 비균질 포아송 과정으로 만듭니다.
+# 한 시간 구간 안에서는 발생률이 일정하므로 지수 분포 간격으로 다음 시각을 구하고,
+# 구간을 넘어가면 남은 "단위 지수 시간"을 다음 구간으로 넘깁니다.
+# 가중치 추출(시나리오, 거점, 상품 등)은 모두 미리 만든 별칭 표(alias table)를 써서
+# 가중치 개수와 관계없이 한 번에 난수 하나로 O(1) 에 뽑습니다. 서로 다른 거점 여러 개
+# (복제 경로, 이상 트립의 출발 / 도착지)는 Efraimidis-Spirakis 방식으로 후보를 한 번만
+# 훑어 뽑으므로, 가중치가 치우쳐 있어도 다시 뽑는 일이 없습니다.
+
+PROFILE_VERSION = 1
+SCENARIOS = ("fake", "tamper", "rule_violation", "clone")
+VIOLATIONS = ("reverse", "hop", "forbidden")
+DURATION_KINDS = ("normal", "anomaly", "clone")
+DEFAULT_DURATION_HOURS = {"normal": [2, 8], "anomaly": [5, 10], "clone": [2, 5]}
+SLOT = timedelta(hours=1)
+
+
+class AliasTable:
+    """Walker / Vose 별칭 표: 가중치에 비례해 항목 하나를 O(1) 에 뽑습니다."""
+    __slots__ = ("items", "weights", "aliases", "prob", "n")
+
+    def __init__(self, items, weights):
+        pairs = [(item, float(weight)) for item, weight in zip(items, weights) if weight > 0]
+        if not pairs:
+            raise ValueError("가중치가 0보다 큰 항목이 하나 이상 있어야 합니다.")
+        n = len(pairs)
+        total = sum(weight for _, weight in pairs)
+        scaled = [weight * n / total for _, weight in pairs]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 남은 항목은 부동소수점 오차만큼만 1 에서 벗어나 있으므로 항상 자기 자신을 뽑음
+        self.items = [item for item, _ in pairs]
+        self.weights = [weight for _, weight in pairs]
+        self.aliases = [self.items[j] for j in alias]
+        self.prob = prob
+        self.n = n
+
+    def sample(self, rng):
+        u = rng.random() * self.n
+        i = int(u)
+        return self.items[i] if u - i < self.prob[i] else self.aliases[i]
+
+    def sample_distinct(self, rng, k):
+        """서로 다른 항목 k 개를 뽑습니다. (가중치 비례 비복원 추출, O(n log k))
+
+        항목마다 log(u) / 가중치 (u: (0, 1] 균등 난수) 를 키로 두고 큰 순서로 k 개를 고르면,
+        가중치에 비례해 하나씩 비복원으로 뽑은 것과 같은 분포와 순서가 됩니다. (Efraimidis-Spirakis)
+        """
+        if k > self.n:
+            raise ValueError(f"가중치가 0보다 큰 항목이 {self.n}개뿐이라 서로 다른 {k}개를 뽑을 수 없습니다.")
+        keys = [math.log(1.0 - rng.random()) / weight for weight in self.weights]
+        return [self.items[i] for i in heapq.nlargest(k, range(self.n), key=keys.__getitem__)]
+
+
+class HubTables:
+    """버스트 조합 하나에 대한 거점 추출 표와 발생률 배수"""
+
+    def __init__(self, topology, weights, flow_steps):
+        nodes = topology.nodes
+        self.rate_factor = 1.0
+        self.nodes = AliasTable(nodes, [weights[n["scanLocation"]] for n in nodes])
+        # 정상 트립의 출발지: 다음 단계에 노드가 있는 단계의 노드
+        sources = [n for n in nodes if n["businessStep"] in flow_steps]
+        self.sources = AliasTable(sources, [weights[n["scanLocation"]] for n in sources])
+        self.by_step = {}
+        for step, step_nodes in topology.nodes_by_step.items():
+            if any(weights[n["scanLocation"]] > 0 for n in step_nodes):
+                self.by_step[step] = AliasTable(step_nodes, [weights[n["scanLocation"]] for n in step_nodes])
+
+    def step(self, step):
+        table = self.by_step.get(step)
+        if table is None:
+            raise ValueError(f"'{step}' 단계에 가중치가 0보다 큰 노드가 없습니다.")
+        return table
+
+
+class LoadProfile:
+    """검증된 부하 프로필과 미리 계산한 추출 표"""
+
+    def __init__(self, data, topology=None):
+        validate_profile(data)
+        self.topology = topology = topology or get_topology()
+        self.trips_per_hour = float(data["tripsPerHour"])
+        self.anomaly_rate = float(data["anomalyRate"])
+        scenario_weights = {**{name: 0 for name in SCENARIOS}, **data.get("scenarioWeights", {})}
+        self.scenarios = AliasTable(SCENARIOS, [scenario_weights[name] for name in SCENARIOS])
+        # 복제 세트 한도에 도달한 뒤에 쓰는 표
+        single = [name for name in SCENARIOS if name != "clone" and scenario_weights[name] > 0]
+        self.single_scenarios = AliasTable(single, [scenario_weights[name] for name in single]) if single else None
+        violation_weights = {**{name: 1 for name in VIOLATIONS}, **data.get("ruleViolationWeights", {})}
+        self.violations = AliasTable(VIOLATIONS, [violation_weights[name] for name in VIOLATIONS])
+        self.max_clone_sets = data.get("maxCloneSets")
+        self.clones_per_set = tuple(data.get("clonesPerSet", [2, 3]))
+        self.duration_hours = {**DEFAULT_DURATION_HOURS, **data.get("durationHours", {})}
+        self.product_weights = data.get("productWeights")
+
+        # 곡선은 평균이 1 이 되도록 맞춰서, tripsPerHour 가 전체 평균 발생률이 되게 함
+        self.diurnal = _normalized(data.get("diurnal", [1] * 24))
+        self.weekly = _normalized(data.get("weekly", [1] * 7))
+
+        hub_weights = data.get("hubWeights", {})
+        by_step, by_location = hub_weights.get("byStep", {}), hub_weights.get("byLocation", {})
+        self.hub_weights = {
+            node["scanLocation"]: by_step.get(node["businessStep"], 1) * by_location.get(node["scanLocation"], 1)
+            for node in topology.nodes
+        }
+        self.flow_steps = {
+            step for step in topology.step_order
+            if topology.nodes_by_step.get(step) and topology.nodes_by_step.get(topology.next_step.get(step))
+        }
+        self.bursts = [
+            (_parse_time(burst["start"]), _parse_time(burst["end"]), float(burst["multiplier"]),
+             frozenset(burst.get("locations") or ()))
+            for burst in data.get("bursts", [])
+        ]
+        self._tables = {}
+
+    @classmethod
+    def load(cls, path, topology=None):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), topology)
+
+    def product_table(self, products):
+        """상품 추출 표 (productWeights 가 없으면 균등, 있으면 적지 않은 상품은 가중치 0)"""
+        if self.product_weights is None:
+            return AliasTable(products, [1] * len(products))
+        unknown = set(self.product_weights) - set(products)
+        if unknown:
+            raise ValueError(f"productWeights: 알 수 없는 상품입니다: {', '.join(sorted(unknown))}")
+        return AliasTable(products, [self.product_weights.get(product, 0) for product in products])
+
+    def hub_tables(self, active):
+        """활성 버스트 번호 튜플에 대한 HubTables (조합마다 한 번만 만듦)"""
+        tables = self._tables.get(active)
+        if tables is None:
+            weights = dict(self.hub_weights)
+            for i in active:
+                _, _, multiplier, locations = self.bursts[i]
+                for location in locations or weights:
+                    weights[location] *= multiplier
+            tables = HubTables(self.topology, weights, self.flow_steps)
+            base_total = sum(self.hub_weights.values())
+            tables.rate_factor = sum(weights.values()) / base_total if base_total else 0.0
+            self._tables[active] = tables
+        return tables
+
+    def iter_arrivals(self, start_time, rng, rate_scale=1.0):
+        """(트립 시작 시각, 그 시각의 HubTables) 를 시간순으로 끝없이 돌려줍니다.
+
+        rate_scale 은 발생률 배수입니다. 샤드 k 개가 같은 달력 구간을 1/k 배율로 각각
+        생성해 합치면, 전체는 배율 1 의 한 과정과 같은 분포가 됩니다.
+        """
+        slot = start_time.replace(minute=0, second=0, microsecond=0)
+        offset = (start_time - slot).total_seconds()
+        remaining = rng.expovariate(1.0)   # 다음 도착까지 남은 단위 지수 시간
+        per_second = self.trips_per_hour * rate_scale / SLOT.total_seconds()
+        while True:
+            active = tuple(i for i, (start, end, _, _) in enumerate(self.bursts) if start <= slot < end)
+            tables = self.hub_tables(active)
+            rate = per_second * self.diurnal[slot.hour] * self.weekly[slot.weekday()] * tables.rate_factor
+            if rate > 0:
+                while offset + remaining / rate < SLOT.total_seconds():
+                    offset += remaining / rate
+                    yield slot + timedelta(seconds=offset), tables
+                    remaining = rng.expovariate(1.0)
+                remaining -= (SLOT.total_seconds() - offset) * rate
+            slot += SLOT
+            offset = 0.0
+
+
+def _normalized(weights):
+    mean = sum(weights) / len(weights)
+    return [w / mean for w in weights]
+
+
+def _parse_time(value):
+    # 버스트는 한 시간 구간 단위로 적용되므로 정시로 내림
+    return datetime.fromisoformat(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_range(errors, where, value):
+    if (not isinstance(value, list) or len(value) != 2 or not all(_is_number(v) for v in value)
+            or not 0 <= value[0] <= value[1]):
+        errors.append(f"{where} 는 [최소, 최대] 형식이어야 합니다: {value}")
+
+
+def _typed(errors, where, value, kind):
+    """value 가 kind(dict 또는 list)이면 그대로, 아니면 오류를 남기고 빈 값을 돌려줍니다."""
+    if isinstance(value, kind):
+        return value
+    errors.append(f"{where} 는 {'객체' if kind is dict else '목록'}여야 합니다: {value!r}")
+    return kind()
+
+
+def validate_profile(data, topology=None):
+    """부하 프로필 JSON 을 검증합니다. 문제가 있으면 모든 오류를 모아 ValueError 를 발생시킵니다.
+
+    중첩된 항목은 안쪽 키를 읽기 전에 객체 / 목록인지 먼저 확인합니다.
+    """
+    topology = topology or get_topology()
+    if not isinstance(data, dict):
+        raise ValueError("부하 프로필 오류:\n  프로필은 JSON 객체여야 합니다.")
+    errors = []
+    if data.get("version") != PROFILE_VERSION:
+        errors.append(f"지원하지 않는 프로필 버전입니다: {data.get('version')}")
+    if not _is_number(data.get("tripsPerHour")) or data["tripsPerHour"] <= 0:
+        errors.append("tripsPerHour 는 0보다 큰 숫자여야 합니다.")
+    if not _is_number(data.get("anomalyRate")) or not 0 <= data["anomalyRate"] <= 1:
+        errors.append("anomalyRate 는 0 ~ 1 사이의 숫자여야 합니다.")
+
+    for key, names in (("scenarioWeights", SCENARIOS), ("ruleViolationWeights", VIOLATIONS)):
+        weights = _typed(errors, key, data.get(key, {}), dict)
+        unknown = set(weights) - set(names)
+        if unknown:
+            errors.append(f"{key}: 알 수 없는 항목입니다: {', '.join(sorted(unknown))}")
+        if any(not _is_number(w) or w < 0 for w in weights.values()):
+            errors.append(f"{key}: 가중치는 0 이상의 숫자여야 합니다.")
+    scenario_weights = data.get("scenarioWeights", {})
+    if isinstance(scenario_weights, dict) and "scenarioWeights" in data and not any(_is_number(w) and w > 0 for w in scenario_weights.values()):
+        errors.append("scenarioWeights: 가중치가 0보다 큰 시나리오가 하나 이상 있어야 합니다.")
+
+    max_clone_sets = data.get("maxCloneSets")
+    if max_clone_sets is not None and (type(max_clone_sets) is not int or max_clone_sets < 0):
+        errors.append("maxCloneSets 는 0 이상의 정수 또는 null 이어야 합니다.")
+    clones_per_set = data.get("clonesPerSet", [2, 3])
+    _check_range(errors, "clonesPerSet", clones_per_set)
+    if not errors and (type(clones_per_set[0]) is not int or type(clones_per_set[1]) is not int or clones_per_set[0] < 1):
+        errors.append("clonesPerSet 는 1 이상의 정수 범위여야 합니다.")
+    durations = _typed(errors, "durationHours", data.get("durationHours", {}), dict)
+    for kind in set(durations) - set(DURATION_KINDS):
+        errors.append(f"durationHours: 알 수 없는 항목입니다: {kind}")
+    for kind in DURATION_KINDS:
+        if kind in durations:
+            _check_range(errors, f"durationHours.{kind}", durations[kind])
+
+    for key, length in (("diurnal", 24), ("weekly", 7)):
+        curve = data.get(key)
+        if curve is None:
+            continue
+        if (not isinstance(curve, list) or len(curve) != length
+                or not all(_is_number(v) and v >= 0 for v in curve) or not any(curve)):
+            errors.append(f"{key} 는 0 이상의 숫자 {length}개 목록이어야 하고, 0 이 아닌 값이 있어야 합니다.")
+
+    locations = {node["scanLocation"] for node in topology.nodes}
+    hub_weights = _typed(errors, "hubWeights", data.get("hubWeights", {}), dict)
+    for step, weight in _typed(errors, "hubWeights.byStep", hub_weights.get("byStep", {}), dict).items():
+        if step not in topology.step_order:
+            errors.append(f"hubWeights.byStep: 알 수 없는 단계입니다: {step}")
+        if not _is_number(weight) or weight < 0:
+            errors.append(f"hubWeights.byStep.{step}: 가중치는 0 이상의 숫자여야 합니다.")
+    for location, weight in _typed(errors, "hubWeights.byLocation", hub_weights.get("byLocation", {}), dict).items():
+        if location not in locations:
+            errors.append(f"hubWeights.byLocation: 카탈로그에 없는 위치입니다: {location}")
+        if not _is_number(weight) or weight < 0:
+            errors.append(f"hubWeights.byLocation.{location}: 가중치는 0 이상의 숫자여야 합니다.")
+
+    product_weights = data.get("productWeights")
+    if product_weights is not None and (not isinstance(product_weights, dict)
+                                        or not all(_is_number(w) and w >= 0 for w in product_weights.values())
+                                        or not any(product_weights.values())):
+        errors.append("productWeights 는 상품 이름 -> 0 이상의 가중치이고, 0 이 아닌 값이 있어야 합니다.")
+
+    for i, burst in enumerate(_typed(errors, "bursts", data.get("bursts", []), list)):
+        where = f"bursts[{i}]"
+        if not isinstance(burst, dict):
+            errors.append(f"{where} 는 start / end / multiplier 를 가진 객체여야 합니다: {burst!r}")
+            continue
+        try:
+            if _parse_time(burst["start"]) >= _parse_time(burst["end"]):
+                errors.append(f"{where}: end 는 start 보다 한 시간 이상 뒤여야 합니다.")
+        except (KeyError, TypeError, ValueError):
+            errors.append(f"{where}: start / end 는 ISO 형식 시각이어야 합니다. (예: 2024-01-05T18:00:00)")
+        if not _is_number(burst.get("multiplier")) or burst["multiplier"] < 0:
+            errors.append(f"{where}: multiplier 는 0 이상의 숫자여야 합니다.")
+        burst_locations = _typed(errors, f"{where}.locations", burst.get("locations") or [], list)
+        if not all(isinstance(location, str) for location in burst_locations):
+            errors.append(f"{where}.locations 는 위치 이름 목록이어야 합니다.")
+            continue
+        unknown = set(burst_locations) - locations
+        if unknown:
+            errors.append(f"{where}: 카탈로그에 없는 위치입니다: {', '.join(sorted(unknown))}")
+
+    if not errors:
+        _check_hub_coverage(errors, data, topology)
+    if errors:
+        raise ValueError("부하 프로필 오류:\n  " + "\n  ".join(errors))
+
+
+def _hub_weight_sets(data, topology):
+    """(설명, 거점 가중치) 를 버스트 밖과 각 버스트가 시작하는 시각의 활성 조합마다 돌려줍니다.
+
+    가중치를 0 으로 만들 수 있는 것은 배수 0 인 버스트뿐이고, 활성 조합은 버스트가 시작할
+    때만 늘어나므로 이 시각들만 보면 실행 중에 나올 수 있는 가장 작은 가중치를 모두 봅니다.
+    """
+    hub_weights = data.get("hubWeights", {})
+    by_step, by_location = hub_weights.get("byStep", {}), hub_weights.get("byLocation", {})
+    base = {node["scanLocation"]: by_step.get(node["businessStep"], 1) * by_location.get(node["scanLocation"], 1)
+            for node in topology.nodes}
+    yield "", base
+    bursts = [(_parse_time(b["start"]), _parse_time(b["end"]), b["multiplier"], b.get("locations") or ())
+              for b in data.get("bursts", [])]
+    for i, (start, _, _, _) in enumerate(bursts):
+        weights = dict(base)
+        for active_start, active_end, multiplier, locations in bursts:
+            if active_start <= start < active_end:
+                for location in locations or weights:
+                    weights[location] *= multiplier
+        yield f" (bursts[{i}] 진행 중)", weights
+
+
+def _check_hub_coverage(errors, data, topology):
+    """생성 중에 뽑게 될 거점 표마다 가중치가 0보다 큰 노드가 충분한지 확인합니다.
+
+    확인하지 않으면 create.py 가 그 시나리오를 처음 만날 때 HubTables.step /
+    AliasTable.sample_distinct 에서 실패해 출력이 중간에 끊깁니다.
+    """
+    anomaly_rate = data["anomalyRate"]
+    scenario_weights = data.get("scenarioWeights", {})
+    violation_weights = {**{name: 1 for name in VIOLATIONS}, **data.get("ruleViolationWeights", {})}
+    uses = lambda name: anomaly_rate > 0 and scenario_weights.get(name, 0) > 0
+    clone_max = data.get("clonesPerSet", [2, 3])[1] if uses("clone") and data.get("maxCloneSets") != 0 else 0
+    violation_steps = set()
+    if uses("rule_violation"):
+        for violation, steps in (("reverse", ("Wholesaler", "LogiHub")), ("hop", ("LogiHub", "Reseller"))):
+            if violation_weights[violation] > 0:
+                violation_steps.update(steps)
+
+    reported = set()   # 버스트 밖에서 이미 나온 문제는 버스트마다 다시 알리지 않음
+    for where, weights in _hub_weight_sets(data, topology):
+        problems = []
+        needed_steps = set(violation_steps)
+        positive = [node for node in topology.nodes if weights[node["scanLocation"]] > 0]
+        positive_steps = {node["businessStep"] for node in positive}
+        if anomaly_rate < 1:
+            # 정상 트립: 다음 단계가 있는 단계에서 출발해 다음 단계 노드로 (매핑된 공장은 공장 창고로)
+            sources = [node for node in positive
+                       if topology.nodes_by_step.get(topology.next_step.get(node["businessStep"]))]
+            if not sources:
+                problems.append(("hubWeights", "정상 트립의 출발지가 될 가중치가 0보다 큰 노드가 없습니다."))
+            for node in sources:
+                if node["scanLocation"] not in topology.factory_to_wms:
+                    needed_steps.add(topology.next_step[node["businessStep"]])
+        for step in sorted(needed_steps - positive_steps, key=topology.step_order.index):
+            problems.append(("hubWeights", f"'{step}' 단계에 가중치가 0보다 큰 노드가 없습니다."))
+        if uses("rule_violation") and violation_weights["forbidden"] > 0:
+            resellers = sum(1 for node in positive if node["businessStep"] == "Reseller")
+            if resellers < 2:
+                problems.append(("hubWeights", f"rule_violation 'forbidden' 에는 가중치가 0보다 큰 Reseller 노드가 "
+                                               f"2개 이상 필요하지만 {resellers}개뿐입니다."))
+        if clone_max and len(positive) < clone_max * 2:
+            problems.append(("clonesPerSet", f"복제 {clone_max}개에는 가중치가 0보다 큰 노드가 {clone_max * 2}개 "
+                                             f"이상 필요하지만 {len(positive)}개뿐입니다."))
+        elif (uses("fake") or uses("tamper")) and len(positive) < 2:
+            problems.append(("hubWeights", "fake / tamper 트립에는 가중치가 0보다 큰 노드가 2개 이상 필요합니다."))
+        for key, message in problems:
+            if (key, message) not in reported:
+                reported.add((key, message))
+                errors.append(f"{key}{where}: {message}")
+
+
+@lru_cache(maxsize=None)
+def load_profile(path):
+    """프로세스 안에서 프로필을 한 번만 읽어 공유합니다. (샤드 작업 프로세스용)"""
+    return LoadProfile.load(path)
+
+
+# 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="트립 생성 부하 프로필을 검증하고 요약합니다.")
+    parser.add_argument("-i", "--input", default="load_profile.json", help="프로필 파일")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        profile = LoadProfile.load(args.input)
+    except FileNotFoundError:
+        print(f"오류: '{args.input}' 파일을 찾을 수 없습니다.")
+        exit()
+    except ValueError as e:
+        print(f"오류: {e}")
+        exit(1)
+    per_week = profile.trips_per_hour * 24 * 7
+    print(f"✅ 완료: '{args.input}' 프로필을 검증했습니다. "
+          f"(평균 시간당 {profile.trips_per_hour:g}건, 주당 약 {per_week:,.0f}건, 이상 비율 {profile.anomaly_rate:.2%}, "
+          f"버스트 {len(profile.bursts)}개)")
@@ -0,0 +1,254 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+
+from ids import EVENT_SEQ_BITS, MAX_EVENT_SEQ, pack_event_id
+
+# 생성기용 압축 레코드
+# =================================
+# create.py 의 트립과 generate_history.py 의 이벤트를 dict 대신 __slots__ 객체로 들고
+# 있다가, 직렬화할 때(encoders 의 default 훅, to_dict)에만 dict 로 바꿉니다.
+# 노드는 카탈로그의 dict 를 참조만 하고(좌표는 노드마다 한 번만 저장), 한 트립에서 나온
+# 이벤트들은 노드 튜플과 시각 배열, EPC / 제품 / 이상 정보를 담은 EventPath 하나를 함께
+# 참조하며 각 이벤트에는 경로 안의 순번만 저장합니다.
+#
+# 읽기 전용 Mapping 이므로 record["eventTime"], record.get("anomalyTypeList") 처럼
+# dict 를 기대하는 기존 코드(정렬 key, 매니페스트, 인덱스, columnar 등)는 그대로 동작하고,
+# to_dict() 결과는 예전 dict 와 키 순서까지 같습니다.
+
+# 상품명과 이상 description 은 정해진 목록 / 조합에서만 나오므로, 생성기와 columnar 의
+# 고정 사전이 같은 값을 쓰도록 여기에 둡니다.
+PRODUCTS = ["말보로 레드", "던힐 프로스트", "에쎄 체인지", "타이레놀 500mg", "아로나민 골드", "게보린"]
+ANOMALY_DESCRIPTIONS = {
+    "type_anomaly": {
+        "fake": "정식으로 등록되지 않은 새로운 EPC 코드가 감지되었습니다. 위조품일 가능성이 있습니다.",
+        "tamper": "기존 EPC 코드가 비정상적으로 변조된 것으로 의심됩니다.",
+        "clone": "하나의 EPC 코드가 동시간대에 여러 위치에서 동시에 감지되었습니다. 코드 복제를 통한 불법 유통일 수 있습니다.",
+    },
+    "percent_anomaly": "이 구간의 이동 패턴이 비정상적입니다. 시스템은 과거 데이터와 비교하여 높은 확률로 이상 이동으로 분류했습니다. (예: 경로 역행, 단계 건너뛰기, 비정상적 소요 시간 등)"
+}
+
+ANOMALY_TYPE_LISTS = {}   # 이상 유형 목록 -> 공유 튜플
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_types(types):
+    key = tuple(types)
+    return ANOMALY_TYPE_LISTS.setdefault(key, key)
+
+
+@lru_cache(maxsize=None)
+def outbound_event_type(business_step):
+    """이전 노드의 단계로 만든 이벤트 유형 문자열 (단계별로 하나만 만들어 공유)"""
+    return f"{business_step}_Outbound"
+
+
+@lru_cache(maxsize=None)
+def describe_anomaly(anomaly_type, percent):
+    """이상 유형과 수치로 트립 description 문자열을 만듭니다. (조합마다 한 번만 만들어 공유)"""
+    description_parts = []
+    if anomaly_type:
+        description_parts.append(ANOMALY_DESCRIPTIONS["type_anomaly"][anomaly_type])
+    if percent >= 50:
+        description_parts.append(ANOMALY_DESCRIPTIONS["percent_anomaly"])
+    return " ".join(description_parts)
+
+
+class _Record(Mapping):
+    """키 -> getter 표(_FIELDS)로 dict 처럼 읽히는 __slots__ 레코드의 공통 부분"""
+    __slots__ = ()
+    _FIELDS = {}
+
+    def __getitem__(self, key):
+        try:
+            getter = self._FIELDS[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self)
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        """_FIELDS 순서대로 만든 dict. getter 가 KeyError 를 내는 키(값이 없는 키)는 뺍니다.
+
+        하위 클래스는 직렬화가 빠르도록 같은 dict 를 직접 만들어 덮어씁니다.
+        """
+        record = {}
+        for key, getter in self._FIELDS.items():
+            try:
+                record[key] = getter(self)
+            except KeyError:
+                continue
+        return record
+
+
+def _point(node, event_time):
+    return {
+        "scanLocation": node["scanLocation"], "coord": node["coord"],
+        "eventTime": event_time, "businessStep": node["businessStep"]
+    }
+
+
+# 1. 트립
+# =================================
+
+class Trip(_Record):
+    """create.create_trip 이 만드는 트립 하나 (노드는 dict 참조, 시각은 epoch 초)"""
+    __slots__ = ("road_id", "from_node", "to_node", "from_time", "to_time",
+                 "epc_code", "product_name", "epc_lot", "anomaly", "anomaly_type", "description")
+
+    def __init__(self, road_id, from_node, to_node, from_time, to_time,
+                 epc_code, product_name, epc_lot, anomaly, anomaly_type, description):
+        self.road_id = road_id
+        self.from_node = from_node
+        self.to_node = to_node
+        self.from_time = from_time
+        self.to_time = to_time
+        self.epc_code = epc_code
+        self.product_name = _intern(product_name)
+        self.epc_lot = _intern(epc_lot)
+        self.anomaly = anomaly
+        self.anomaly_type = anomaly_type
+        self.description = description
+
+    def to_dict(self):
+        return {
+            "roadId": self.road_id,
+            "from": _point(self.from_node, self.from_time),
+            "to": _point(self.to_node, self.to_time),
+            "epcCode": self.epc_code, "productName": self.product_name, "epcLot": self.epc_lot,
+            "eventType": "출고",
+            "anomaly": self.anomaly,
+            "anomalyTypeList": [self.anomaly_type] if self.anomaly_type else [],
+            "description": self.description
+        }
+
+    _FIELDS = {
+        "roadId": lambda t: t.road_id,
+        "from": lambda t: _point(t.from_node, t.from_time),
+        "to": lambda t: _point(t.to_node, t.to_time),
+        "epcCode": lambda t: t.epc_code,
+        "productName": lambda t: t.product_name,
+        "epcLot": lambda t: t.epc_lot,
+        "eventType": lambda t: "출고",
+        "anomaly": lambda t: t.anomaly,
+        "anomalyTypeList": lambda t: [t.anomaly_type] if t.anomaly_type else [],
+        "description": lambda t: t.description,
+    }
+
+
+# 2. 이벤트
+# =================================
+
+class EventPath:
+    """트립 하나에서 펼친 이벤트 경로 (노드 튜플 + 시각 배열 + 이벤트들이 공유하는 EPC / 제품 / 이상 정보)"""
+    __slots__ = ("road_id", "epc_code", "product_name", "epc_lot", "anomaly", "anomaly_types", "description",
+                 "nodes", "times", "anomaly_seq", "node_ids")
+
+    def __init__(self, trip, nodes, times, anomaly_seq, node_ids):
+        # 트립 레코드(dict 또는 Trip)에서 필요한 값만 꺼냄. 기본값은 예전 이벤트 dict 와 동일
+        self.road_id = trip["roadId"]
+        self.epc_code = trip["epcCode"]
+        self.product_name = _intern(trip.get("productName", "N/A"))
+        self.epc_lot = _intern(trip.get("epcLot", "N/A"))
+        self.anomaly = trip.get("anomaly", 0)
+        self.anomaly_types = _intern_types(trip.get("anomalyTypeList", []))
+        self.description = _intern(trip.get("description", "이상 감지됨."))
+        self.nodes = tuple(nodes)
+        if len(self.nodes) > MAX_EVENT_SEQ:
+            raise ValueError(f"트립 하나의 이벤트가 너무 많습니다: {len(self.nodes)} (최대 {MAX_EVENT_SEQ})")
+        pack_event_id(self.road_id, 1)   # roadId 범위 확인 (이벤트마다 하지 않도록 여기서 한 번)
+        self.times = array("q", times)   # epoch 초
+        self.anomaly_seq = anomaly_seq   # 이상 트립의 도착 지점 이벤트의 순번
+        self.node_ids = node_ids         # scanLocation -> locationId (공유 dict)
+
+    def events(self):
+        return [Event(self, seq) for seq in range(1, len(self.nodes) + 1)]
+
+
+class Event(_Record):
+    """generate_history.generate_epc_history 가 만드는 이벤트 하나 (경로와 순번만 저장)"""
+    __slots__ = ("path", "seq")
+
+    def __init__(self, path, seq):
+        self.path = path
+        self.seq = seq   # 경로 안에서의 순번 (1부터)
+
+    @property
+    def node(self):
+        return self.path.nodes[self.seq - 1]
+
+    @property
+    def event_time(self):
+        return self.path.times[self.seq - 1]
+
+    @property
+    def is_anomaly(self):
+        return self.seq == self.path.anomaly_seq
+
+    @property
+    def event_id(self):
+        return self.path.road_id << EVENT_SEQ_BITS | self.seq   # ids.pack_event_id 와 같은 값
+
+    @property
+    def event_type(self):
+        if self.seq == 1:
+            return "Aggregation"
+        return outbound_event_type(self.path.nodes[self.seq - 2]["businessStep"])
+
+    def to_dict(self):
+        path, node, is_anomaly = self.path, self.node, self.is_anomaly
+        event = {
+            "eventId": self.event_id,
+            "epcCode": path.epc_code,
+            "productName": path.product_name,
+            "epcLot": path.epc_lot,
+            "locationId": path.node_ids[node["scanLocation"]],
+            "scanLocation": node["scanLocation"],
+            "hubType": node["hubType"],
+            "businessStep": node["businessStep"],
+            "eventType": self.event_type,
+            "eventTime": self.event_time,
+            "anomaly": path.anomaly if is_anomaly else 0,
+            "anomalyTypeList": list(path.anomaly_types) if is_anomaly else []
+        }
+        if is_anomaly:
+            event["description"] = path.description
+        return event
+
+    def _description(self):
+        if not self.is_anomaly:
+            raise KeyError("description")
+        return self.path.description
+
+    _FIELDS = {
+        "eventId": lambda e: e.event_id,
+        "epcCode": lambda e: e.path.epc_code,
+        "productName": lambda e: e.path.product_name,
+        "epcLot": lambda e: e.path.epc_lot,
+        "locationId": lambda e: e.path.node_ids[e.node["scanLocation"]],
+        "scanLocation": lambda e: e.node["scanLocation"],
+        "hubType": lambda e: e.node["hubType"],
+        "businessStep": lambda e: e.node["businessStep"],
+        "eventType": lambda e: e.event_type,
+        "eventTime": lambda e: e.path.times[e.seq - 1],
+        "anomaly": lambda e: e.path.anomaly if e.is_anomaly else 0,
+        "anomalyTypeList": lambda e: list(e.path.anomaly_types) if e.is_anomaly else [],
+        "description": _description,
+    }
+
+
+def to_dict(record):
+    """압축 레코드면 dict 로 바꾸고, 이미 dict 면 그대로 돌려줍니다."""
+    return record.to_dict() if isinstance(record, _Record) else record
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+from encoders import decode, get_encoder
+from history_index import DEFAULT_BLOCK_SIZE, INDEXED_FIELDS, HistoryIndex, TimeOffsetIndex
+
+# 이벤트 시간 기준 재생(replay) 서버
+# =================================
+# generate_history.py 가 만든 eventTime 순 NDJSON 이력(또는 create.py 의 트립)을 필요한
+# 만큼만 읽어서, 대시보드가 실제 백엔드 없이 실시간에 가까운 속도로 데이터를 받을 수
+# 있도록 제공하는 로컬 서버입니다. 표준 라이브러리 asyncio 만 사용합니다.
+#
+#   GET /index                                  파일 요약 (레코드 수, 시간 범위)
+#   GET /events?limit=50&cursor=...&since=&until=
+#       PaginatedResponse ({"data": [...], "nextCursor": ...}) 형식의 커서 페이지.
+#       커서는 다음 줄의 바이트 오프셋이라, 몇 번째 페이지든 seek 한 번으로 읽습니다.
+#       사이드카 인덱스('<파일>.index', generate_history.py --index)가 있으면
+#       &epcCode=&scanLocation=&businessStep= 필터도 쓸 수 있습니다. (값 여러 개 가능)
+#   GET /replay?speed=60&since=&until=
+#       Server-Sent Events 로 레코드를 시간순으로 speed 배속에 맞춰 보냅니다. (speed=0 은
+#       기다리지 않고 최대 속도) 각 이벤트의 id 가 다음 오프셋이므로, 연결이 끊겨도
+#       브라우저가 보내는 Last-Event-ID 로 이어서 재생합니다.
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 1000
+REPLAY_BATCH_LINES = 512   # 재생 시 한 번에 (스레드에서) 읽을 줄 수
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _int_param(params, name, default=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise BadRequest(f"'{name}' 값이 정수가 아닙니다: {values[0]}")
+
+
+def _float_param(params, name, default=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return float(values[0])
+    except ValueError:
+        raise BadRequest(f"'{name}' 값이 숫자가 아닙니다: {values[0]}")
+
+
+def _read_lines(f, max_lines):
+    """파일에서 비어 있지 않은 줄을 최대 max_lines 개 읽어 (줄, 줄 끝 오프셋) 목록으로 돌려줍니다."""
+    lines = []
+    while len(lines) < max_lines:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            lines.append((line, f.tell()))
+    return lines
+
+
+class ReplayService:
+    """NDJSON 파일 하나와 그 오프셋 인덱스"""
+
+    def __init__(self, path, speed=60.0, block_size=DEFAULT_BLOCK_SIZE, encoder=None):
+        self.path = path
+        self.speed = speed
+        self.block_size = block_size
+        self.encoder = encoder or get_encoder()
+        self.index = None
+        self._lock = asyncio.Lock()
+
+    async def get_index(self):
+        """인덱스를 돌려줍니다. 파일이 바뀌었으면 (증분 생성 등) 다시 읽거나 만듭니다.
+
+        최신 사이드카 인덱스가 있으면 사용하고, 없으면 시간 인덱스만 직접 만듭니다.
+        """
+        async with self._lock:
+            if self.index is None or self.index.is_stale():
+                self.index = await asyncio.to_thread(HistoryIndex.load_for, self.path)
+            if self.index is None:
+                self.index = await asyncio.to_thread(TimeOffsetIndex.build, self.path, None, self.block_size)
+            return self.index
+
+    async def start_offset(self, index, cursor=None, since=None):
+        if cursor is not None:
+            if not await asyncio.to_thread(index.is_line_start, cursor):
+                raise BadRequest(f"잘못된 커서입니다: {cursor}")
+            return cursor
+        if since is not None:
+            return await asyncio.to_thread(index.offset_for_time, since)
+        return 0
+
+    def read_page(self, index, offset, limit, until=None):
+        """offset 부터 최대 limit 개를 읽어 PaginatedResponse 형식으로 돌려줍니다."""
+        data = []
+        next_cursor = None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line, end in _read_lines(f, limit + 1):
+                record = decode(line)
+                if until is not None and index.time_key(record) > until:
+                    break
+                if len(data) == limit:
+                    # 다음 페이지가 있으면, 다음 페이지의 첫 줄 위치를 커서로 사용
+                    next_cursor = str(end - len(line))
+                    break
+                data.append(record)
+        return {"data": data, "nextCursor": next_cursor}
+
+    # 1. 요청 처리
+    # =================================
+
+    async def handle_index(self, writer, params, headers):
+        index = await self.get_index()
+        await self._send_json(writer, 200, {
+            "path": self.path,
+            "count": index.count,
+            "firstEventTime": index.first_time,
+            "lastEventTime": index.last_time,
+            "blockSize": index.block_size,
+        })
+
+    async def handle_events(self, writer, params, headers):
+        index = await self.get_index()
+        limit = min(max(_int_param(params, "limit", DEFAULT_PAGE_LIMIT), 1), MAX_PAGE_LIMIT)
+        filters = {field: params[field] for field in INDEXED_FIELDS if field in params}
+        if filters:
+            if not isinstance(index, HistoryIndex):
+                raise BadRequest("필터 조회에는 사이드카 인덱스가 필요합니다. generate_history.py --index 또는 history_index.py 로 먼저 생성해주세요.")
+            time_range = (_int_param(params, "since"), _int_param(params, "until"))
+            try:
+                page = await asyncio.to_thread(index.query, filters, time_range, params.get("cursor", [None])[0], limit)
+            except ValueError as e:
+                raise BadRequest(str(e))
+        else:
+            offset = await self.start_offset(index, _int_param(params, "cursor"), _int_param(params, "since"))
+            page = await asyncio.to_thread(self.read_page, index, offset, limit, _int_param(params, "until"))
+        await self._send_json(writer, 200, page)
+
+    async def handle_replay(self, writer, params, headers):
+        index = await self.get_index()
+        speed = _float_param(params, "speed", self.speed)
+        until = _int_param(params, "until")
+        last_event_id = headers.get("last-event-id")
+        cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        offset = await self.start_offset(index, cursor, _int_param(params, "since"))
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        await writer.drain()
+
+        loop = asyncio.get_running_loop()
+        started = base_time = None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                lines = await asyncio.to_thread(_read_lines, f, REPLAY_BATCH_LINES)
+                if not lines:
+                    break
+                for line, end in lines:
+                    record = decode(line)
+                    event_time = index.time_key(record)
+                    if until is not None and event_time > until:
+                        break
+                    if speed > 0:
+                        # 첫 레코드 시각을 기준으로, 이벤트 시간 차이 / speed 만큼 실제로 기다림
+                        if started is None:
+                            started, base_time = loop.time(), event_time
+                        delay = started + (event_time - base_time) / speed - loop.time()
+                        if delay > 0:
+                            await writer.drain()
+                            await asyncio.sleep(delay)
+                    writer.write(b"id: %d\ndata: %s\n\n" % (end, line.rstrip(b"\r\n")))
+                else:
+                    await writer.drain()
+                    continue
+                break
+        writer.write(b"event: end\ndata: {}\n\n")
+        await writer.drain()
+
+    async def _send_json(self, writer, status, body):
+        payload = self.encoder.compact(body)
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        routes = {"/index": self.handle_index, "/events": self.handle_events, "/replay": self.handle_replay}
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            method, target = request_line[0], request_line[1]
+            url = urlsplit(target)
+            handler = routes.get(url.path)
+            if method == "OPTIONS":
+                writer.write(
+                    b"HTTP/1.1 204 No Content\r\n"
+                    b"Access-Control-Allow-Origin: *\r\n"
+                    b"Access-Control-Allow-Headers: *\r\n"
+                    b"Connection: close\r\n\r\n"
+                )
+            elif method != "GET" or handler is None:
+                await self._send_json(writer, 404, {"message": f"지원하지 않는 요청입니다: {method} {url.path}"})
+            else:
+                try:
+                    await handler(writer, parse_qs(url.query), headers)
+                except BadRequest as e:
+                    await self._send_json(writer, 400, {"message": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass   # 클라이언트가 먼저 연결을 끊음 (재생 도중 브라우저 탭 닫기 등)
+        finally:
+            writer.close()
+
+
+async def serve(path, host, port, speed, block_size):
+    service = ReplayService(path, speed, block_size)
+    index = await service.get_index()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"✅ '{path}' ({index.count}개 레코드) 재생 서버가 http://{host}:{port} 에서 실행 중입니다. (기본 {speed:g}배속)")
+    async with server:
+        await server.serve_forever()
+
+
+# 2. 메인 실행
+# =================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="시간순 NDJSON 이력/트립을 이벤트 시간 기준으로 재생하는 로컬 서버를 실행합니다.")
+    parser.add_argument("-i", "--input", default="full_epc_history.ndjson",
+                        help="입력 파일 이름 (eventTime 순으로 정렬된, 압축하지 않은 ndjson)")
+    parser.add_argument("--host", default="127.0.0.1", help="바인드할 주소")
+    parser.add_argument("--port", type=int, default=8765, help="포트 번호")
+    parser.add_argument("--speed", type=float, default=60.0, help="기본 재생 배속 (0: 기다리지 않고 최대 속도)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="오프셋 인덱스 항목 하나가 가리키는 줄 수")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        open(args.input, "rb").close()
+    except FileNotFoundError:
+        print(f"오류: '{args.input}' 파일을 찾을 수 없습니다. generate_history.py --format ndjson 으로 먼저 생성해주세요.")
+        exit()
+    try:
+        asyncio.run(serve(args.input, args.host, args.port, args.speed, args.block_size))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,346 @@
+import heapq
+import io
+import itertools
+import json
+import os
+import tempfile
+
+from encoders import decode, detect_compression, get_encoder, open_read, open_write, split_compression_extension
+
+# 대용량 트립/이벤트 데이터를 위한 스트리밍 입출력 유틸리티
+# =================================
+# create.py / generate_history.py 가 전체 리스트를 메모리에 올리지 않고
+# 레코드를 하나씩 읽고, 정렬하고, 쓸 수 있도록 도와주는 함수 모음입니다.
+# 레코드 직렬화는 encoders.py 의 인코더를 사용하고, .gz / .zst 파일은 압축을 풀거나
+# 압축하면서 바로 읽고 씁니다.
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+JSON_STYLES = ("pretty", "compact")
+DEFAULT_RUN_SIZE = 200_000   # 외부 정렬 시 한 번에 메모리에서 정렬할 레코드 수
+MAX_MERGE_FAN_IN = 128       # 한 번에 병합할 임시 런 파일의 최대 개수
+READ_CHUNK_SIZE = 1 << 16
+WRITE_BATCH_SIZE = 1024      # 인코딩한 레코드를 모아서 한 번에 write 할 개수
+
+
+def detect_format(path, fmt=None):
+    """명시된 형식이 없으면 파일 확장자로 'json' / 'ndjson' 을 판별합니다. (.gz / .zst 는 무시)"""
+    if fmt:
+        return fmt
+    path, _ = split_compression_extension(path)
+    return "ndjson" if path.endswith(NDJSON_EXTENSIONS) else "json"
+
+
+# 1. 읽기
+# =================================
+
+def iter_ndjson(path, offset=0):
+    """NDJSON 파일에서 레코드를 한 줄씩 읽어옵니다. offset 은 시작할 줄의 바이트 위치입니다."""
+    with open_read(path) as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            if line.strip():
+                yield decode(line)
+
+
+def iter_data_json(path):
+    """{"data": [...]} 형태의 JSON 파일에서 배열 원소를 하나씩 읽어옵니다.
+
+    파일 전체를 json.load 하지 않고 버퍼 단위로 읽으면서 원소를 디코딩합니다.
+    """
+    decoder = json.JSONDecoder()
+    with io.TextIOWrapper(open_read(path), encoding="utf-8") as f:
+        buf = ""
+        # "data" 키의 배열 시작 위치('[')까지 이동
+        while True:
+            key_pos = buf.find('"data"')
+            start = buf.find("[", key_pos) if key_pos != -1 else -1
+            if start != -1:
+                buf = buf[start + 1:]
+                break
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            buf += chunk
+
+        pos = 0
+        while True:
+            # 공백과 구분자(,) 건너뛰기
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    break
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    return
+                buf, pos = chunk, 0
+            if buf[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # 원소가 버퍼 경계에 걸친 경우 더 읽어서 재시도
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if end == len(buf) or buf[end] not in " \t\r\n,]":
+                # 숫자 / 리터럴은 버퍼 경계에서 잘려도 앞부분만 디코딩되므로, 원소 뒤에 구분자가
+                # 보일 때까지 더 읽어서 재시도
+                chunk = f.read(READ_CHUNK_SIZE)
+                if chunk:
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+            yield record
+            pos = end
+
+
+def iter_records(path, fmt=None):
+    """파일 형식에 맞춰 레코드를 하나씩 읽어오는 제너레이터를 반환합니다."""
+    if detect_format(path, fmt) == "ndjson":
+        return iter_ndjson(path)
+    return iter_data_json(path)
+
+
+# 2. 쓰기
+# =================================
+# 인코더(encoder)를 지정하지 않으면 encoders.get_encoder() 의 기본값(orjson 이 있으면
+# orjson)을 사용합니다. 어떤 인코더를 쓰든 출력 바이트는 같습니다.
+
+def _write_batched(f, chunks):
+    """바이트 조각을 WRITE_BATCH_SIZE 개씩 모아서 기록합니다."""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            f.write(b"".join(batch))
+            batch = []
+    if batch:
+        f.write(b"".join(batch))
+
+
+def write_ndjson(path, records, encoder=None, compression=None, indexer=None):
+    """레코드를 한 줄에 하나씩 (공백 없는) NDJSON 으로 기록하고, 기록한 개수를 반환합니다.
+
+    indexer 를 주면 줄마다 indexer.add(record, 줄 바이트 수) 를 호출합니다.
+    (history_index.HistoryIndex 참고, 압축하지 않은 파일에서만 의미가 있음)
+    """
+    encode = (encoder or get_encoder()).compact
+    count = 0
+
+    def lines():
+        nonlocal count
+        for record in records:
+            line = encode(record) + b"\n"
+            if indexer is not None:
+                indexer.add(record, len(line))
+            yield line
+            count += 1
+
+    with open_write(path, compression) as f:
+        _write_batched(f, lines())
+    return count
+
+
+def write_data_json(path, records, style="pretty", encoder=None, compression=None):
+    """레코드를 {"data": [...]} JSON 으로 점진적으로 기록하고, 기록한 개수를 반환합니다.
+
+    style='pretty' 의 결과는 json.dump({"data": list(records)}, indent=2) 와 바이트 단위로
+    동일하고, style='compact' 는 공백 없이 기록합니다.
+    """
+    encoder = encoder or get_encoder()
+    count = 0
+
+    if style == "compact":
+        def chunks():
+            nonlocal count
+            yield b'{"data":['
+            for record in records:
+                if count:
+                    yield b","
+                yield encoder.compact(record)
+                count += 1
+            yield b"]}"
+    else:
+        def chunks():
+            nonlocal count
+            for record in records:
+                yield b",\n    " if count else b'{\n  "data": [\n    '
+                yield encoder.pretty(record).replace(b"\n", b"\n    ")
+                count += 1
+            yield b"\n  ]\n}" if count else b'{\n  "data": []\n}'
+
+    with open_write(path, compression) as f:
+        _write_batched(f, chunks())
+    return count
+
+
+def write_chunked_json(path, records, chunk_size, style="pretty", encoder=None, compression=None):
+    """레코드를 chunk_size 개씩 나눠 '<이름>.00000.json' 형태의 여러 파일로 기록합니다."""
+    path, compressed_ext = split_compression_extension(path)
+    root, ext = os.path.splitext(path)
+    ext += compressed_ext
+    count = 0
+    part = 0
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            count += write_data_json(f"{root}.{part:05d}{ext}", chunk, style, encoder, compression)
+            part += 1
+            chunk = []
+    if chunk or part == 0:
+        count += write_data_json(f"{root}.{part:05d}{ext}", chunk, style, encoder, compression)
+    return count
+
+
+def write_records(path, records, fmt=None, chunk_size=None, style="pretty", partition="month",
+                  encoder=None, compression=None, indexer=None):
+    """형식에 맞춰 레코드를 기록하고, 기록한 개수를 반환합니다.
+
+    parquet / arrow 형식은 path 를 디렉터리로 보고 columnar.write_columnar 로 기록합니다.
+    (파일 내부 압축을 쓰므로 style / encoder / compression 은 무시)
+    indexer 는 ndjson 형식에서만 사용합니다.
+    """
+    fmt = detect_format(path, fmt)
+    if fmt in ("parquet", "arrow"):
+        from columnar import write_columnar
+        return write_columnar(path, records, fmt, partition=partition)
+    if fmt == "ndjson":
+        return write_ndjson(path, records, encoder, compression, indexer)
+    if chunk_size:
+        return write_chunked_json(path, records, chunk_size, style, encoder, compression)
+    return write_data_json(path, records, style, encoder, compression)
+
+
+# 3. 외부 병합 정렬
+# =================================
+
+def _spill_run(records, run_dir):
+    """정렬된 레코드 묶음을 임시 NDJSON 런 파일로 내보냅니다."""
+    fd, run_path = tempfile.mkstemp(suffix=".ndjson", prefix="run-", dir=run_dir)
+    os.close(fd)
+    write_ndjson(run_path, records)
+    return run_path
+
+
+def external_sort(records, key, run_size=DEFAULT_RUN_SIZE, tmpdir=None):
+    """레코드를 key 기준으로 정렬해 하나씩 돌려주는 제너레이터 (안정 정렬).
+
+    run_size 개씩 메모리에서 정렬한 뒤 임시 파일로 내보내고, heapq.merge 로
+    병합하므로 최대 메모리 사용량은 전체 레코드 수와 무관하게 run_size 에 비례합니다.
+    레코드 수가 run_size 이하이면 임시 파일 없이 메모리에서 바로 정렬합니다.
+    """
+    buffer = []
+    records = iter(records)
+    for record in records:
+        buffer.append(record)
+        if len(buffer) > run_size:
+            break
+    else:
+        buffer.sort(key=key)
+        yield from buffer
+        return
+
+    with tempfile.TemporaryDirectory(prefix="external-sort-", dir=tmpdir) as run_dir:
+        runs = []
+        while buffer:
+            buffer.sort(key=key)
+            runs.append(_spill_run(buffer, run_dir))
+            buffer = []
+            for record in records:
+                buffer.append(record)
+                if len(buffer) >= run_size:
+                    break
+
+        # 열린 파일 수를 제한하기 위해 런이 많으면 여러 단계로 병합
+        while len(runs) > MAX_MERGE_FAN_IN:
+            merged_runs = []
+            for i in range(0, len(runs), MAX_MERGE_FAN_IN):
+                group = runs[i:i + MAX_MERGE_FAN_IN]
+                merged = heapq.merge(*(iter_ndjson(p) for p in group), key=key)
+                merged_runs.append(_spill_run(merged, run_dir))
+                for p in group:
+                    os.remove(p)
+            runs = merged_runs
+
+        yield from heapq.merge(*(iter_ndjson(p) for p in runs), key=key)
+
+
+# 4. 정렬된 NDJSON 파일에 병합 추가
+# =================================
+
+def find_ndjson_split(path, value, key, linear_scan_bytes=READ_CHUNK_SIZE):
+    """key 기준으로 정렬된 NDJSON 파일에서 key(record) > value 인 첫 줄의 바이트 오프셋을 찾습니다.
+
+    바이트 위치로 이분 탐색한 뒤 남은 구간만 순차 탐색하므로, 파일 전체를 읽지 않습니다.
+    조건을 만족하는 줄이 없으면 파일 크기를 돌려줍니다.
+    """
+    with open(path, "rb") as f:
+        lo, hi = 0, f.seek(0, os.SEEK_END)
+        # 불변식: lo 는 줄의 시작이고, 답은 [lo, hi] 안에 있음
+        while hi - lo > linear_scan_bytes:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()
+            pos = f.tell()
+            if pos >= hi:
+                break
+            line = f.readline()
+            if key(decode(line)) > value:
+                hi = pos
+            else:
+                lo = f.tell()
+        f.seek(lo)
+        while True:
+            pos = f.tell()
+            line = f.readline()
+            if not line or key(decode(line)) > value:
+                return pos
+
+
+def merge_into_sorted_ndjson(path, sorted_records, key, tmpdir=None, indexer=None):
+    """이미 key 순으로 정렬된 NDJSON 파일에 새 정렬 레코드를 병합해 넣고, 추가한 개수를 반환합니다.
+
+    새 레코드 중 가장 이른 key 보다 뒤에 있는 기존 꼬리 부분만 다시 쓰고, 그 앞부분은
+    건드리지 않습니다. 새 레코드가 모두 기존 마지막 레코드 이후라면 파일 끝에 덧붙이기만 합니다.
+    key 가 같으면 기존 레코드가 새 레코드보다 앞에 옵니다. 압축된 파일에는 쓸 수 없습니다.
+    indexer 를 주면 다시 쓰는 꼬리 부분을 indexer.truncate() 로 지우고 새로 채웁니다.
+    """
+    if detect_compression(path):
+        raise ValueError(f"압축된 파일에는 병합해 넣을 수 없습니다: {path}")
+    sorted_records = iter(sorted_records)
+    first = next(sorted_records, None)
+    if first is None:
+        return 0
+    if not os.path.exists(path):
+        open(path, "w", encoding="utf-8").close()
+
+    split = find_ndjson_split(path, key(first), key)
+    if indexer is not None:
+        indexer.truncate(split)
+    count = 0
+
+    def new_records():
+        nonlocal count
+        for record in itertools.chain([first], sorted_records):
+            count += 1
+            yield record
+
+    with tempfile.TemporaryDirectory(prefix="ndjson-tail-", dir=tmpdir) as tail_dir:
+        # 기존 꼬리와 새 레코드를 먼저 임시 파일에 병합해 두고, 다 쓴 뒤에 원본을 잘라 붙임
+        # (병합 도중 실패해도 원본은 그대로 남음)
+        merged_path = os.path.join(tail_dir, "merged.ndjson")
+        write_ndjson(merged_path, heapq.merge(iter_ndjson(path, offset=split), new_records(), key=key),
+                     indexer=indexer)
+        with open(path, "rb+") as f, open(merged_path, "rb") as merged:
+            f.truncate(split)
+            f.seek(split)
+            while True:
+                chunk = merged.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    return count
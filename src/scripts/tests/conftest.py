@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 스크립트들은 src/scripts 안에서 서로를 최상위 모듈로 임포트하므로, 테스트에서도 같은 경로를 씀
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
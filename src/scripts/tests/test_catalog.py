@@ -0,0 +1,20 @@
+import json
+
+from catalog import DEFAULT_CATALOG_PATH, build_topology, load_topology
+
+
+def test_integer_coords_load_the_same_with_and_without_cache(tmp_path):
+    with open(DEFAULT_CATALOG_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["nodes"][0]["coord"] = [127, 37]
+    path = tmp_path / "nodes.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    fresh = load_topology(str(path))    # 캐시를 새로 씀
+    cached = load_topology(str(path))   # 캐시에서 불러옴
+    uncached = build_topology(str(path))
+    for topology in (fresh, cached, uncached):
+        coord = topology.nodes[0]["coord"]
+        assert coord == [127.0, 37.0]
+        assert all(type(v) is float for v in coord)
+    assert (tmp_path / "__pycache__" / "nodes.catalog.pickle").exists()
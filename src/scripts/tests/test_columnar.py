@@ -0,0 +1,71 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from catalog import get_topology
+from columnar import open_columnar, write_columnar
+
+DAY = 86400
+START = 1704067200   # 2024-01-01
+
+
+def _events(n, start=START, step=DAY, **overrides):
+    nodes = get_topology().nodes
+    events = []
+    for i in range(n):
+        node = nodes[i % len(nodes)]
+        event = {
+            "eventId": (i + 1) << 16 | 1, "epcCode": f"1.880.123.{i}", "productName": "게보린", "epcLot": "LOT-A-1000",
+            "locationId": i % len(nodes) + 1, "scanLocation": node["scanLocation"], "hubType": node["hubType"],
+            "businessStep": node["businessStep"], "eventType": "Aggregation", "eventTime": start + i * step,
+            "anomaly": 0, "anomalyTypeList": [],
+        }
+        event.update(overrides)
+        events.append(event)
+    return events
+
+
+# 1. 이전 실행의 파티션
+# =================================
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+@pytest.mark.parametrize("partition", ["month", "date", "none"])
+def test_rewrite_drops_partitions_from_previous_run(tmp_path, fmt, partition):
+    path = str(tmp_path / "history")
+    # 첫 실행은 1~3월, 두 번째 실행은 1월만 씀
+    assert write_columnar(path, _events(80), fmt, partition=partition) == 80
+    assert write_columnar(path, _events(10), fmt, partition=partition) == 10
+    assert open_columnar(path, fmt, partition).count_rows() == 10
+
+
+def test_refuses_directory_with_other_files(tmp_path):
+    path = tmp_path / "history"
+    path.mkdir()
+    (path / "notes.txt").write_text("keep me", encoding="utf-8")
+    with pytest.raises(ValueError):
+        write_columnar(str(path), _events(3), "parquet")
+    assert (path / "notes.txt").exists()
+
+
+# 2. 배치 사이의 사전
+# =================================
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_new_values_in_later_batches(tmp_path, fmt):
+    # 앞 배치에 없던 상품명 / description 이 뒤 배치에 처음 나와도 모든 배치를 같은 스키마로 읽음
+    path = str(tmp_path / "history")
+    events = _events(10) + _events(10, start=START + 10 * DAY, productName="N/A", description="이상 감지됨.", anomaly=80)
+    assert write_columnar(path, events, fmt, partition="none", batch_rows=4) == 20
+    table = open_columnar(path, fmt, "none").to_table().sort_by("eventTime")
+    assert table.num_rows == 20
+    assert table.column("productName").to_pylist()[-1] == "N/A"
+    # 상품명 / description 도 고정 사전으로 인코딩됨
+    assert pa.types.is_dictionary(table.schema.field("productName").type)
+    assert pa.types.is_dictionary(table.schema.field("description").type)
+    assert table.column("scanLocation").to_pylist() == [e["scanLocation"] for e in sorted(events, key=lambda e: e["eventTime"])]
+
+
+def test_location_outside_catalog(tmp_path):
+    events = _events(3) + _events(1, scanLocation="카탈로그에 없는 창고")
+    with pytest.raises(ValueError, match="카탈로그에 없는 창고"):
+        write_columnar(str(tmp_path / "history"), events, "arrow", partition="none", batch_rows=2)
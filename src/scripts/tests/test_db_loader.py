@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from create import iter_anomaly_trips
+from db_loader import load_records, open_target
+from metrics import PipelineMetrics
+
+
+def test_insert_time_is_a_stage(tmp_path):
+    target = open_target(f"sqlite:///{tmp_path / 'x.db'}")
+    metrics = PipelineMetrics("db_loader")
+    trips = [trip.to_dict() for trip in iter_anomaly_trips(30, rng=random.Random(1))]
+    assert load_records(trips, target, batch_size=7, metrics=metrics) == ("Trip", 30)
+    assert metrics.stages["insert"]["items"] == 30
+    assert metrics.counters == {}
+
+
+def test_empty_input(tmp_path):
+    target = open_target(f"sqlite:///{tmp_path / 'x.db'}")
+    assert load_records([], target, table="trips") == ("Trip", 0)
+    with pytest.raises(ValueError):
+        load_records([], target)
+
+
+def test_existing_table_is_dropped_only_on_explicit_replace(tmp_path):
+    target = open_target(f"sqlite:///{tmp_path / 'x.db'}")
+    trips = [trip.to_dict() for trip in iter_anomaly_trips(10, rng=random.Random(1))]
+    assert load_records(trips[:6], target) == ("Trip", 6)
+    # 기본 모드(create)는 이미 있는 테이블을 지우지 않고 오류를 냄
+    with pytest.raises(ValueError, match="--mode replace"):
+        load_records(trips, target)
+    assert load_records(trips[6:], target, mode="append") == ("Trip", 4)
+    assert load_records(trips[:3], target, mode="replace") == ("Trip", 3)
+    conn = target.connect()
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM "Trip"').fetchone() == (3,)
+    finally:
+        conn.close()
@@ -0,0 +1,37 @@
+import random
+
+from catalog import get_topology
+from create import iter_anomaly_trips
+from generate_history import _draw_prologue, iter_history_events, route_template
+
+
+def _history(seed):
+    trips = list(iter_anomaly_trips(60, rng=random.Random(3)))
+    return [dict(event) for event in iter_history_events(trips, rng=random.Random(seed))]
+
+
+def test_seed_makes_history_reproducible():
+    assert _history("7") == _history("7")
+    assert _history("7") != _history("8")
+
+
+def test_seed_does_not_touch_global_random():
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    _history("7")
+    assert random.random() == expected
+
+
+def test_prologue_factory_follows_the_wms_mapping():
+    topology = get_topology()
+    rng = random.Random(5)
+    for from_node in topology.nodes:
+        template = route_template(from_node["scanLocation"], from_node["scanLocation"])
+        for _ in range(20):
+            path = _draw_prologue(template.prologue, rng) + [from_node]
+            if path[0]["businessStep"] != "Factory" or len(path) < 2:
+                continue
+            wms = path[1]
+            if wms["scanLocation"] in topology.wms_to_factory:
+                assert path[0] is topology.wms_to_factory[wms["scanLocation"]]
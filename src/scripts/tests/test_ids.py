@@ -0,0 +1,12 @@
+import pytest
+
+from ids import MAX_EVENT_SEQ, MAX_ROAD_ID, pack_event_id, unpack_event_id
+
+
+def test_event_ids_stay_within_javascript_safe_integers():
+    # 프론트엔드는 eventId 를 JSON 에서 Number 로 읽음
+    event_id = pack_event_id(MAX_ROAD_ID, MAX_EVENT_SEQ)
+    assert event_id <= 2 ** 53 - 1
+    assert unpack_event_id(event_id) == (MAX_ROAD_ID, MAX_EVENT_SEQ)
+    with pytest.raises(ValueError):
+        pack_event_id(MAX_ROAD_ID + 1, 1)
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(cwd, script, *args):
+    subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script), *args], cwd=cwd, check=True,
+                   capture_output=True)
+
+
+def _read_ndjson(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_ledger_batches_append_only_the_tail(tmp_path):
+    _run(tmp_path, "create.py", "-n", "120", "--seed", "1", "--id-ledger", "ids.json", "-o", "batch1.ndjson")
+    _run(tmp_path, "generate_history.py", "-i", "batch1.ndjson", "-o", "history.ndjson")
+    before = (tmp_path / "history.ndjson").read_bytes()
+
+    _run(tmp_path, "create.py", "-n", "120", "--seed", "2", "--id-ledger", "ids.json", "-o", "batch2.ndjson")
+    _run(tmp_path, "generate_history.py", "-i", "batch2.ndjson", "-o", "history.ndjson", "--incremental")
+    after = (tmp_path / "history.ndjson").read_bytes()
+
+    # 두 번째 배치는 첫 배치의 마지막 도착 시각 뒤에서 시작
+    batch1, batch2 = _read_ndjson(tmp_path / "batch1.ndjson"), _read_ndjson(tmp_path / "batch2.ndjson")
+    assert min(t["from"]["eventTime"] for t in batch2) > max(t["to"]["eventTime"] for t in batch1)
+    # 기존 이력은 한 바이트도 다시 쓰지 않고 새 이벤트만 뒤에 붙음
+    assert len(after) > len(before)
+    assert after[:len(before)] == before
+    times = [event["eventTime"] for event in _read_ndjson(tmp_path / "history.ndjson")]
+    assert times == sorted(times)
+
+
+def test_overlapping_road_ids_without_ledger_are_rejected(tmp_path):
+    # --id-ledger 없이 만든 두 배치는 roadId 가 겹치므로, 새 배치를 조용히 버리지 않고 오류를 냄
+    _run(tmp_path, "create.py", "-n", "50", "--seed", "1", "-o", "batch1.ndjson")
+    _run(tmp_path, "generate_history.py", "-i", "batch1.ndjson", "-o", "history.ndjson")
+    before = (tmp_path / "history.ndjson").read_bytes()
+
+    _run(tmp_path, "create.py", "-n", "50", "--seed", "2", "-o", "batch2.ndjson")
+    result = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, "generate_history.py"), "-i", "batch2.ndjson",
+                             "-o", "history.ndjson", "--incremental"], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "--id-ledger" in result.stdout
+    assert (tmp_path / "history.ndjson").read_bytes() == before
+
+    # 같은 배치를 다시 넣으면 모두 이미 처리한 트립으로 건너뜀
+    _run(tmp_path, "generate_history.py", "-i", "batch1.ndjson", "-o", "history.ndjson", "--incremental")
+    assert (tmp_path / "history.ndjson").read_bytes() == before
+
+
+def test_start_time_option(tmp_path):
+    _run(tmp_path, "create.py", "-n", "5", "--seed", "1", "--start-time", "2025-06-01T00:00:00", "-o", "trips.ndjson")
+    trips = _read_ndjson(tmp_path / "trips.ndjson")
+    assert min(t["from"]["eventTime"] for t in trips) >= datetime(2025, 6, 1).timestamp()
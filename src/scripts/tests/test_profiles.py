@@ -0,0 +1,63 @@
+import json
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from profiles import AliasTable, validate_profile
+
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "load_profile.json")
+
+
+def _profile(**overrides):
+    with open(PROFILE_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.update(overrides)
+    return data
+
+
+def test_bundled_profile_is_valid():
+    validate_profile(_profile())
+
+
+@pytest.mark.parametrize("overrides", [
+    {"hubWeights": []},
+    {"hubWeights": {"byStep": ["Factory"]}},
+    {"hubWeights": {"byLocation": "서울"}},
+    {"scenarioWeights": [1, 2]},
+    {"ruleViolationWeights": "hop"},
+    {"durationHours": [5, 10]},
+    {"bursts": {"start": "2024-01-05T18:00:00"}},
+    {"bursts": ["2024-01-05T18:00:00"]},
+    {"bursts": [{"start": "2024-01-05T18:00:00", "end": "2024-01-05T20:00:00", "multiplier": 2, "locations": [["a"]]}]},
+    {"bursts": [{"start": "2024-01-05T18:00:00", "end": "2024-01-05T20:00:00", "multiplier": 2, "locations": "a"}]},
+    # 생성 도중에야 실패하던 프로필
+    {"clonesPerSet": [2, 40]},
+    {"hubWeights": {"byStep": {"Reseller": 0}}},
+    {"hubWeights": {"byStep": {"Wholesaler": 0}}, "anomalyRate": 1},
+    # 버스트가 LogiHub 전체를 0 으로 만드는 동안 WMS 에서 출발한 정상 트립의 도착지가 없음
+    {"bursts": [{"start": "2024-01-05T18:00:00", "end": "2024-01-05T20:00:00", "multiplier": 0,
+                 "locations": ["수도권물류센터", "전북물류센터", "전남물류센터", "경북물류센터"]}]},
+])
+def test_wrong_container_types_are_reported(overrides):
+    # 중첩 키를 읽다가 AttributeError / TypeError 가 나지 않고 검증 오류로 모아져야 함
+    with pytest.raises(ValueError, match="부하 프로필 오류"):
+        validate_profile(_profile(**overrides))
+
+
+def test_profile_must_be_an_object():
+    with pytest.raises(ValueError):
+        validate_profile([])
+
+
+def test_sample_distinct_is_weighted_without_replacement():
+    table = AliasTable("abc", [8, 1, 1])
+    rng = random.Random(1)
+    # 가중치가 치우쳐 있어도 k = n 이면 모든 항목이 한 번씩
+    assert sorted(table.sample_distinct(rng, 3)) == ["a", "b", "c"]
+    counts = Counter(tuple(table.sample_distinct(rng, 2)) for _ in range(20000))
+    assert counts[("a", "b")] / 20000 == pytest.approx(0.8 * 0.5, abs=0.02)
+    assert counts[("b", "a")] / 20000 == pytest.approx(0.1 * 8 / 9, abs=0.02)
+    with pytest.raises(ValueError):
+        table.sample_distinct(rng, 4)
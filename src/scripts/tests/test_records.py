@@ -0,0 +1,14 @@
+import random
+
+from create import iter_anomaly_trips
+from generate_history import generate_epc_history
+from records import _Record
+
+
+def test_to_dict_matches_field_table():
+    # 하위 클래스가 직접 만드는 dict 와 _FIELDS 로 만든 dict 가 키 순서까지 같아야 함
+    for trip in iter_anomaly_trips(40, rng=random.Random(1)):
+        assert list(_Record.to_dict(trip).items()) == list(trip.to_dict().items())
+        for event in generate_epc_history(trip, random.Random(2)):
+            assert list(_Record.to_dict(event).items()) == list(event.to_dict().items())
+            assert dict(event) == event.to_dict()
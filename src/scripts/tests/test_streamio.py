@@ -0,0 +1,132 @@
+import json
+import random
+
+import pytest
+
+import streamio
+from streamio import (external_sort, find_ndjson_split, iter_data_json, iter_ndjson, merge_into_sorted_ndjson,
+                      write_data_json, write_ndjson)
+
+
+def _records(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"roadId": i, "eventTime": rng.randint(0, n // 4),
+         "scanLocation": rng.choice(["인천공장", "수도권물류센터", "a]b,c", '따옴표 "x"']),
+         "anomaly": rng.randint(0, 100), "anomalyTypeList": rng.choice([[], ["clone"], ["fake", "tamper"]])}
+        for i in range(n)
+    ]
+
+
+# 1. iter_data_json: 버퍼 경계에 걸친 원소
+# =================================
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64])
+@pytest.mark.parametrize("style", ["pretty", "compact"])
+def test_iter_data_json_chunk_boundaries(tmp_path, monkeypatch, chunk_size, style):
+    monkeypatch.setattr(streamio, "READ_CHUNK_SIZE", chunk_size)
+    records = _records(50)
+    path = tmp_path / "trips.json"
+    write_data_json(str(path), records, style=style)
+    assert list(iter_data_json(str(path))) == records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5])
+def test_iter_data_json_scalars_split_at_boundary(tmp_path, monkeypatch, chunk_size):
+    # 숫자가 버퍼 끝에서 잘려도 앞자리만 디코딩되면 안 됨
+    monkeypatch.setattr(streamio, "READ_CHUNK_SIZE", chunk_size)
+    data = {"meta": {"data": 0}, "data": [12345, 6789, True, None, "문자열", 1.25e10]}
+    path = tmp_path / "scalars.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    assert list(iter_data_json(str(path))) == data["data"]
+
+
+def test_iter_data_json_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(streamio, "READ_CHUNK_SIZE", 2)
+    path = tmp_path / "empty.json"
+    write_data_json(str(path), [])
+    assert list(iter_data_json(str(path))) == []
+
+
+# 2. external_sort: 런 파일로 내보낸 뒤 병합
+# =================================
+
+def _key(record):
+    return record["eventTime"]
+
+
+@pytest.mark.parametrize("fan_in", [2, 3, streamio.MAX_MERGE_FAN_IN])
+def test_external_sort_spills_and_merges_stably(tmp_path, monkeypatch, fan_in):
+    monkeypatch.setattr(streamio, "MAX_MERGE_FAN_IN", fan_in)
+    spilled = []
+    spill_run = streamio._spill_run
+    monkeypatch.setattr(streamio, "_spill_run", lambda records, run_dir: spilled.append(1) or spill_run(records, run_dir))
+
+    records = _records(1000)
+    result = list(external_sort(iter(records), key=_key, run_size=37, tmpdir=str(tmp_path)))
+    # 같은 key 끼리는 입력 순서(roadId)를 유지해야 함
+    assert result == sorted(records, key=_key)
+    assert len(spilled) >= len(records) // 37
+    assert list(tmp_path.iterdir()) == []   # 임시 런 디렉터리는 정리됨
+
+
+def test_external_sort_in_memory_when_small(tmp_path, monkeypatch):
+    monkeypatch.setattr(streamio, "_spill_run", lambda records, run_dir: pytest.fail("런 파일을 만들면 안 됨"))
+    records = _records(20)
+    assert list(external_sort(records, key=_key, run_size=20, tmpdir=str(tmp_path))) == sorted(records, key=_key)
+    assert list(external_sort([], key=_key)) == []
+
+
+# 3. find_ndjson_split / merge_into_sorted_ndjson
+# =================================
+
+def _write_sorted(path, times):
+    records = [{"roadId": i, "eventTime": t} for i, t in enumerate(times)]
+    write_ndjson(str(path), records)
+    offsets, pos = [], 0
+    for line in path.read_bytes().splitlines(keepends=True):
+        offsets.append(pos)
+        pos += len(line)
+    return records, offsets, pos
+
+
+@pytest.mark.parametrize("linear_scan_bytes", [0, 1, 40, streamio.READ_CHUNK_SIZE])
+def test_find_ndjson_split_with_duplicate_keys(tmp_path, linear_scan_bytes):
+    times = [1, 2, 2, 2, 2, 3, 3, 5, 5, 5, 5, 5, 8]
+    path = tmp_path / "sorted.ndjson"
+    records, offsets, size = _write_sorted(path, times)
+    for value in range(0, 10):
+        expected = next((offsets[i] for i, t in enumerate(times) if t > value), size)
+        assert find_ndjson_split(str(path), value, _key, linear_scan_bytes=linear_scan_bytes) == expected, value
+
+
+def test_find_ndjson_split_many_duplicates(tmp_path):
+    times = sorted(random.Random(1).choice([10, 20, 30]) for _ in range(3000))
+    path = tmp_path / "sorted.ndjson"
+    records, offsets, size = _write_sorted(path, times)
+    for value in (9, 10, 15, 20, 29, 30, 31):
+        expected = next((offsets[i] for i, t in enumerate(times) if t > value), size)
+        assert find_ndjson_split(str(path), value, _key, linear_scan_bytes=64) == expected
+
+
+def test_merge_into_sorted_ndjson_keeps_prefix_and_tie_order(tmp_path):
+    path = tmp_path / "history.ndjson"
+    existing, offsets, _ = _write_sorted(path, [1, 2, 3, 3, 4, 6])
+    before = path.read_bytes()
+    new = [{"roadId": 100, "eventTime": 3}, {"roadId": 101, "eventTime": 5}, {"roadId": 102, "eventTime": 9}]
+
+    assert merge_into_sorted_ndjson(str(path), new, key=_key, tmpdir=str(tmp_path)) == 3
+    after = path.read_bytes()
+    # key 3 인 새 레코드는 기존 key 3 뒤에 오므로, 첫 key 4 줄 앞까지는 그대로
+    split = offsets[4]
+    assert after[:split] == before[:split]
+    assert [r["roadId"] for r in iter_ndjson(str(path))] == [0, 1, 2, 3, 100, 4, 101, 5, 102]
+
+
+def test_merge_into_sorted_ndjson_appends_after_last(tmp_path):
+    path = tmp_path / "history.ndjson"
+    _write_sorted(path, [1, 2, 3])
+    before = path.read_bytes()
+    merge_into_sorted_ndjson(str(path), [{"roadId": 9, "eventTime": 3}], key=_key, tmpdir=str(tmp_path))
+    assert path.read_bytes().startswith(before)
+    assert merge_into_sorted_ndjson(str(path), [], key=_key) == 0
@@ -0,0 +1,63 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+# 물류 네트워크 토폴로지 인덱스
+# =================================
+# 노드 목록으로부터 이력 생성에 필요한 조회 구조를 한 번만 만들어 두고,
+# 이벤트마다 리스트를 다시 만들거나 선형 탐색하지 않고 O(1)로 조회합니다.
+
+STEP_ORDER = ("Factory", "WMS", "LogiHub", "Wholesaler", "Reseller", "POS")
+
+
+class TopologyIndex(NamedTuple):
+    """노드/단계 조회용 불변 인덱스"""
+    nodes: Tuple[dict, ...]                     # locationId - 1 -> 노드
+    node_ids: Mapping[str, int]                 # scanLocation -> locationId (1부터 시작)
+    nodes_by_location: Mapping[str, dict]       # scanLocation -> 노드
+    step_order: Tuple[str, ...]
+    step_rank: Mapping[str, int]                # businessStep -> 단계 순서
+    prev_step: Mapping[str, Optional[str]]      # businessStep -> 이전 단계 (없으면 None)
+    next_step: Mapping[str, Optional[str]]      # businessStep -> 다음 단계 (없으면 None)
+    nodes_by_step: Mapping[str, Tuple[dict, ...]]
+    factory_to_wms: Mapping[str, dict]          # 공장 scanLocation -> 공장 창고 노드
+    wms_to_factory: Mapping[str, dict]          # 공장 창고 scanLocation -> 공장 노드
+
+
+def build_topology_index(nodes, factory_wms_map, step_order=STEP_ORDER):
+    """노드 목록과 공장-창고 매핑으로 TopologyIndex 를 생성합니다."""
+    step_order = tuple(step_order)
+
+    nodes_by_location = {}
+    for node in nodes:
+        # scanLocation 이 중복되면 먼저 나온 노드를 기준으로 id 를 부여
+        nodes_by_location.setdefault(node["scanLocation"], node)
+    node_ids = {location: i + 1 for i, location in enumerate(nodes_by_location)}
+
+    step_rank = {step: i for i, step in enumerate(step_order)}
+    prev_step = {step: step_order[i - 1] if i > 0 else None for i, step in enumerate(step_order)}
+    next_step = {step: step_order[i + 1] if i + 1 < len(step_order) else None for i, step in enumerate(step_order)}
+
+    buckets = {step: [] for step in step_order}
+    for node in nodes:
+        if node["businessStep"] in buckets:
+            buckets[node["businessStep"]].append(node)
+
+    factory_to_wms = {}
+    wms_to_factory = {}
+    for factory, wms in factory_wms_map.items():
+        if factory in nodes_by_location and wms in nodes_by_location:
+            factory_to_wms[factory] = nodes_by_location[wms]
+            wms_to_factory[wms] = nodes_by_location[factory]
+
+    return TopologyIndex(
+        nodes=tuple(nodes_by_location.values()),
+        node_ids=MappingProxyType(node_ids),
+        nodes_by_location=MappingProxyType(nodes_by_location),
+        step_order=step_order,
+        step_rank=MappingProxyType(step_rank),
+        prev_step=MappingProxyType(prev_step),
+        next_step=MappingProxyType(next_step),
+        nodes_by_step=MappingProxyType({step: tuple(b) for step, b in buckets.items()}),
+        factory_to_wms=MappingProxyType(factory_to_wms),
+        wms_to_factory=MappingProxyType(wms_to_factory),
+    )
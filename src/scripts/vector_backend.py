@@ -0,0 +1,246 @@
+import hashlib
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 는 선택 의존성 (--backend numpy 사용 시에만 필요)
+    np = None
+
+from create import (
+    CLONE_SET_TIME_STEP, EPC_START, MAX_CLONE_SETS, NODES_INFO, PRODUCTS, START_TIME,
+    describe_anomaly,
+)
+
+# NumPy 기반 대량 트립 생성 엔진
+# =================================
+# create.py 의 iter_anomaly_trips 와 같은 시나리오 규칙을 따르되, 트립을 하나씩
+# 만들지 않고 배치 단위로 시나리오/노드/시간/EPC 를 배열로 한 번에 뽑습니다.
+# dict 행은 출력 직전에 iter_batch_rows 에서만 만들어집니다.
+
+DEFAULT_BATCH_SIZE = 100_000
+
+# 시나리오 코드
+CLONE, FAKE, TAMPER, RULE_VIOLATION = 0, 1, 2, 3
+SINGLE_SCENARIOS = (FAKE, TAMPER, RULE_VIOLATION)
+ANOMALY_TYPE_NAMES = {CLONE: "clone", FAKE: "fake", TAMPER: "tamper", RULE_VIOLATION: None}
+
+# 규칙 위반 종류
+REVERSE, HOP, FORBIDDEN = 0, 1, 2
+
+
+class TripBatch(NamedTuple):
+    """열(column) 단위로 저장된 트립 묶음. 모든 배열의 길이는 트립 수와 같습니다."""
+    road_id: "np.ndarray"        # int64
+    scenario: "np.ndarray"       # int8, 시나리오 코드
+    from_node: "np.ndarray"      # int32, NODES_INFO 인덱스
+    to_node: "np.ndarray"        # int32, NODES_INFO 인덱스
+    from_time: "np.ndarray"      # int64, epoch 초
+    to_time: "np.ndarray"        # int64, epoch 초
+    epc_parts: "np.ndarray"      # int64 (n, 3), tamper 는 세 부분, 나머지는 [serial, 0, 0]
+    product: "np.ndarray"        # int16, PRODUCTS 인덱스
+    lot: "np.ndarray"            # int16, LOT 번호
+    anomaly: "np.ndarray"        # int16, anomaly 수치
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy 가 설치되어 있지 않습니다. 'pip install numpy' 후 다시 실행해주세요.")
+
+
+def make_rng(seed):
+    """정수/문자열 시드로 numpy Generator 를 만듭니다. (문자열은 sha256 으로 변환)"""
+    _require_numpy()
+    if isinstance(seed, str):
+        seed = int.from_bytes(hashlib.sha256(seed.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed)
+
+
+class _NodeArrays:
+    """노드 목록을 인덱스 배열로 변환해 둔 조회용 구조"""
+
+    def __init__(self, nodes):
+        self.count = len(nodes)
+        steps = np.array([node["businessStep"] for node in nodes])
+        self.by_step = {step: np.flatnonzero(steps == step) for step in ("LogiHub", "Wholesaler", "Reseller")}
+
+    def pick(self, rng, step, size):
+        """특정 단계의 노드 인덱스를 size 개 뽑습니다."""
+        candidates = self.by_step[step]
+        return candidates[rng.integers(0, len(candidates), size)]
+
+    def pick_distinct_pair(self, rng, candidates, size):
+        """candidates 에서 서로 다른 노드 두 개씩을 size 쌍 뽑습니다."""
+        a = rng.integers(0, len(candidates), size)
+        b = rng.integers(0, len(candidates) - 1, size)
+        b += b >= a
+        return candidates[a], candidates[b]
+
+
+def _description_table():
+    """(시나리오, anomaly>=50) -> description 문자열 표"""
+    table = {}
+    for scenario, type_name in ANOMALY_TYPE_NAMES.items():
+        for high in (False, True):
+            table[scenario, high] = describe_anomaly(type_name, 100 if high else 0)
+    return table
+
+
+# 1. 배치 생성
+# =================================
+
+def iter_trip_batches(num_trips_target, rng, road_id_start=1, epc_start=EPC_START,
+                      start_time=START_TIME, max_clone_sets=MAX_CLONE_SETS,
+                      batch_size=DEFAULT_BATCH_SIZE):
+    """from.eventTime 순으로 정렬된 TripBatch 를 차례로 돌려주는 제너레이터"""
+    _require_numpy()
+    nodes = _NodeArrays(NODES_INFO)
+    all_nodes = np.arange(nodes.count)
+
+    produced = 0
+    road_id = road_id_start
+    epc_serial = epc_start
+    slot_time = int(start_time.timestamp())
+    clone_budget = max_clone_sets
+    clone_step = int(CLONE_SET_TIME_STEP.total_seconds())
+
+    while produced < num_trips_target:
+        n_slots = min(batch_size, num_trips_target - produced)
+
+        # --- 시나리오 결정: 약 10% 확률로 복제, 남은 복제 세트 수만큼만 허용 ---
+        scenario = rng.choice(np.array(SINGLE_SCENARIOS, dtype=np.int8), n_slots)
+        clone_mask = rng.random(n_slots) < 0.1
+        clone_mask &= np.cumsum(clone_mask) <= clone_budget
+        scenario[clone_mask] = CLONE
+        clone_budget -= int(clone_mask.sum())
+
+        # --- 슬롯(시나리오 한 번) 단위 값: 복제 세트는 2~3개의 트립으로 펼쳐짐 ---
+        trips_per_slot = np.where(clone_mask, rng.integers(2, 4, n_slots), 1)
+        slot_advance = np.where(clone_mask, clone_step, rng.integers(1, 4, n_slots) * 3600)
+        slot_start = slot_time + np.concatenate(([0], np.cumsum(slot_advance[:-1])))
+        slot_serial = epc_serial + np.arange(n_slots)
+        slot_product = rng.integers(0, len(PRODUCTS), n_slots)
+        slot_lot = rng.integers(1000, 10000, n_slots)
+
+        # 목표 개수를 넘는 트립은 잘라냄
+        trip_slot = np.repeat(np.arange(n_slots), trips_per_slot)[:num_trips_target - produced]
+        used_slots = int(trip_slot[-1]) + 1
+        n = len(trip_slot)
+        sc = scenario[trip_slot]
+        is_clone = sc == CLONE
+        is_fake = sc == FAKE
+        is_tamper = sc == TAMPER
+        is_rule = sc == RULE_VIOLATION
+
+        # --- 출발/도착 노드 ---
+        from_node = np.empty(n, dtype=np.int32)
+        to_node = np.empty(n, dtype=np.int32)
+
+        free = is_fake | is_tamper
+        from_node[free], to_node[free] = nodes.pick_distinct_pair(rng, all_nodes, int(free.sum()))
+
+        violation = rng.integers(0, 3, n)
+        for kind, (from_step, to_step) in ((REVERSE, ("Wholesaler", "LogiHub")), (HOP, ("LogiHub", "Reseller"))):
+            mask = is_rule & (violation == kind)
+            from_node[mask] = nodes.pick(rng, from_step, int(mask.sum()))
+            to_node[mask] = nodes.pick(rng, to_step, int(mask.sum()))
+        mask = is_rule & (violation == FORBIDDEN)
+        from_node[mask], to_node[mask] = nodes.pick_distinct_pair(rng, nodes.by_step["Reseller"], int(mask.sum()))
+
+        clone_idx = np.flatnonzero(is_clone)
+        if len(clone_idx):
+            # 복제 세트 안의 모든 출발/도착지가 서로 다르도록 세트마다 무작위 순열의 앞부분을 사용
+            clone_slot = trip_slot[clone_idx]
+            set_start = np.concatenate(([True], clone_slot[1:] != clone_slot[:-1]))
+            set_id = np.cumsum(set_start) - 1
+            rank = np.arange(len(clone_idx)) - np.flatnonzero(set_start)[set_id]
+            perm = np.argsort(rng.random((int(set_id[-1]) + 1, nodes.count)), axis=1)
+            from_node[clone_idx] = perm[set_id, rank * 2]
+            to_node[clone_idx] = perm[set_id, rank * 2 + 1]
+
+        # --- 시간 ---
+        from_time = slot_start[trip_slot] + np.where(is_clone, rng.integers(0, 31, n) * 60, 0)
+        duration = np.where(is_clone, rng.uniform(2, 5, n), rng.uniform(5, 10, n)) * 3600
+        to_time = (from_time + duration).astype(np.int64)
+
+        # --- EPC ---
+        epc_parts = np.zeros((n, 3), dtype=np.int64)
+        epc_parts[:, 0] = slot_serial[trip_slot]
+        epc_parts[is_fake, 0] = rng.integers(10000, 100000, int(is_fake.sum()))
+        n_tamper = int(is_tamper.sum())
+        epc_parts[is_tamper] = np.column_stack((
+            rng.integers(100, 1000, n_tamper), rng.integers(100, 1000, n_tamper), rng.integers(1000, 10000, n_tamper),
+        ))
+
+        # --- anomaly 수치 ---
+        high = rng.integers(50, 101, n)
+        anomaly = np.where(is_clone, rng.integers(70, 101, n), high)
+        low_mask = (is_fake | is_tamper) & (rng.random(n) >= 0.7)
+        anomaly[low_mask] = rng.integers(10, 50, int(low_mask.sum()))
+
+        batch = TripBatch(
+            road_id=road_id + np.arange(n, dtype=np.int64),
+            scenario=sc,
+            from_node=from_node,
+            to_node=to_node,
+            from_time=from_time.astype(np.int64),
+            to_time=to_time,
+            epc_parts=epc_parts,
+            product=slot_product[trip_slot].astype(np.int16),
+            lot=slot_lot[trip_slot].astype(np.int16),
+            anomaly=anomaly.astype(np.int16),
+        )
+        # 복제 세트 내부의 출발 시각만 뒤섞여 있으므로 배치 안에서만 정렬하면 전체가 정렬됨
+        order = np.argsort(batch.from_time, kind="stable")
+        yield TripBatch(*(column[order] for column in batch))
+
+        produced += n
+        road_id += n
+        epc_serial += used_slots
+        slot_time = int(slot_start[used_slots - 1] + slot_advance[used_slots - 1])
+
+
+# 2. 출력 경계에서의 dict 변환
+# =================================
+
+def iter_batch_rows(batch):
+    """TripBatch 를 create_trip 과 같은 형태의 dict 로 하나씩 변환합니다."""
+    descriptions = _description_table()
+    node_fields = [
+        (node["scanLocation"], node["coord"], node["businessStep"]) for node in NODES_INFO
+    ]
+    columns = zip(
+        batch.road_id.tolist(), batch.scenario.tolist(), batch.from_node.tolist(), batch.to_node.tolist(),
+        batch.from_time.tolist(), batch.to_time.tolist(), batch.epc_parts.tolist(),
+        batch.product.tolist(), batch.lot.tolist(), batch.anomaly.tolist(),
+    )
+    for road_id, scenario, from_idx, to_idx, from_time, to_time, epc, product, lot, anomaly in columns:
+        from_location, from_coord, from_step = node_fields[from_idx]
+        to_location, to_coord, to_step = node_fields[to_idx]
+        if scenario == TAMPER:
+            epc_code = f"2.{epc[0]}.{epc[1]}.{epc[2]}"
+        else:
+            epc_code = f"1.880.123.{epc[0]}"
+        type_name = ANOMALY_TYPE_NAMES[scenario]
+        yield {
+            "roadId": road_id,
+            "from": {
+                "scanLocation": from_location, "coord": from_coord,
+                "eventTime": from_time, "businessStep": from_step
+            },
+            "to": {
+                "scanLocation": to_location, "coord": to_coord,
+                "eventTime": to_time, "businessStep": to_step
+            },
+            "epcCode": epc_code, "productName": PRODUCTS[product],
+            "epcLot": f"LOT-{'C' if scenario == CLONE else 'A'}-{lot}",
+            "eventType": "출고",
+            "anomaly": anomaly,
+            "anomalyTypeList": [type_name] if type_name else [],
+            "description": descriptions[scenario, anomaly >= 50]
+        }
+
+
+def iter_vectorized_trips(num_trips_target, seed, **batch_options):
+    """iter_trip_batches 로 생성한 트립을 from.eventTime 순의 dict 로 돌려줍니다."""
+    for batch in iter_trip_batches(num_trips_target, make_rng(seed), **batch_options):
+        yield from iter_batch_rows(batch)
@@ -14,6 +14,12 @@ export interface EventHistory {
     description: string;
 }
 
+/**
+ * 이력의 연속한 두 이벤트(from -> to)로 만든 구간 id.
+ * eventId 는 roadId << 16 | 순번 이라 두 id 를 숫자로 합치면 Number 의 안전 범위(2^53)를 넘으므로 문자열로 만듭니다.
+ */
+export const historyLegId = (from: EventHistory, to: EventHistory): string => `${from.eventId}-${to.eventId}`;
+
 interface HistoryApiResponse {
     data: EventHistory[];
 }
@@ -15,7 +15,7 @@ import type {
 
 import { MergeTrip, Tab } from '@/components/visual/SupplyChainDashboard';
 import { fetchRouteGeometry } from '@/services/mapboxService';
-import { fetchEpcHistory, type EventHistory } from '@/services/historyService';
+import { fetchEpcHistory, historyLegId, type EventHistory } from '@/services/historyService';
 
 export const formatUnixTimestamp = (timestamp: number | string): string => {
     if (!timestamp || timestamp === 0) return 'N/A';
@@ -199,7 +199,7 @@ const epcHistoryAsTripsAtom = atom<MergeTrip[]>((get) => {
         const toNode = nodesMap.get(toEvent.scanLocation);
         if (!fromNode || !toNode) continue;
 
-        const roadId = fromEvent.eventId * 10000 + toEvent.eventId;
+        const roadId = historyLegId(fromEvent, toEvent);
         const geometry = geometries[roadId];
         const path = geometry?.path || [fromNode.coord, toNode.coord];
 
@@ -241,7 +241,7 @@ const convertHistoryToTrips = (history: EventHistory[], nodesMap: Map<string, Lo
         if (!fromNode || !toNode) continue;
 
         trips.push({
-            roadId: fromEvent.eventId * 10000 + toEvent.eventId,
+            roadId: historyLegId(fromEvent, toEvent),
             from: { ...fromEvent, coord: fromNode.coord, eventTime: new Date(fromEvent.eventTime).getTime() / 1000 },
             to: { ...toEvent, coord: toNode.coord, eventTime: new Date(toEvent.eventTime).getTime() / 1000 },
             epcCode: fromEvent.epcCode,
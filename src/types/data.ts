@@ -23,7 +23,7 @@ export interface TripEndpoint {
 }
 
 export interface AnalyzedTrip {
-    roadId: number;
+    roadId: number | string; // 이력에서 만든 구간은 historyLegId 문자열
     from: TripEndpoint;
     to: TripEndpoint;
     epcCode: string;